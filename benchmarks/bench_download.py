@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+下载路径基准测试 / Download path benchmarks
+
+启动本地合成直播源服务器 (server.py)，驱动 IPTVDownloader.download_all_sources、
+编码检测、M3U 校验以及发布服务器，报告吞吐量、p50/p99 延迟和峰值内存 (RSS)，
+并与 baselines.json 中保存的基线对比。
+
+用法 / Usage:
+    python3 benchmarks/bench_download.py                 # 运行并与基线对比
+    python3 benchmarks/bench_download.py --check         # 有回归时返回非零
+    python3 benchmarks/bench_download.py --save-baseline # 保存为新基线
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from common import BENCH_DIR, peak_rss_mb, percentile, report, time_call
+from synthetic import make_playlist
+
+# common 已将仓库根目录加入 sys.path
+import iptv_manager  # noqa: E402
+
+# 各场景参数；--quick 时频道数和重复次数缩小
+SCENARIOS = {
+    'download_utf8': {'sources': 8, 'channels': 5000, 'encoding': 'utf-8', 'latency': 0.02, 'error_rate': 0.0},
+    'download_gbk': {'sources': 8, 'channels': 5000, 'encoding': 'gbk', 'latency': 0.02, 'error_rate': 0.0},
+    'download_flaky': {'sources': 8, 'channels': 1000, 'encoding': 'utf-8', 'latency': 0.05, 'error_rate': 0.3},
+}
+
+def start_server():
+    """在子进程中启动合成直播源服务器 / Start the stand-in server in a subprocess"""
+    process = subprocess.Popen([sys.executable, str(BENCH_DIR / "server.py")],
+                               stdout=subprocess.PIPE, text=True, cwd=str(BENCH_DIR))
+    line = process.stdout.readline().split()
+    if len(line) != 2 or line[0] != 'PORT':
+        process.kill()
+        raise RuntimeError("benchmark server failed to start")
+    return process, int(line[1])
+
+
+def make_config(workdir: Path, port: int, scenario: dict) -> Path:
+    sources = {}
+    for index in range(scenario['sources']):
+        query = (f"channels={scenario['channels']}&encoding={scenario['encoding']}&latency={scenario['latency']}"
+                 f"&error_rate={scenario['error_rate']}&seed={index}")
+        sources[f"bench{index}"] = {
+            'name': f"bench{index}",
+            'url': f"http://127.0.0.1:{port}/playlist.m3u?{query}",
+            'filename': f"bench{index}.m3u",
+            'enabled': True,
+        }
+    # 关闭默认源
+    sources['domestic'] = {'enabled': False}
+    sources['international'] = {'enabled': False}
+    config = {
+        'language': 'en',
+        'sources': sources,
+        'directories': {'base_dir': str(workdir / "base")},
+        'download': {'retry_count': 3, 'retry_delay': 0, 'max_workers': 4,
+                     'conditional_requests': False, 'breaker_enabled': False},
+        'metrics': {'textfile': ''},
+    }
+    config_path = workdir / "config.json"
+    config_path.write_text(json.dumps(config), encoding='utf-8')
+    return config_path
+
+
+def bench_download(port: int, scenario: dict, repeats: int, workdir: Path) -> dict:
+    """多次运行 download_all_sources / Run download_all_sources repeatedly"""
+    config = iptv_manager.IPTVConfig(str(make_config(workdir, port, scenario)))
+    downloader = iptv_manager.IPTVDownloader(config)
+
+    run_times, fetch_times = [], []
+    total_bytes, successes, attempts = 0, 0, 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        results = downloader.download_all_sources()
+        run_times.append(time.perf_counter() - started)
+        for source_id, (success, _) in results.items():
+            attempts += 1
+            if success:
+                successes += 1
+                info = downloader.fetch_info[source_id]
+                fetch_times.append(info['fetch_duration'])
+                total_bytes += info['size']
+
+    return {
+        'run_p50_ms': round(percentile(run_times, 50) * 1000, 1),
+        'run_p99_ms': round(percentile(run_times, 99) * 1000, 1),
+        'fetch_p50_ms': round(percentile(fetch_times, 50) * 1000, 1),
+        'fetch_p99_ms': round(percentile(fetch_times, 99) * 1000, 1),
+        'throughput_mb_s': round(total_bytes / sum(run_times) / 1024 / 1024, 2),
+        'success_rate': round(successes / attempts, 3) if attempts else 0.0,
+    }
+
+
+def bench_call(function, argument, repeats: int) -> dict:
+    timings = time_call(function, repeats, argument)
+    return {
+        'p50_ms': round(percentile(timings, 50) * 1000, 2),
+        'p99_ms': round(percentile(timings, 99) * 1000, 2),
+    }
+
+
+def bench_content(channels: int, repeats: int, workdir: Path) -> dict:
+    """编码检测与 M3U 校验 / Encoding detection and validation"""
+    config_path = workdir / "content.json"
+    config_path.write_text(json.dumps({'directories': {'base_dir': str(workdir / "content")}}), encoding='utf-8')
+    downloader = iptv_manager.IPTVDownloader(iptv_manager.IPTVConfig(str(config_path)))
+    text = make_playlist(channels, seed=1)
+    results = {}
+    for encoding in ('utf-8', 'gbk'):
+        results[f"detect_encoding_{encoding.replace('-', '')}"] = bench_call(downloader._detect_encoding, text.encode(encoding), repeats)
+    results['validate'] = bench_call(downloader._validate_m3u_content, text, repeats)
+    return results
+
+
+def bench_server(base_config: Path, clients: int, requests_per_client: int) -> dict:
+    """发布服务器 keep-alive 请求 / Publishing server keep-alive requests"""
+    config = iptv_manager.IPTVConfig(str(base_config))
+    port = free_port()
+    config.set('server', {'host': '127.0.0.1', 'port': port, 'keepalive_timeout': 30, 'backlog': 1024})
+    server = iptv_manager.IPTVServer(config, iptv_manager.IPTVPublisher(config))
+    thread = threading.Thread(target=server.run, kwargs={'install_signal_handlers': False}, daemon=True)
+    thread.start()
+    time.sleep(0.5)
+
+    filename = next(iter(config.get_sources().values()))['filename']
+    latencies = [[] for _ in range(clients)]
+
+    def client(index):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        for _ in range(requests_per_client):
+            started = time.perf_counter()
+            connection.request('GET', f"/{filename}", headers={'Accept-Encoding': 'gzip'})
+            response = connection.getresponse()
+            response.read()
+            latencies[index].append(time.perf_counter() - started)
+        connection.close()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    server.stop()
+    thread.join(timeout=5)
+
+    flat = [value for values in latencies for value in values]
+    return {
+        'requests_per_s': round(len(flat) / elapsed, 1),
+        'p50_ms': round(percentile(flat, 50) * 1000, 2),
+        'p99_ms': round(percentile(flat, 99) * 1000, 2),
+    }
+
+
+def bench_server_polls(base_config: Path, clients: int, polls_per_client: int) -> dict:
+    """大量并发长连接客户端以 If-None-Match 轮询 (304) / Many concurrent clients polling with If-None-Match"""
+    import asyncio
+    import resource
+
+    # 客户端和服务器在同一进程中，每个连接占用两个文件描述符
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = clients * 2 + 256
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted if hard == resource.RLIM_INFINITY else min(wanted, hard), hard))
+
+    config = iptv_manager.IPTVConfig(str(base_config))
+    port = free_port()
+    config.set('server', {'host': '127.0.0.1', 'port': port, 'keepalive_timeout': 60, 'backlog': max(1024, clients)})
+    server = iptv_manager.IPTVServer(config, iptv_manager.IPTVPublisher(config))
+    thread = threading.Thread(target=server.run, kwargs={'install_signal_handlers': False}, daemon=True)
+    thread.start()
+    time.sleep(0.5)
+
+    filename = next(iter(config.get_sources().values()))['filename']
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    connection.request('GET', f"/{filename}", headers={'Accept-Encoding': 'gzip'})
+    response = connection.getresponse()
+    response.read()
+    etag = response.getheader('ETag')
+    connection.close()
+    request = (f"GET /{filename} HTTP/1.1\r\nHost: 127.0.0.1\r\nAccept-Encoding: gzip\r\n"
+               f"If-None-Match: {etag}\r\n\r\n").encode('latin-1')
+    latencies, statuses = [], []
+
+    async def poll(reader, writer):
+        for _ in range(polls_per_client):
+            started = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            latencies.append(time.perf_counter() - started)
+            statuses.append(head[9:12])
+        writer.close()
+
+    async def run():
+        # 先建立全部连接，再同时开始轮询
+        streams = []
+        for offset in range(0, clients, 250):
+            batch = min(250, clients - offset)
+            streams += await asyncio.gather(*(asyncio.open_connection('127.0.0.1', port) for _ in range(batch)))
+        started = time.perf_counter()
+        await asyncio.gather(*(poll(reader, writer) for reader, writer in streams))
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(run())
+    server.stop()
+    thread.join(timeout=5)
+
+    if any(status != b'304' for status in statuses):
+        raise RuntimeError(f"expected only 304 responses, got {sorted(set(statuses))}")
+    return {
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def free_port() -> int:
+    """获取一个空闲端口 / Find a free local port"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='IPTV Manager download benchmarks / 下载路径基准测试')
+    parser.add_argument('--quick', action='store_true', help='Smaller inputs and fewer repeats / 缩小规模快速运行')
+    parser.add_argument('--repeats', type=int, default=None, help='Runs per download scenario / 每个场景运行次数')
+    parser.add_argument('--save-baseline', action='store_true', help='Store results as the new baseline / 保存为新基线')
+    parser.add_argument('--check', action='store_true', help='Exit non-zero on regressions / 有回归时返回非零')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown / 允许的相对退化')
+    parser.add_argument('--output', type=str, help='Write results as JSON / 结果写入JSON文件')
+    args = parser.parse_args()
+
+    repeats = args.repeats or (3 if args.quick else 10)
+    scale = 5 if args.quick else 1
+    iptv_manager.set_language('en')
+    # 失败重试场景会产生大量警告日志，基准测试中关闭
+    logging.disable(logging.CRITICAL)
+
+    results = {}
+    process, port = start_server()
+    try:
+        with tempfile.TemporaryDirectory(prefix='iptv-bench-') as tmp:
+            workdir = Path(tmp)
+            for name, scenario in SCENARIOS.items():
+                scenario = dict(scenario, channels=max(100, scenario['channels'] // scale))
+                scenario_dir = workdir / name
+                scenario_dir.mkdir()
+                print(f"running {name} ...", file=sys.stderr)
+                results[name] = bench_download(port, scenario, repeats, scenario_dir)
+            print("running content ...", file=sys.stderr)
+            for name, metrics in bench_content(SCENARIOS['download_utf8']['channels'] // scale, repeats, workdir).items():
+                results[name] = metrics
+            print("running server ...", file=sys.stderr)
+            results['server'] = bench_server(workdir / "download_utf8" / "config.json",
+                                             clients=8 if args.quick else 32, requests_per_client=50 if args.quick else 200)
+            print("running server_polls ...", file=sys.stderr)
+            results['server_polls'] = bench_server_polls(workdir / "download_utf8" / "config.json",
+                                                         clients=1000 if args.quick else 2000,
+                                                         polls_per_client=5 if args.quick else 20)
+    finally:
+        process.terminate()
+        process.wait()
+    results['summary'] = {'peak_rss_mb': peak_rss_mb()}
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding='utf-8')
+    return report('download', 'quick' if args.quick else 'full', results, args.save_baseline, args.check, args.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+播放列表处理微基准 / Playlist path micro-benchmarks
+
+对合成语料 (corpus.py 的各规模与变体) 测量解码、编码检测、_validate_m3u_content、
+频道计数、IPTVPlaylist.parse (含 ID 分配/重复频道处理)、render、IPTVDeltaLog.diff
+TXT 格式转换 (IPTVTxtPlaylist.to_m3u)、已保存文件的映射扫描 (IPTVPlaylist.scan_file)
+以及大文件的多进程并行解析 (IPTVPlaylist.parse_file，进程数为 CPU 核数)，
+报告 p50 耗时与每秒处理频道数，并与 baselines.json 对比。
+
+用法 / Usage:
+    python3 benchmarks/bench_parser.py --quick
+    python3 benchmarks/bench_parser.py --max-channels 1000000
+    python3 benchmarks/bench_parser.py --filter parse --check
+"""
+
+import argparse
+import json
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import peak_rss_mb, percentile, report, time_call
+from corpus import VARIANTS, build, sizes_up_to
+
+# common 已将仓库根目录加入 sys.path
+import iptv_manager  # noqa: E402
+
+# chardet 对整个文件逐字节分析，大文件耗时过长，只在此规模以下测量
+DETECT_ENCODING_MAX_CHANNELS = 10000
+# 只在此规模以上测量多进程并行解析
+PARALLEL_MIN_CHANNELS = 100000
+# 每项测量的目标总耗时 (秒)，据此决定重复次数
+TIME_BUDGET = 1.0
+
+
+def decode(data: bytes, encoding: str) -> str:
+    """与下载器相同的解码方式：失败时按 UTF-8 忽略错误 / Decode like the downloader"""
+    try:
+        return data.decode(encoding)
+    except UnicodeDecodeError:
+        return data.decode('utf-8', errors='ignore')
+
+
+def mutate(channels: list, every: int = 20) -> list:
+    """复制频道列表并修改部分地址，用于 diff / Copy channels and change some URLs"""
+    changed = [dict(channel) for channel in channels]
+    for channel in changed[::every]:
+        channel['url'] += '&changed=1'
+    return changed
+
+
+def measure(function, *args) -> list:
+    first = time_call(function, 1, *args)
+    repeats = max(3, min(50, int(TIME_BUDGET / max(first[0], 1e-6))))
+    return first + time_call(function, repeats - 1, *args)
+
+
+def make_downloader(workdir: Path):
+    config_path = workdir / "config.json"
+    config_path.write_text(json.dumps({'directories': {'base_dir': str(workdir / "base")}}), encoding='utf-8')
+    return iptv_manager.IPTVDownloader(iptv_manager.IPTVConfig(str(config_path)))
+
+
+def bench_file(downloader, variant: str, channels: int, name_filter: str, workdir: Path) -> dict:
+    data = build(variant, channels)
+    encoding = VARIANTS[variant][1]
+    text = decode(data, 'utf-8' if encoding == 'mixed' else encoding)
+    # 下载器保存的文件为 UTF-8
+    stored = workdir / f"{variant}_{channels}.m3u"
+    stored.write_bytes(text.encode('utf-8'))
+    parsed = iptv_manager.IPTVPlaylist.parse(text)
+    changed = mutate(parsed)
+    txt = iptv_manager.IPTVTxtPlaylist.render(parsed)
+
+    cases = {
+        'decode': (decode, data, 'utf-8' if encoding == 'mixed' else encoding),
+        'validate': (downloader._validate_m3u_content, text),
+        'count': (text.count, '#EXTINF:'),
+        'parse': (iptv_manager.IPTVPlaylist.parse, text),
+        'render': (iptv_manager.IPTVPlaylist.render, parsed),
+        'diff': (iptv_manager.IPTVDeltaLog.diff, parsed, changed),
+        'txt_to_m3u': (iptv_manager.IPTVTxtPlaylist.to_m3u, txt),
+        'scan_file': (iptv_manager.IPTVPlaylist.scan_file, stored),
+    }
+    if channels <= DETECT_ENCODING_MAX_CHANNELS:
+        cases['detect_encoding'] = (downloader._detect_encoding, data)
+    if channels >= PARALLEL_MIN_CHANNELS:
+        cases['parse_parallel'] = (iptv_manager.IPTVPlaylist.parse_file, stored, 0, 0)
+
+    results = {}
+    for operation, (function, *args) in cases.items():
+        key = f"{variant}_{channels}.{operation}"
+        if name_filter and name_filter not in key:
+            continue
+        print(f"running {key} ...", file=sys.stderr)
+        p50 = percentile(measure(function, *args), 50)
+        results[key] = {
+            'p50_ms': round(p50 * 1000, 3),
+            'channels_per_s': round(channels / p50) if p50 else 0,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='IPTV Manager playlist micro-benchmarks / 播放列表处理微基准')
+    parser.add_argument('--quick', action='store_true', help='Only 1k and 10k channel files / 只测 1k 与 10k 频道')
+    parser.add_argument('--max-channels', type=int, default=100000, help='Largest file size in channels / 最大频道数')
+    parser.add_argument('--filter', type=str, default='', help='Only run cases containing this text / 只运行名称包含该文本的用例')
+    parser.add_argument('--save-baseline', action='store_true', help='Store results as the new baseline / 保存为新基线')
+    parser.add_argument('--check', action='store_true', help='Exit non-zero on regressions / 有回归时返回非零')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown / 允许的相对退化')
+    parser.add_argument('--output', type=str, help='Write results as JSON / 结果写入JSON文件')
+    args = parser.parse_args()
+
+    max_channels = 10000 if args.quick else args.max_channels
+    mode = 'quick' if args.quick else f"max{max_channels}"
+    iptv_manager.set_language('en')
+    logging.disable(logging.CRITICAL)
+
+    results = {}
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='iptv-bench-') as tmp:
+        downloader = make_downloader(Path(tmp))
+        for channels in sizes_up_to(max_channels):
+            for variant in VARIANTS:
+                results.update(bench_file(downloader, variant, channels, args.filter, Path(tmp)))
+    results['summary'] = {'peak_rss_mb': peak_rss_mb()}
+    print(f"total {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2), encoding='utf-8')
+    # 过滤后的结果不覆盖完整基线
+    return report('parser', mode, results, args.save_baseline and not args.filter, args.check, args.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
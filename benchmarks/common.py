@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试公共函数 / Shared benchmark helpers
+
+百分位、峰值内存、运行环境以及 baselines.json 的读取、保存与对比。
+"""
+
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINE_FILE = BENCH_DIR / "baselines.json"
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+# 越大越好的指标，其余指标越小越好
+HIGHER_IS_BETTER = ('throughput_mb_s', 'requests_per_s', 'success_rate', 'channels_per_s')
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB，macOS 上为字节
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def time_call(function, repeats: int, *args) -> list:
+    """多次调用并返回每次耗时 (秒) / Time repeated calls"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def environment() -> dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def load_baseline(suite: str, mode: str) -> dict:
+    if not BASELINE_FILE.exists():
+        return {}
+    return json.loads(BASELINE_FILE.read_text(encoding='utf-8')).get(suite, {}).get(mode, {})
+
+
+def save_baseline(suite: str, mode: str, results: dict):
+    stored = json.loads(BASELINE_FILE.read_text(encoding='utf-8')) if BASELINE_FILE.exists() else {}
+    stored.setdefault(suite, {})[mode] = {'environment': environment(), 'results': results}
+    BASELINE_FILE.write_text(json.dumps(stored, indent=2, ensure_ascii=False) + "\n", encoding='utf-8')
+    print(f"baseline saved: {BASELINE_FILE} ({suite}/{mode})")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """与基线对比，返回回归列表 / Compare with the baseline and list regressions"""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            if not base:
+                continue
+            change = (value - base) / base
+            worse = -change if metric.endswith(HIGHER_IS_BETTER) else change
+            if worse > tolerance:
+                regressions.append(f"{name}.{metric}: {base} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def print_results(results: dict, baseline: dict):
+    for name, metrics in results.items():
+        print(f"{name}:")
+        for metric, value in metrics.items():
+            base = baseline.get(name, {}).get(metric)
+            suffix = f"  (baseline {base}, {(value - base) / base:+.0%})" if base else ""
+            print(f"  {metric:<18} {value}{suffix}")
+
+
+def report(suite: str, mode: str, results: dict, save: bool, check: bool, tolerance: float) -> int:
+    """输出结果、保存或对比基线，返回退出码 / Print, store or check results"""
+    baseline = load_baseline(suite, mode)
+    print_results(results, baseline.get('results', {}))
+    if save:
+        save_baseline(suite, mode, results)
+        return 0
+    if not baseline:
+        return 0
+    if baseline.get('environment') != environment():
+        print(f"note: baseline recorded on {baseline.get('environment')}", file=sys.stderr)
+    regressions = compare(results, baseline.get('results', {}), tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions and check else 0
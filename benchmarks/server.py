@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试用 HTTP 源服务器 / Local HTTP stand-in for playlist sources
+
+GET /playlist.m3u?channels=5000&encoding=gbk&latency=0.05&error_rate=0.1&seed=1
+- channels:   频道数
+- encoding:   响应编码 (utf-8, gbk, ...)
+- latency:    返回响应头前的延迟 (秒)
+- error_rate: 返回 503 的概率
+- seed:       内容随机种子
+
+用法 / Usage: python3 benchmarks/server.py [--port 0]
+启动后在标准输出打印 "PORT <端口>"。
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from synthetic import make_playlist
+
+
+@lru_cache(maxsize=64)
+def playlist_bytes(channels: int, encoding: str, seed: int) -> bytes:
+    return make_playlist(channels, seed).encode(encoding)
+
+
+class PlaylistHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    error_random = random.Random(0)
+    error_lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        latency = float(query.get('latency', 0))
+        error_rate = float(query.get('error_rate', 0))
+        if latency:
+            time.sleep(latency)
+        with self.error_lock:
+            failed = self.error_random.random() < error_rate
+        if failed:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = playlist_bytes(int(query.get('channels', 1000)), query.get('encoding', 'utf-8'), int(query.get('seed', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'audio/x-mpegurl')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic playlist HTTP server / 合成直播源服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), PlaylistHandler)
+    server.daemon_threads = True
+    print(f"PORT {server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
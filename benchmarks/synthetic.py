@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成直播源生成 / Synthetic playlist generation
+
+为基准测试生成可复现的 M3U 播放列表 (相同参数和种子得到相同内容)，可模拟
+较长的 #EXTINF 属性列表、重复频道、CRLF 换行以及 GBK/UTF-8 混合编码。
+"""
+
+import random
+
+GROUPS = ["央视频道", "卫视频道", "地方频道", "体育", "电影", "News", "Sports", "Movies", "Kids", "Music"]
+NAMES = ["CCTV", "卫视", "新闻", "体育", "电影", "少儿", "音乐", "纪录", "Channel", "HD"]
+EXTRA_ATTRIBUTES = ["tvg-chno", "tvg-shift", "tvg-country", "tvg-language", "tvg-rec", "catchup", "catchup-days",
+                    "catchup-source", "timeshift", "radio", "user-agent", "http-referrer", "aspect-ratio", "audio-track"]
+
+
+def make_playlist(channels: int, seed: int = 0, extra_attributes: int = 0, duplicate_ratio: float = 0.0,
+                  line_ending: str = "\n") -> str:
+    """
+    生成合成 M3U 播放列表
+
+    Args:
+        channels: 频道数
+        seed: 随机种子
+        extra_attributes: 每个 #EXTINF 额外附加的属性数 (部分属性值包含逗号)
+        duplicate_ratio: 重复已有频道 (相同 tvg-id 和名称、不同地址) 的比例
+        line_ending: 换行符
+
+    Returns:
+        播放列表文本
+    """
+    rng = random.Random(seed)
+    lines = ['#EXTM3U x-tvg-url="http://127.0.0.1/epg.xml"']
+    for index in range(channels):
+        channel_index = index
+        if index and rng.random() < duplicate_ratio:
+            channel_index = rng.randrange(index)
+        name = f"{NAMES[channel_index % len(NAMES)]}-{channel_index}"
+        group = GROUPS[channel_index % len(GROUPS)]
+        attributes = f'tvg-id="ch{channel_index}" tvg-name="{name}" tvg-logo="http://127.0.0.1/logo/{channel_index}.png"'
+        for attribute in EXTRA_ATTRIBUTES[:extra_attributes]:
+            attributes += f' {attribute}="{rng.choice(["1", "cn", "zh,en", "append", "7", "Mozilla/5.0 (X11, Linux)"])}"'
+        lines.append(f'#EXTINF:-1 {attributes} group-title="{group}",{name}')
+        lines.append(f"http://127.0.0.1:{rng.randint(1000, 9999)}/live/{index}/index.m3u8?token={rng.getrandbits(64):016x}")
+    return line_ending.join(lines) + line_ending
+
+
+def encode_playlist(text: str, encoding: str, seed: int = 0) -> bytes:
+    """
+    编码播放列表；encoding 为 "mixed" 时逐行随机使用 GBK 或 UTF-8 (模拟拼接而成的源)
+
+    Args:
+        text: 播放列表文本
+        encoding: 编码名称或 "mixed"
+        seed: 随机种子
+    """
+    if encoding != 'mixed':
+        return text.encode(encoding)
+    rng = random.Random(seed)
+    return b"".join(line.encode(rng.choice(('gbk', 'utf-8'))) for line in text.splitlines(keepends=True))
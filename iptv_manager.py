@@ -20,15 +20,25 @@ IPTV直播源管理脚本 / IPTV Live Source Management Script
 import os
 import sys
 import json
+import atexit
 import logging
 import threading
+import re
 import time
 import shutil
+import signal
+import struct
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from functools import partial
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from urllib.parse import urlparse
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+if TYPE_CHECKING:
+    # 仅用于类型注解，运行时在使用处延迟导入
+    import requests
 
 # 导入多语言支持
 try:
@@ -67,16 +77,65 @@ def check_dependencies():
         print("./install.sh")
         sys.exit(1)
 
-# 执行依赖检查
-check_dependencies()
-
-# 导入依赖
-import requests
-import chardet
+# requests/chardet 及 asyncio、gzip 等较重的模块在实际需要时才导入，
+# 使 --status、--version 等命令无需加载它们即可快速启动
 
 
 class IPTVConfig:
-    """IPTV配置管理类"""
+    """
+    IPTV配置管理类
+    
+    配置文件合并默认值并按 SCHEMA 完整校验后，编译为只读的 IPTVConfigSnapshot。
+    重新加载时整体替换快照：读取方持有的快照保持不变，无需加锁。
+    """
+    
+    LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+    # 配置结构：节 -> {键: (类型, 约束)}；约束为最小值、range 或可选值元组
+    SCHEMA = {
+        'directories': {
+            'base_dir': (str, None), 'data_dir': (str, None), 'backup_dir': (str, None),
+            'log_dir': (str, None), 'state_dir': (str, None),
+        },
+        'download': {
+            'timeout': (float, 1), 'retry_count': (int, 1), 'retry_delay': (float, 0), 'max_workers': (int, 1),
+            'user_agent': (str, None), 'conditional_requests': (bool, None), 'breaker_enabled': (bool, None),
+            'breaker_threshold': (int, 1), 'breaker_cooldown': (float, 0), 'resolve_nested': (bool, None),
+            'nested_max_depth': (int, 1), 'nested_max_workers': (int, 1),
+        },
+        'maintenance': {
+            'backup_retention_days': (float, 0), 'log_retention_days': (float, 0),
+            'enable_backup': (bool, None), 'enable_cleanup': (bool, None),
+        },
+        'publish': {
+            'keep_generations': (int, 1), 'precompress': (bool, None), 'parse_workers': (int, 0),
+            'parse_min_size_mb': (float, 0),
+        },
+        'output': {'formats': (list, ('json', 'txt', 'index')), 'merged': (str, None)},
+        'delta': {'history': (int, 1)},
+        'health': {'max_age_hours': (float, 0), 'max_failed_sources': (int, 0), 'max_run_age_hours': (float, 0)},
+        'metrics': {'enabled': (bool, None), 'textfile': (str, None)},
+        'tracing': {'enabled': (bool, None), 'log_level': (str, LEVELS), 'chrome_trace': (bool, None)},
+        'profile': {'sample_interval': (float, 0.0001)},
+        'history': {'retention_days': (float, 1)},
+        'daemon': {
+            'default_interval': (float, 1), 'adaptive': (bool, None), 'min_interval': (float, 1),
+            'max_interval': (float, 1), 'adaptive_increase': (float, 1), 'adaptive_decrease': (float, 0),
+            'failure_retry_interval': (float, 1), 'batch_window': (float, 0), 'maintenance_interval': (float, 1),
+            'config_check_interval': (float, 0),
+        },
+        'server': {'host': (str, None), 'port': (int, range(0, 65536)), 'keepalive_timeout': (float, 0), 'backlog': (int, 1)},
+        'logging': {
+            'level': (str, LEVELS), 'format': (str, None), 'max_size_mb': (float, 0),
+            'backup_count': (int, 0), 'json': (bool, None),
+        },
+    }
+    SOURCE_SCHEMA = {
+        'name': (str, None), 'name_en': (str, None), 'url': (str, None), 'filename': (str, None),
+        'enabled': (bool, None), 'refresh_interval': (float, 1), 'min_interval': (float, 1),
+        'max_interval': (float, 1), 'max_age_hours': (float, 0), 'priority': (int, None), 'tags': (list, None),
+        'resolve_nested': (bool, None), 'format': (str, ('auto', 'm3u', 'txt')),
+    }
+    TYPE_NAMES = {int: 'integer', float: 'number', bool: 'boolean', str: 'string', list: 'list'}
     
     def __init__(self, config_path: str = "config.json"):
         """
@@ -86,9 +145,18 @@ class IPTVConfig:
             config_path: 配置文件路径
         """
         self.config_path = config_path
-        self.config = self._load_default_config()
-        self._load_config()
-        self._validate_config()
+        self._file_stamp = self._stat()
+        self._registry = None
+        self._merged_sources = (None, None, {})
+        config = self._load_default_config()
+        self._load_config(config)
+        self._validate_config(config)
+        self.snapshot = IPTVConfigSnapshot(config)
+    
+    @property
+    def config(self) -> Dict:
+        """当前快照的原始配置字典 (只读) / Raw dict of the current snapshot, treat as read-only"""
+        return self.snapshot.data
     
     def _load_default_config(self) -> Dict:
         """加载默认配置"""
@@ -111,14 +179,22 @@ class IPTVConfig:
                 "base_dir": "/opt/IPTV-Manager",
                 "data_dir": "data",
                 "backup_dir": "backup",
-                "log_dir": "logs"
+                "log_dir": "logs",
+                "state_dir": "state"
             },
             "download": {
                 "timeout": 30,
                 "retry_count": 3,
                 "retry_delay": 5,
                 "max_workers": 4,
-                "user_agent": "IPTV-Manager/1.0"
+                "user_agent": "IPTV-Manager/1.0",
+                "conditional_requests": True,
+                "breaker_enabled": True,
+                "breaker_threshold": 5,
+                "breaker_cooldown": 3600,
+                "resolve_nested": False,
+                "nested_max_depth": 3,
+                "nested_max_workers": 16
             },
             "maintenance": {
                 "backup_retention_days": 7,
@@ -126,33 +202,102 @@ class IPTVConfig:
                 "enable_backup": True,
                 "enable_cleanup": True
             },
+            "publish": {
+                "keep_generations": 5,
+                "precompress": True,
+                "parse_workers": 1,
+                "parse_min_size_mb": 8
+            },
+            "output": {
+                "formats": [],
+                "merged": ""
+            },
+            "delta": {
+                "history": 20
+            },
+            "health": {
+                "max_age_hours": 26,
+                "max_failed_sources": 0,
+                "max_run_age_hours": 0
+            },
+            "metrics": {
+                "enabled": True,
+                "textfile": "state/iptv_manager.prom"
+            },
+            "tracing": {
+                "enabled": True,
+                "log_level": "DEBUG",
+                "chrome_trace": False
+            },
+            "profile": {
+                "sample_interval": 0.005
+            },
+            "history": {
+                "retention_days": 365
+            },
+            "daemon": {
+                "default_interval": 21600,
+                "adaptive": True,
+                "min_interval": 600,
+                "max_interval": 86400,
+                "adaptive_increase": 1.5,
+                "adaptive_decrease": 0.5,
+                "failure_retry_interval": 900,
+                "batch_window": 60,
+                "maintenance_interval": 86400,
+                "config_check_interval": 5
+            },
+            "server": {
+                "host": "0.0.0.0",
+                "port": 8080,
+                "keepalive_timeout": 30,
+                "backlog": 1024
+            },
             "logging": {
                 "level": "INFO",
                 "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
                 "max_size_mb": 10,
-                "backup_count": 5
+                "backup_count": 5,
+                "json": False
             }
         }
     
-    def _load_config(self):
-        """从文件加载配置 / Load configuration from file"""
+    def _load_config(self, config: Dict):
+        """
+        从文件加载配置并合并到 config / Load configuration from file into config
+        
+        Raises:
+            ValueError: 配置文件不是有效的 JSON 对象 (不回退到默认配置)
+        """
         if os.path.exists(self.config_path):
-            try:
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    user_config = json.load(f)
-                    self._merge_config(self.config, user_config)
-                
-                # 设置语言
-                language = self.config.get('language', 'zh')
-                set_language(language)
-                
-                logging.info(f"{get_text('config_load_success')}: {self.config_path}")
-            except Exception as e:
-                logging.warning(f"{get_text('config_load_fail')}: {e}")
+            self._merge_config(config, self._read_user_config())
+            
+            # 设置语言
+            language = config.get('language', 'zh')
+            set_language(language)
+            
+            logging.info(f"{get_text('config_load_success')}: {self.config_path}")
         else:
-            self._save_config()
+            self._save_config(config)
             logging.info(get_text('config_create_default'))
     
+    def _read_user_config(self) -> Dict:
+        """
+        读取配置文件 / Read the configuration file
+        
+        Raises:
+            ValueError: 配置文件不是有效的 JSON 对象
+        """
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                user_config = json.load(f)
+        except ValueError as e:
+            raise ValueError(f"{get_text('config_parse_failed')} ({self.config_path}): {e}") from e
+        if not isinstance(user_config, dict):
+            raise ValueError(f"{get_text('config_parse_failed')} ({self.config_path}): "
+                             f"{get_text('config_expected_type')} object")
+        return user_config
+    
     def _merge_config(self, default: Dict, user: Dict):
         """递归合并配置"""
         for key, value in user.items():
@@ -164,51 +309,485 @@ class IPTVConfig:
             else:
                 default[key] = value
     
-    def _validate_config(self):
-        """验证配置有效性 / Validate configuration"""
+    def _validate_config(self, config: Dict):
+        """
+        按 SCHEMA 验证配置，一次报告全部错误 / Validate against SCHEMA, reporting every error
+        
+        Raises:
+            ValueError: 配置无效
+        """
         required_keys = ['sources', 'directories', 'download']
         for key in required_keys:
-            if key not in self.config:
+            if key not in config:
                 raise ValueError(f"{get_text('missing_config_key')}: {key}")
         
+        errors = []
+        self._check_value('language', config.get('language', 'zh'), (str, ('zh', 'en')), errors)
+        for section, fields in self.SCHEMA.items():
+            values = config.get(section)
+            if not isinstance(values, dict):
+                errors.append(f"{section}: {get_text('config_expected_type')} object")
+                continue
+            for key, value in values.items():
+                if key in fields:
+                    self._check_value(f"{section}.{key}", value, fields[key], errors)
+                else:
+                    logging.warning(f"{get_text('config_unknown_key')}: {section}.{key}")
+        
         # 验证目录配置
-        base_dir = self.config['directories']['base_dir']
-        if not os.path.isabs(base_dir):
-            raise ValueError(get_text('invalid_base_dir'))
+        base_dir = config['directories'].get('base_dir')
+        if isinstance(base_dir, str) and not os.path.isabs(base_dir):
+            errors.append(f"directories.base_dir: {get_text('invalid_base_dir')}")
+        
+        daemon = config.get('daemon', {})
+        if not errors and daemon['min_interval'] > daemon['max_interval']:
+            errors.append("daemon.min_interval > daemon.max_interval")
+        
+        if not isinstance(config['sources'], dict):
+            errors.append(f"sources: {get_text('config_expected_type')} object")
+        else:
+            filenames = {}
+            for source_id, source in config['sources'].items():
+                if not isinstance(source, dict):
+                    errors.append(f"sources.{source_id}: {get_text('config_expected_type')} object")
+                    continue
+                errors.extend(self.source_errors(source_id, source))
+                filename = source.get('filename')
+                if source.get('enabled', True) and isinstance(filename, str) and self.valid_filename(filename):
+                    if filename in filenames:
+                        errors.append(f"sources.{source_id}.filename: {get_text('config_duplicate_filename')} "
+                                      f"({filenames[filename]}): {filename!r}")
+                    filenames[filename] = source_id
+            
+            # 派生输出 (JSON/TXT/索引) 与合并输出不能覆盖直播源文件或彼此冲突
+            if not errors:
+                formats, merged = config['output']['formats'], config['output']['merged']
+                targets = [(filename, f"sources.{source_id}", []) for filename, source_id in filenames.items()]
+                if merged:
+                    if not self.valid_filename(merged):
+                        errors.append(f"output.merged: {get_text('config_invalid_filename')}: {merged!r}")
+                    targets.append((merged, 'output.merged', [merged]))
+                produced = {}
+                for filename, owner, names in targets:
+                    for name in names + list(IPTVOutputFormats.output_names(filename, formats).values()):
+                        other = f"sources.{filenames[name]}" if name in filenames else produced.get(name)
+                        if other:
+                            errors.append(f"{owner}: {get_text('config_output_conflict')} ({other}): {name!r}")
+                        produced[name] = owner
+        
+        if errors:
+            raise ValueError(f"{get_text('config_invalid')} ({self.config_path}):\n  - " + "\n  - ".join(errors))
+    
+    def source_errors(self, source_id: str, source: Dict) -> List[str]:
+        """单个源的字段、地址和文件名检查，config.json 与注册表共用 / Per-source checks shared with the registry"""
+        errors = []
+        for key, value in source.items():
+            if key in self.SOURCE_SCHEMA:
+                self._check_value(f"sources.{source_id}.{key}", value, self.SOURCE_SCHEMA[key], errors)
+        # 禁用的源允许只写 {"enabled": false}
+        if not source.get('enabled', True):
+            return errors
+        for key in ('url', 'filename'):
+            if key not in source:
+                errors.append(f"sources.{source_id}.{key}: {get_text('config_missing_field')}")
+        url, filename = source.get('url'), source.get('filename')
+        if isinstance(url, str) and urlparse(url).scheme not in ('http', 'https'):
+            errors.append(f"sources.{source_id}.url: {get_text('config_invalid_url')}: {url!r}")
+        if isinstance(filename, str) and not self.valid_filename(filename):
+            errors.append(f"sources.{source_id}.filename: {get_text('config_invalid_filename')}: {filename!r}")
+        return errors
+    
+    @staticmethod
+    def valid_filename(filename: str) -> bool:
+        """文件名不能为空、包含路径分隔符或以点开头 / No empty names, separators or leading dots"""
+        return bool(filename) and '/' not in filename and '\\' not in filename and not filename.startswith('.')
+    
+    def reserved_names(self, snapshot: Optional['IPTVConfigSnapshot'] = None) -> Dict[str, str]:
+        """
+        config.json 占用的文件名 {文件名: 所属}：源文件 (包括禁用的源)、派生文件和合并输出
+        
+        注册表中的源不能与这些文件名冲突
+        """
+        data = (snapshot or self.snapshot).data
+        formats, merged = data['output']['formats'], data['output']['merged']
+        taken = {}
+        for source_id, source in data['sources'].items():
+            filename = source.get('filename')
+            if isinstance(filename, str):
+                for name in [filename] + list(IPTVOutputFormats.output_names(filename, formats).values()):
+                    taken.setdefault(name, f"sources.{source_id}")
+        if merged:
+            for name in [merged] + list(IPTVOutputFormats.output_names(merged, formats).values()):
+                taken.setdefault(name, 'output.merged')
+        return taken
+    
+    def claim_source(self, source_id: str, source: Dict, taken: Dict[str, str],
+                     snapshot: Optional['IPTVConfigSnapshot'] = None) -> List[str]:
+        """
+        检查一个注册表中的源，通过时在 taken 中占用它的源文件和派生文件名
+        
+        Returns:
+            错误列表，为空表示可以使用
+        """
+        data = (snapshot or self.snapshot).data
+        errors = self.source_errors(source_id, dict(source, enabled=True))
+        if source_id in data['sources']:
+            errors.append(f"sources.{source_id}: {get_text('registry_duplicate_id')}")
+        if errors:
+            return errors
+        filename = source['filename']
+        names = [filename] + list(IPTVOutputFormats.output_names(filename, data['output']['formats']).values())
+        for name in names:
+            if name in taken:
+                return [f"sources.{source_id}: {get_text('config_output_conflict')} ({taken[name]}): {name!r}"]
+        for name in names:
+            taken[name] = f"sources.{source_id}"
+        return errors
+    
+    def _check_value(self, key: str, value, rule: Tuple, errors: List[str]):
+        """检查单个值的类型和约束 / Check one value's type and constraint"""
+        expected, constraint = rule
+        if expected is float:
+            valid_type = isinstance(value, (int, float)) and not isinstance(value, bool)
+        elif expected is int:
+            valid_type = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            valid_type = isinstance(value, expected)
+        if not valid_type:
+            errors.append(f"{key}: {get_text('config_expected_type')} {self.TYPE_NAMES[expected]}, {value!r}")
+        elif isinstance(constraint, tuple):
+            if any(item not in constraint for item in (value if expected is list else [value])):
+                errors.append(f"{key}: {get_text('config_invalid_choice')} {'/'.join(constraint)}, {value!r}")
+        elif isinstance(constraint, range):
+            if value not in constraint:
+                errors.append(f"{key}: {get_text('config_out_of_range')} {constraint.start}-{constraint.stop - 1}, {value!r}")
+        elif constraint is not None and value < constraint:
+            errors.append(f"{key}: {get_text('config_out_of_range')} >= {constraint}, {value!r}")
+    
+    def _stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def changed(self) -> bool:
+        """配置文件自上次加载后是否被修改 / Whether config.json changed since the last load"""
+        return self._stat() != self._file_stamp
+    
+    def reload(self):
+        """
+        重新加载配置文件 (用于守护进程模式)
+        
+        新配置完整解析、验证并编译通过后才替换快照，失败时保留当前配置并抛出异常
+        """
+        # 失败时同样记录文件状态，文件再次修改前不重复尝试
+        self._file_stamp = self._stat()
+        config = self._load_default_config()
+        self._merge_config(config, self._read_user_config())
+        self._validate_config(config)
+        self.snapshot = IPTVConfigSnapshot(config)
+        set_language(config.get('language', 'zh'))
+        logging.info(f"{get_text('config_reloaded')}: {self.config_path}")
+    
+    def set(self, key: str, value):
+        """
+        修改配置值并重新编译快照 (不写入文件)
+        
+        Args:
+            key: 以点分隔的键，如 "language" 或 "server.port"
+            value: 新值
+        """
+        config = json.loads(json.dumps(self.config))
+        *parents, last = key.split('.')
+        target = config
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[last] = value
+        self._validate_config(config)
+        self.snapshot = IPTVConfigSnapshot(config)
     
-    def _save_config(self):
+    def _save_config(self, config: Optional[Dict] = None):
         """保存配置到文件 / Save configuration to file"""
         try:
             with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+                json.dump(self.config if config is None else config, f, indent=2, ensure_ascii=False)
+            self._file_stamp = self._stat()
         except Exception as e:
             logging.error(f"{get_text('config_save_failed')}: {e}")
     
     def get(self, key: str, default=None):
-        """获取配置值"""
-        keys = key.split('.')
-        value = self.config
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                return default
-        return value
+        """获取配置值 (以点分隔的键) / Get a value by dotted key"""
+        return self.snapshot.values.get(key, default)
+    
+    @property
+    def registry(self) -> Optional['IPTVSourceRegistry']:
+        """直播源注册表，尚未导入过源时为 None / Source registry, None until sources are imported"""
+        if self._registry is None:
+            registry = IPTVSourceRegistry(self)
+            if not registry.exists():
+                return None
+            self._registry = registry
+        return self._registry
+    
+    def get_sources(self) -> Mapping[str, Mapping]:
+        """
+        获取启用的直播源配置 / Get enabled live source configurations
+        
+        config.json 中的源在前，之后是注册表中按优先级排序的源。注册表中的源与配置使用相同的检查，
+        ID 或文件名 (含派生文件名) 与配置或更高优先级的源冲突的跳过。
+        返回只读视图 (MappingProxyType)，配置快照和注册表都未变化时返回缓存的视图；需要修改时先复制
+        """
+        snapshot = self.snapshot
+        registry = self.registry
+        if registry is None:
+            return snapshot.enabled_sources
+        registered = registry.enabled_sources()
+        if self._merged_sources[0] is snapshot and self._merged_sources[1] is registered:
+            return self._merged_sources[2]
+        
+        sources = dict(snapshot.enabled_sources)
+        taken = self.reserved_names(snapshot)
+        for source_id, source in registered.items():
+            errors = self.claim_source(source_id, source, taken, snapshot)
+            if errors:
+                logging.warning(f"{get_text('registry_rejected')}: {errors[0]}")
+                continue
+            sources[source_id] = MappingProxyType(source)
+        sources = MappingProxyType(sources)
+        self._merged_sources = (snapshot, registered, sources)
+        return sources
     
-    def get_sources(self) -> Dict:
-        """获取启用的直播源配置 / Get enabled live source configurations"""
-        return {k: v for k, v in self.config['sources'].items() if v.get('enabled', True)}
+    def get_source(self, source_id: str) -> Optional[Mapping]:
+        """获取单个源的配置 (包括禁用的源，只读) / Look up one source, enabled or not (read-only)"""
+        source = self.snapshot.data['sources'].get(source_id)
+        if source is not None:
+            return MappingProxyType(source)
+        if self.registry is not None:
+            return self.registry.get(source_id)
+        return None
     
     def get_source_name(self, source_id: str, source_config: Dict) -> str:
         """根据当前语言获取源名称 / Get source name based on current language"""
-        language = self.config.get('language', 'zh')
+        language = self.snapshot.language
         if language == 'en' and 'name_en' in source_config:
             return source_config['name_en']
         return source_config.get('name', source_id)
 
 
+class IPTVConfigSection:
+    """
+    只读配置节 / Read-only, slotted configuration section
+
+    每个 SCHEMA 节对应一个子类，字段按声明类型转换后写入 __slots__。
+    """
+
+    __slots__ = ()
+    FIELD_TYPES: Dict = {}
+
+    def __init__(self, values: Dict):
+        for key, expected in self.FIELD_TYPES.items():
+            value = values.get(key)
+            if value is not None and expected in (int, float):
+                value = expected(value)
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self) -> str:
+        keys = [key for cls in reversed(type(self).__mro__) for key in getattr(cls, '__slots__', ())]
+        fields = ', '.join(f"{key}={getattr(self, key)!r}" for key in keys)
+        return f"{type(self).__name__}({fields})"
+
+
+def _section_class(name: str, schema: Dict) -> type:
+    """根据 SCHEMA 创建配置节类 / Build a slotted section class from a schema"""
+    field_types = {key: expected for key, (expected, _) in schema.items()}
+    return type(name, (IPTVConfigSection,), {
+        '__slots__': tuple(schema),
+        '__annotations__': field_types,
+        'FIELD_TYPES': field_types,
+    })
+
+
+class IPTVSourceConfig(_section_class('IPTVSourceConfigBase', IPTVConfig.SOURCE_SCHEMA)):
+    """编译后的直播源配置 / Compiled source configuration"""
+
+    __slots__ = ('source_id', 'data')
+
+    def __init__(self, source_id: str, data: Dict):
+        super().__init__(data)
+        object.__setattr__(self, 'source_id', source_id)
+        object.__setattr__(self, 'data', data)
+        if self.enabled is None:
+            object.__setattr__(self, 'enabled', True)
+
+
+class IPTVConfigSnapshot:
+    """
+    编译后的配置快照 / Compiled, immutable configuration snapshot
+
+    各节编译为带类型的只读对象 (snapshot.download.timeout)，点分键预先展开为平面字典，
+    启用的源和常用目录预先计算。工作线程在一次运行开始时取得快照，期间的重新加载不会影响它。
+    """
+
+    SECTION_TYPES = {
+        section: _section_class(f"IPTV{section.title()}Config", schema)
+        for section, schema in IPTVConfig.SCHEMA.items()
+    }
+
+    __slots__ = ('data', 'values', 'language', 'sources', 'enabled_sources',
+                 'base_dir', 'data_dir', 'backup_dir', 'log_dir', 'state_dir') + tuple(IPTVConfig.SCHEMA)
+
+    def __init__(self, data: Dict):
+        """
+        编译配置
+
+        Args:
+            data: 已合并默认值并验证过的配置字典
+        """
+        assign = partial(object.__setattr__, self)
+        assign('data', data)
+        values = {}
+        self._flatten(data, '', values)
+        assign('values', values)
+        assign('language', data.get('language', 'zh'))
+        for section, section_type in self.SECTION_TYPES.items():
+            assign(section, section_type(data[section]))
+        sources = {source_id: IPTVSourceConfig(source_id, source) for source_id, source in data['sources'].items()}
+        assign('sources', sources)
+        assign('enabled_sources', MappingProxyType({source_id: MappingProxyType(source.data)
+                                                    for source_id, source in sources.items() if source.enabled}))
+        base_dir = Path(self.directories.base_dir)
+        assign('base_dir', base_dir)
+        assign('data_dir', base_dir / self.directories.data_dir)
+        assign('backup_dir', base_dir / self.directories.backup_dir)
+        assign('log_dir', base_dir / self.directories.log_dir)
+        assign('state_dir', base_dir / (self.directories.state_dir or 'state'))
+
+    def __setattr__(self, key, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    @classmethod
+    def _flatten(cls, data: Dict, prefix: str, values: Dict):
+        for key, value in data.items():
+            path = f"{prefix}{key}"
+            values[path] = value
+            if isinstance(value, dict):
+                cls._flatten(value, f"{path}.", values)
+
+    def source_name(self, source_id: str, source_config: Dict) -> str:
+        """根据语言获取源名称 / Source name for the configured language"""
+        if self.language == 'en' and 'name_en' in source_config:
+            return source_config['name_en']
+        return source_config.get('name', source_id)
+
+
+class IPTVJsonFormatter(logging.Formatter):
+    """
+    JSON 日志格式 / One JSON object per log line
+
+    包含时间、级别、日志器和消息，以及通过 extra 附加的结构化字段 (如 source_id、span)。
+    """
+
+    RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+    def format(self, record) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in self.RESERVED_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class IPTVLogFileHandler(logging.FileHandler):
+    """
+    日志文件处理器 / Dated log file handler with rotation
+
+    写入 iptv_manager_YYYYMMDD.log，跨天时切换到新日期的文件；
+    单个文件超过 logging.max_size_mb 时轮转为 .log.1 ... .log.N (logging.backup_count)。
+    """
+
+    def __init__(self, log_dir: Path, max_bytes: int, backup_count: int):
+        """
+        初始化日志文件处理器
+
+        Args:
+            log_dir: 日志目录
+            max_bytes: 单个文件最大字节数，0 表示不按大小轮转
+            backup_count: 按大小轮转保留的文件数
+        """
+        self.log_dir = Path(log_dir)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.day = datetime.now().strftime('%Y%m%d')
+        self.rollover_at = self._next_midnight()
+        super().__init__(str(self._path_for(self.day)), mode='a', encoding='utf-8', delay=True)
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            super().emit(record)
+        except Exception:
+            self.handleError(record)
+
+    def _path_for(self, day: str) -> Path:
+        return self.log_dir / f"iptv_manager_{day}.log"
+
+    @staticmethod
+    def _next_midnight() -> float:
+        tomorrow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        return tomorrow.timestamp()
+
+    def shouldRollover(self, record) -> bool:
+        if record.created >= self.rollover_at:
+            return True
+        if self.max_bytes > 0 and self.backup_count > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            # 超过上限后的下一条记录触发轮转，避免为计算长度重复格式化
+            return self.stream.tell() >= self.max_bytes
+        return False
+
+    def doRollover(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if time.time() >= self.rollover_at:
+            self.day = datetime.now().strftime('%Y%m%d')
+            self.rollover_at = self._next_midnight()
+            self.baseFilename = os.path.abspath(self._path_for(self.day))
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.baseFilename}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.baseFilename}.{index + 1}")
+        if os.path.exists(self.baseFilename):
+            os.replace(self.baseFilename, f"{self.baseFilename}.1")
+
+
 class IPTVLogger:
-    """IPTV日志管理类"""
+    """
+    IPTV日志管理类
+
+    日志记录经 QueueHandler 放入队列，由后台 QueueListener 线程写入文件和控制台，
+    下载线程不会阻塞在磁盘 I/O 上。同一进程中多次创建时替换旧的处理器而不是重复添加。
+    """
+    
+    _listener = None
+    _queue_handler = None
+    _atexit_registered = False
     
     def __init__(self, config: IPTVConfig):
         """
@@ -219,20 +798,27 @@ class IPTVLogger:
         """
         self.config = config
         self._setup_logging()
+        if not IPTVLogger._atexit_registered:
+            atexit.register(IPTVLogger.shutdown)
+            IPTVLogger._atexit_registered = True
     
     def _setup_logging(self):
         """设置日志配置"""
+        import queue
+        import logging.handlers
         log_dir = Path(self.config.get('directories.base_dir')) / self.config.get('directories.log_dir')
         log_dir.mkdir(parents=True, exist_ok=True)
         
-        log_file = log_dir / f"iptv_manager_{datetime.now().strftime('%Y%m%d')}.log"
-        
         # 配置日志格式
         formatter = logging.Formatter(self.config.get('logging.format'))
         
-        # 文件处理器
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setFormatter(formatter)
+        # 文件处理器 (按日期命名，按大小轮转)
+        file_handler = IPTVLogFileHandler(
+            log_dir,
+            max_bytes=int(self.config.get('logging.max_size_mb', 10) * 1024 * 1024),
+            backup_count=self.config.get('logging.backup_count', 5)
+        )
+        file_handler.setFormatter(IPTVJsonFormatter() if self.config.get('logging.json', False) else formatter)
         
         # 控制台处理器
         console_handler = logging.StreamHandler()
@@ -240,9 +826,36 @@ class IPTVLogger:
         
         # 配置根日志器
         logger = logging.getLogger()
+        self.shutdown()
+        self._remove_implicit_handlers(logger)
         logger.setLevel(getattr(logging, self.config.get('logging.level', 'INFO')))
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        
+        log_queue = queue.Queue(-1)
+        IPTVLogger._queue_handler = logging.handlers.QueueHandler(log_queue)
+        IPTVLogger._listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler,
+                                                              respect_handler_level=True)
+        IPTVLogger._listener.start()
+        logger.addHandler(IPTVLogger._queue_handler)
+    
+    @staticmethod
+    def _remove_implicit_handlers(logger: logging.Logger):
+        # 处理器挂载前调用 logging.info 等函数会隐式执行 basicConfig，导致每条日志输出两次
+        for handler in list(logger.handlers):
+            formatter = getattr(handler, 'formatter', None)
+            if type(handler) is logging.StreamHandler and formatter is not None and formatter._fmt == logging.BASIC_FORMAT:
+                logger.removeHandler(handler)
+    
+    @classmethod
+    def shutdown(cls):
+        """停止后台写入线程并写出剩余日志 / Stop the listener and flush pending records"""
+        if cls._listener is None:
+            return
+        logging.getLogger().removeHandler(cls._queue_handler)
+        cls._listener.stop()
+        for handler in cls._listener.handlers:
+            handler.close()
+        cls._listener = None
+        cls._queue_handler = None
     
     def cleanup_old_logs(self):
         """清理过期日志文件"""
@@ -254,7 +867,9 @@ class IPTVLogger:
         cutoff_date = datetime.now() - timedelta(days=retention_days)
         
         try:
-            for log_file in log_dir.glob("iptv_manager_*.log"):
+            log_files = [log_file for pattern in ("iptv_manager_*.log*", "trace_*.json", "profile_*", "status_report_*.txt")
+                         for log_file in log_dir.glob(pattern)]
+            for log_file in log_files:
                 if log_file.stat().st_mtime < cutoff_date.timestamp():
                     log_file.unlink()
                     logging.info(f"{get_text('deleted_log')}: {log_file}")
@@ -262,217 +877,3249 @@ class IPTVLogger:
             logging.error(f"{get_text('cleanup_failed')}: {e}")
 
 
-class IPTVDownloader:
-    """IPTV下载器类"""
-    
-    def __init__(self, config: IPTVConfig):
+class IPTVLogViewer:
+    """
+    日志查看器 / Streaming log viewer
+
+    - 从文件末尾按块反向读取，tail 最近 N 条记录无需读取整个文件
+    - 按级别、源和时间范围过滤；起始时间在文件内二分定位，之后流式读取
+    - follow 模式持续输出新日志，跨天或轮转时自动切换文件
+    日志文件按文件名 (日期与轮转序号) 排序，无需 stat 每个文件。
+    多行记录 (如异常堆栈) 与其首行一起过滤。
+    """
+
+    BLOCK_SIZE = 64 * 1024
+    LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
+    FILE_PATTERN = re.compile(r'^iptv_manager_(\d{8})\.log(?:\.(\d+))?$')
+    TIMESTAMP_PATTERN = re.compile(r'^(\d{4}-\d\d-\d\d[ T]\d\d:\d\d:\d\d)')
+    LEVEL_PATTERN = re.compile(r'\b(DEBUG|INFO|WARNING|ERROR|CRITICAL)\b')
+    # 没有首行的连续行最多合并的行数
+    MAX_CONTINUATION = 200
+
+    def __init__(self, config: IPTVConfig, level: Optional[str] = None, source: Optional[str] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None):
         """
-        初始化下载器
-        
+        初始化日志查看器
+
         Args:
             config: 配置管理器实例
+            level: 最低日志级别
+            source: 只显示包含该源的记录
+            since: 起始时间
+            until: 结束时间
         """
         self.config = config
-        self.session = self._create_session()
-        self._setup_directories()
-    
-    def _create_session(self) -> requests.Session:
-        """创建HTTP会话"""
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': self.config.get('download.user_agent'),
-            'Accept': '*/*',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive'
-        })
-        return session
-    
-    def _setup_directories(self):
-        """创建必要的目录结构"""
-        base_dir = Path(self.config.get('directories.base_dir'))
-        
-        directories = [
-            base_dir,
-            base_dir / self.config.get('directories.data_dir'),
-            base_dir / self.config.get('directories.backup_dir'),
-            base_dir / self.config.get('directories.log_dir')
-        ]
-        
-        for directory in directories:
-            directory.mkdir(parents=True, exist_ok=True)
-            # 设置目录权限 (755)
-            os.chmod(directory, 0o755)
-            logging.debug(f"{get_text('create_directory')}: {directory}")    
+        self.min_level = self.LEVELS.get((level or 'DEBUG').upper(), 0)
+        self.source = source
+        # 按完整单词匹配源，避免短ID匹配到其他文本
+        self.source_pattern = re.compile(r'(?<![\w-])' + re.escape(source) + r'(?![\w-])') if source else None
+        # 时间以 "YYYY-MM-DD HH:MM:SS" 字符串比较，与日志时间戳格式一致
+        self.since = since.strftime('%Y-%m-%d %H:%M:%S') if since else None
+        self.until = until.strftime('%Y-%m-%d %H:%M:%S') if until else None
 
-    def _detect_encoding(self, content: bytes) -> str:
-        """检测文件编码 / Detect file encoding"""
+    @property
+    def log_dir(self) -> Path:
+        return Path(self.config.get('directories.base_dir')) / self.config.get('directories.log_dir')
+
+    @staticmethod
+    def parse_time(value: str) -> datetime:
+        """
+        解析时间参数：YYYY-MM-DD、YYYY-MM-DD HH:MM[:SS]，或相对时间 30m、2h、7d
+
+        Raises:
+            ValueError: 无法解析
+        """
+        value = value.strip()
+        match = re.fullmatch(r'(\d+(?:\.\d+)?)([smhd])', value)
+        if match:
+            seconds = float(match.group(1)) * {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+            return datetime.now() - timedelta(seconds=seconds)
+        for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+        raise ValueError(f"{get_text('log_invalid_time')}: {value}")
+
+    def log_files(self) -> List[Path]:
+        """按时间顺序 (旧到新) 返回日志文件 / Log files, oldest first"""
+        entries = []
         try:
-            result = chardet.detect(content)
-            encoding = result.get('encoding', 'utf-8')
-            confidence = result.get('confidence', 0)
-            
-            if confidence < 0.7:
-                logging.warning(f"{get_text('encoding_detection_low')}: {confidence}, {get_text('encoding_detection_failed')}")
-                return 'utf-8'
-            
-            logging.debug(f"{get_text('detected_encoding')}: {encoding}, {get_text('confidence')}: {confidence}")
-            return encoding
-        except Exception as e:
-            logging.warning(f"{get_text('encoding_detection_failed')}: {e}")
-            return 'utf-8'
-    
-    def _download_source(self, source_id: str, source_config: Dict) -> Tuple[bool, str]:
+            names = os.listdir(self.log_dir)
+        except OSError:
+            return []
+        for name in names:
+            match = self.FILE_PATTERN.match(name)
+            if match:
+                # 同一天内 .log.N 序号越大越旧，未带序号的 .log 最新
+                entries.append((match.group(1), -int(match.group(2) or 0), name))
+        entries.sort()
+        if self.since or self.until:
+            since_day = self.since[:10].replace('-', '') if self.since else '00000000'
+            until_day = self.until[:10].replace('-', '') if self.until else '99999999'
+            entries = [entry for entry in entries if since_day <= entry[0] <= until_day]
+        return [self.log_dir / name for _, _, name in entries]
+
+    def newest_file(self) -> Optional[Path]:
+        files = self.log_files()
+        return files[-1] if files else None
+
+    def _header(self, line: str) -> Optional[Tuple[Optional[str], Optional[str], str]]:
         """
-        下载单个直播源
-        
-        Args:
-            source_id: 源标识符
-            source_config: 源配置信息
-            
+        解析记录首行
+
         Returns:
-            (成功标志, 错误信息)
+            (时间戳, 级别, 源) ；不是记录首行时返回 None
         """
-        url = source_config['url']
-        filename = source_config['filename']
-        name = self.config.get_source_name(source_id, source_config)
-        
-        logging.info(f"{get_text('download_source')} {name}: {url}")
-        
-        retry_count = self.config.get('download.retry_count', 3)
-        retry_delay = self.config.get('download.retry_delay', 5)
-        timeout = self.config.get('download.timeout', 30)
-        
-        for attempt in range(retry_count):
+        if line.startswith('{'):
             try:
-                response = self.session.get(url, timeout=timeout, stream=True)
-                response.raise_for_status()
-                
-                # 获取内容
-                content = response.content
-                if not content:
-                    raise ValueError(get_text('empty_content'))
-                
-                # 检测编码并解码
-                encoding = self._detect_encoding(content)
-                try:
-                    text_content = content.decode(encoding)
-                except UnicodeDecodeError:
-                    text_content = content.decode('utf-8', errors='ignore')
-                    logging.warning(f"{get_text('force_utf8')}: {filename}")
-                
-                # 验证M3U格式
-                if not self._validate_m3u_content(text_content):
-                    raise ValueError(get_text('invalid_m3u'))
-                
-                # 保存文件
-                data_dir = Path(self.config.get('directories.base_dir')) / self.config.get('directories.data_dir')
-                file_path = data_dir / filename
-                
-                # 备份现有文件
-                if file_path.exists() and self.config.get('maintenance.enable_backup', True):
-                    self._backup_file(file_path)
-                
-                # 写入新文件
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(text_content)
-                
-                # 设置文件权限 (644)
-                os.chmod(file_path, 0o644)
-                
-                file_size = len(text_content)
-                channel_count = text_content.count('#EXTINF:')
-                
-                logging.info(f"{get_text('download_success')} {name}: {filename} ({file_size} bytes, {channel_count} {get_text('channels')})")
-                return True, ""
-                
-            except requests.exceptions.RequestException as e:
-                error_msg = f"{get_text('network_error')}: {e}"
-                logging.warning(f"{get_text('download_failed')} {name} ({get_text('download_retry')} {attempt + 1}/{retry_count}): {error_msg}")
-                
-                if attempt < retry_count - 1:
-                    time.sleep(retry_delay)
-                else:
-                    logging.error(f"{get_text('download_final_failed')} {name}: {error_msg}")
-                    return False, error_msg
-                    
-            except Exception as e:
-                error_msg = f"{get_text('unknown_error')}: {e}"
-                logging.error(f"{get_text('download_failed')} {name}: {error_msg}")
-                return False, error_msg
-        
-        return False, get_text('retry_exhausted')
-    
-    def _validate_m3u_content(self, content: str) -> bool:
-        """验证M3U文件内容格式 / Validate M3U file content format"""
-        if not content.strip():
+                entry = json.loads(line)
+            except ValueError:
+                return None
+            timestamp = str(entry.get('time', ''))[:19].replace('T', ' ') or None
+            return timestamp, entry.get('level'), str(entry.get('source_id') or '')
+        match = self.TIMESTAMP_PATTERN.match(line)
+        if not match:
+            return None
+        if not self.min_level:
+            return match.group(1).replace('T', ' '), None, ''
+        # 级别位于行首附近，只在前 100 个字符内查找
+        level = self.LEVEL_PATTERN.search(line, 19, 100)
+        return match.group(1).replace('T', ' '), level.group(1) if level else None, ''
+
+    def _matches(self, header: Tuple[Optional[str], Optional[str], str], text: str) -> bool:
+        timestamp, level, source_id = header
+        if self.min_level and self.LEVELS.get(level, 0) < self.min_level:
             return False
-        
-        lines = content.strip().split('\n')
-        if not lines[0].strip().startswith('#EXTM3U'):
-            logging.warning(get_text('m3u_missing_header'))
-        
-        # 检查是否包含频道信息
-        has_extinf = any(line.strip().startswith('#EXTINF:') for line in lines)
-        has_urls = any(line.strip().startswith('http') for line in lines)
-        
-        return has_extinf and has_urls
-    
-    def _backup_file(self, file_path: Path):
-        """备份现有文件 / Backup existing file"""
-        try:
-            backup_dir = Path(self.config.get('directories.base_dir')) / self.config.get('directories.backup_dir')
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_name = f"{file_path.stem}_{timestamp}{file_path.suffix}"
-            backup_path = backup_dir / backup_name
-            
+        if timestamp is not None:
+            if self.since and timestamp < self.since:
+                return False
+            if self.until and timestamp > self.until:
+                return False
+        if self.source and self.source != source_id and not self.source_pattern.search(text):
+            return False
+        return True
+
+    def _reverse_lines(self, path: Path):
+        """从文件末尾按块反向逐行读取 / Yield lines from the end of a file"""
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            remainder = b''
+            while position > 0:
+                size = min(self.BLOCK_SIZE, position)
+                position -= size
+                f.seek(position)
+                lines = (f.read(size) + remainder).split(b'\n')
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    yield line.rstrip(b'\r').decode('utf-8', errors='replace')
+            yield remainder.rstrip(b'\r').decode('utf-8', errors='replace')
+
+    def tail(self, count: int) -> List[str]:
+        """
+        返回最近 count 条符合条件的记录 (多行记录算作一条)
+
+        Args:
+            count: 记录数
+        """
+        records = []
+        for path in reversed(self.log_files()):
+            pending = []
+            for line in self._reverse_lines(path):
+                if not line:
+                    continue
+                header = self._header(line)
+                if header is None and len(pending) < self.MAX_CONTINUATION:
+                    pending.append(line)
+                    continue
+                lines = [line] + pending[::-1]
+                pending = []
+                if header is None or self._matches(header, "\n".join(lines)):
+                    records.append(lines)
+                    if len(records) >= count:
+                        return [line for record in reversed(records) for line in record]
+                # 起始时间之前的记录无需继续向前读取
+                if header is not None and self.since and header[0] is not None and header[0] < self.since:
+                    return [line for record in reversed(records) for line in record]
+        return [line for record in reversed(records) for line in record]
+
+    def _seek_since(self, f, size: int):
+        """在按时间排序的文件中二分定位起始时间 / Binary search the start offset"""
+        low, high = 0, size
+        while high - low > self.BLOCK_SIZE:
+            middle = (low + high) // 2
+            f.seek(middle)
+            f.readline()
+            timestamp = None
+            for _ in range(self.MAX_CONTINUATION):
+                line = f.readline()
+                if not line:
+                    break
+                header = self._header(line.decode('utf-8', errors='replace'))
+                if header is not None and header[0] is not None:
+                    timestamp = header[0]
+                    break
+            if timestamp is None or timestamp >= self.since:
+                high = middle
+            else:
+                low = middle
+        f.seek(low)
+        if low:
+            f.readline()
+
+    def _filter_forward(self, lines):
+        """顺序过滤，连续行跟随其首行的结果 / Filter lines in order"""
+        keep = True
+        for line in lines:
+            header = self._header(line)
+            if header is not None:
+                # 日志按时间顺序写入，超过结束时间后不再继续读取
+                if self.until and header[0] is not None and header[0] > self.until:
+                    return
+                keep = self._matches(header, line)
+            if keep:
+                yield line
+
+    def scan(self):
+        """按时间顺序流式输出符合条件的行 / Stream matching lines, oldest first"""
+        def lines():
+            for path in self.log_files():
+                with open(path, 'rb') as f:
+                    if self.since:
+                        self._seek_since(f, os.fstat(f.fileno()).st_size)
+                    for raw in f:
+                        line = raw.rstrip(b'\r\n').decode('utf-8', errors='replace')
+                        if line:
+                            yield line
+        yield from self._filter_forward(lines())
+
+    def follow(self, interval: float = 0.5):
+        """持续输出新写入的行，直到被中断 / Yield new lines until interrupted"""
+        def lines():
+            path = self.newest_file()
+            f = open(path, 'rb') if path else None
+            if f:
+                f.seek(0, os.SEEK_END)
+            buffer = b''
+            try:
+                while True:
+                    chunk = f.read() if f else b''
+                    if chunk:
+                        buffer += chunk
+                        *complete, buffer = buffer.split(b'\n')
+                        for raw in complete:
+                            yield raw.rstrip(b'\r').decode('utf-8', errors='replace')
+                        continue
+                    time.sleep(interval)
+                    # 跨天产生新文件或当前文件被轮转时切换
+                    newest = self.newest_file()
+                    rotated = f is not None and path is not None and (
+                        not path.exists() or os.stat(path).st_ino != os.fstat(f.fileno()).st_ino)
+                    if newest is not None and (newest != path or rotated):
+                        # 先读完旧文件：上次读取到发现切换之间写入的行不丢失，末尾不完整的行也输出
+                        if f:
+                            buffer += f.read()
+                            f.close()
+                        for raw in buffer.split(b'\n'):
+                            if raw:
+                                yield raw.rstrip(b'\r').decode('utf-8', errors='replace')
+                        path, f, buffer = newest, open(newest, 'rb'), b''
+            finally:
+                if f:
+                    f.close()
+        yield from self._filter_forward(lines())
+
+
+class IPTVPlaylist:
+    """
+    M3U播放列表解析 / M3U playlist parsing
+
+    频道条目为字典: id, name, group, url, extinf, extras
+    """
+
+    ATTR_PATTERN = re.compile(r'([A-Za-z0-9_-]+)="([^"]*)"')
+    # M3U 校验规则：存在以 #EXTINF: 开头的行和以 http 开头的行 (_validate_m3u_content / scan_file)
+    EXTINF_LINE = re.compile(r'^\s*#EXTINF:', re.MULTILINE)
+    URL_LINE = re.compile(r'^\s*http', re.MULTILINE)
+    EXTINF_LINE_BYTES = re.compile(rb'^\s*#EXTINF:', re.MULTILINE)
+    URL_LINE_BYTES = re.compile(rb'^\s*http', re.MULTILINE)
+    SCAN_CHUNK = 1024 * 1024
+    # 并行解析时每个工作进程分到的字节范围数，范围大小不均时保持负载均衡
+    RANGES_PER_WORKER = 4
+    _pool = None
+    _pool_lock = threading.Lock()
+    _atexit_registered = False
+
+    @staticmethod
+    def split_extinf(line: str) -> Tuple[str, str]:
+        """
+        拆分 #EXTINF 行为属性部分和频道名 (忽略引号内的逗号)
+
+        Returns:
+            (属性部分, 频道名)
+        """
+        # 逗号之前的引号数为偶数时不在引号内；用 find/count 代替逐字符循环
+        index = line.find(',')
+        quotes = line.count('"', 0, index) if index != -1 else 0
+        while quotes % 2:
+            previous, index = index, line.find(',', index + 1)
+            if index == -1:
+                break
+            quotes += line.count('"', previous, index)
+        if index == -1:
+            return line, ''
+        return line[:index], line[index + 1:].strip()
+
+    @classmethod
+    def parse_attributes(cls, extinf: str) -> Dict[str, str]:
+        """解析 #EXTINF 行中的 key="value" 属性 / Parse key="value" attributes"""
+        return dict(cls.ATTR_PATTERN.findall(cls.split_extinf(extinf)[0]))
+
+    @classmethod
+    def iter_entries(cls, text: str):
+        """
+        逐个产生频道条目的原始字段 / Yield raw channel fields
+
+        Yields:
+            (name, group, tvg_id, url, extinf, extras)
+        """
+        extinf = None
+        extras = []
+        split_extinf, findall = cls.split_extinf, cls.ATTR_PATTERN.findall
+        for raw_line in text.splitlines():
+            line = raw_line.strip()
+            if not line:
+                continue
+            if line.startswith('#EXTINF:'):
+                extinf, extras = line, []
+            elif line.startswith('#'):
+                if extinf is not None:
+                    extras.append(line)
+            elif extinf is not None:
+                head, name = split_extinf(extinf)
+                attributes = dict(findall(head))
+                yield name, attributes.get('group-title', ''), attributes.get('tvg-id', ''), line, extinf, extras
+                extinf, extras = None, []
+
+    @classmethod
+    def parse(cls, text: str) -> List[Dict]:
+        """
+        解析M3U文本为频道列表
+
+        Args:
+            text: M3U文本内容
+
+        Returns:
+            频道条目列表 (保持原有顺序)
+        """
+        channels = [
+            {'name': name, 'group': group, 'tvg_id': tvg_id, 'url': url, 'extinf': extinf, 'extras': extras}
+            for name, group, tvg_id, url, extinf, extras in cls.iter_entries(text)
+        ]
+        cls.assign_ids(channels)
+        return channels
+
+    @staticmethod
+    def entry_spans(text: str) -> List[Tuple[int, int]]:
+        """
+        各频道条目 (#EXTINF 行至地址行) 在 UTF-8 编码后文本中的字节范围，与 parse 的结果一一对应
+
+        Returns:
+            [(起始偏移, 结束偏移)]
+        """
+        spans = []
+        start = None
+        position = 0
+        ascii_only = text.isascii()
+        for line in text.splitlines(keepends=True):
+            size = len(line) if ascii_only else len(line.encode('utf-8'))
+            stripped = line.strip()
+            if stripped.startswith('#EXTINF:'):
+                start = position
+            elif stripped and start is not None and not stripped.startswith('#'):
+                spans.append((start, position + size))
+                start = None
+            position += size
+        return spans
+
+    @staticmethod
+    def split_ranges(buffer, count: int) -> List[Tuple[int, int]]:
+        """
+        将缓冲区切分为约 count 个字节范围，除第一个外都从 #EXTINF 行开始
+
+        Returns:
+            [(起始偏移, 结束偏移)]
+        """
+        size = len(buffer)
+        boundaries = [0]
+        for index in range(1, count):
+            position = buffer.find(b'\n#EXTINF:', max(boundaries[-1], size * index // count))
+            if position == -1:
+                break
+            boundaries.append(position + 1)
+        boundaries.append(size)
+        return list(zip(boundaries, boundaries[1:]))
+
+    @classmethod
+    def _executor(cls, workers: int):
+        """进程池在进程内复用 (守护进程中常驻)，进程数变化时重建 / Shared process pool"""
+        with cls._pool_lock:
+            if cls._pool is None or cls._pool[0] != workers:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                if cls._pool is not None:
+                    cls._pool[1].shutdown(wait=False)
+                # forkserver 从单线程的服务进程派生工作进程，避免在下载线程或服务器线程中直接 fork
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                cls._pool = (workers, ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method)))
+                if not cls._atexit_registered:
+                    atexit.register(cls.shutdown_pool)
+                    cls._atexit_registered = True
+            return cls._pool[1]
+
+    @classmethod
+    def shutdown_pool(cls, executor=None):
+        """
+        关闭共享进程池；给定 executor 时只在它仍是当前进程池时丢弃 (已损坏的进程池不等待)
+
+        Args:
+            executor: 要丢弃的进程池，None 表示正常关闭当前进程池
+        """
+        with cls._pool_lock:
+            if cls._pool is None or (executor is not None and cls._pool[1] is not executor):
+                return
+            pool, cls._pool = cls._pool[1], None
+        pool.shutdown(wait=executor is None, cancel_futures=True)
+
+    @classmethod
+    def parse_file(cls, path: Path, workers: int = 1, min_size: int = 0) -> List[Dict]:
+        """
+        解析已保存的播放列表 (UTF-8)，结果与 parse 相同
+
+        workers 不为 1 且文件不小于 min_size 字节时，按 #EXTINF 行切分为多个字节范围，
+        在进程池中并行解析。工作进程直接读取自己的范围并按范围内的出现序号计算ID，
+        以一个 \\x00 分隔的字符串返回字段 (不逐个频道序列化对象)；合并时只需修正
+        在之前范围中出现过的键的ID。
+
+        Args:
+            path: M3U 文件路径
+            workers: 进程数，0 为 CPU 核数
+            min_size: 启用并行解析的最小文件大小 (字节)
+        """
+        workers = workers or os.cpu_count() or 1
+        with cls.map_file(path) as buffer:
+            # 含 \x00 的文件不能使用紧凑的返回格式
+            parallel = workers > 1 and len(buffer) >= max(min_size, 1) and buffer.find(b'\x00') == -1
+            ranges = cls.split_ranges(buffer, workers * cls.RANGES_PER_WORKER) if parallel else []
+            if len(ranges) < 2:
+                return cls.parse(str(buffer, 'utf-8', 'replace'))
+
+            stat = os.stat(path)
+            identity = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+            from concurrent.futures.process import BrokenProcessPool
+            # 工作进程异常退出 (如被 OOM 终止) 后进程池不可再用：重建一次并重试，仍失败时串行解析
+            for attempt in range(2):
+                executor = None
+                try:
+                    executor = cls._executor(workers)
+                    payloads = list(executor.map(_parse_playlist_range, [str(path)] * len(ranges),
+                                                 *zip(*ranges), [identity] * len(ranges)))
+                    break
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        if executor is not None:
+                            cls.shutdown_pool(executor)
+                        if attempt == 0:
+                            continue
+                    logging.warning(f"{get_text('parallel_parse_failed')}: {e}")
+                    return cls.parse(str(buffer, 'utf-8', 'replace'))
+
+        import gc
+        channels = []
+        append = channels.append
+        # 之前各范围中每个键的出现次数
+        occurrences = {}
+        # 合并时创建大量不构成循环引用的字典，暂停循环垃圾回收
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for payload in payloads:
+                if not payload:
+                    continue
+                counts = {}
+                fields = iter(payload.split('\x00'))
+                for channel_id, name, group, tvg_id, url, extinf, extras in zip(*[fields] * 7):
+                    key = tvg_id or name
+                    local = counts.get(key, 0)
+                    counts[key] = local + 1
+                    if key in occurrences:
+                        channel_id = cls.channel_id(key, occurrences[key] + local)
+                    append({'name': name, 'group': group, 'tvg_id': tvg_id, 'url': url, 'extinf': extinf,
+                            'extras': extras.split('\n') if extras else [], 'id': channel_id})
+                for key, count in counts.items():
+                    occurrences[key] = occurrences.get(key, 0) + count
+        finally:
+            if gc_enabled:
+                gc.enable()
+        return channels
+
+    @staticmethod
+    def channel_id(key: str, occurrence: int) -> str:
+        """第 occurrence 个以 key 为键的频道的ID / ID of the n-th channel with this key"""
+        import hashlib
+        return hashlib.sha1(f"{key}\x00{occurrence}".encode('utf-8')).hexdigest()[:12]
+
+    @classmethod
+    def assign_ids(cls, channels: List[Dict]):
+        """
+        为频道分配稳定ID：以 tvg-id (没有时为频道名) 及其出现序号为键，
+        地址变化时ID保持不变
+        """
+        channel_id = cls.channel_id
+        occurrences = {}
+        for channel in channels:
+            key = channel['tvg_id'] or channel['name']
+            occurrence = occurrences.get(key, 0)
+            occurrences[key] = occurrence + 1
+            channel['id'] = channel_id(key, occurrence)
+
+    @staticmethod
+    @contextmanager
+    def map_file(path: Path):
+        """只读映射文件，空文件得到 b'' / Memory-map a stored file read-only"""
+        import mmap
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b''
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield buffer
+
+    @classmethod
+    def count_in(cls, buffer, pattern: bytes) -> int:
+        """
+        统计映射缓冲区中的出现次数 (mmap 没有 count)：逐块切片后用 bytes.count，
+        块之间重叠 len(pattern) - 1 字节，堆内存只占一个块
+        """
+        count = 0
+        overlap = len(pattern) - 1
+        for start in range(0, len(buffer), cls.SCAN_CHUNK):
+            count += buffer[start:start + cls.SCAN_CHUNK + overlap].count(pattern)
+        return count
+
+    @classmethod
+    def scan_file(cls, path: Path, content_hash: bool = True) -> Dict:
+        """
+        扫描已保存的播放列表，不把文件读入 Python 字符串
+
+        Args:
+            path: M3U 文件路径
+            content_hash: 是否计算 SHA-256
+
+        Returns:
+            {size, channels, valid[, content_hash]}
+        """
+        import hashlib
+        with cls.map_file(path) as buffer:
+            info = {
+                'size': len(buffer),
+                'channels': cls.count_in(buffer, b'#EXTINF:'),
+                'valid': bool(cls.EXTINF_LINE_BYTES.search(buffer) and cls.URL_LINE_BYTES.search(buffer)),
+            }
+            if content_hash:
+                info['content_hash'] = hashlib.sha256(buffer).hexdigest()
+        return info
+
+    @staticmethod
+    def render(channels: List[Dict]) -> str:
+        """将频道列表写回M3U文本 / Render channels back to M3U text"""
+        lines = ['#EXTM3U']
+        for channel in channels:
+            lines.append(channel['extinf'])
+            lines.extend(channel.get('extras', []))
+            lines.append(channel['url'])
+        return '\n'.join(lines) + '\n'
+
+
+def _parse_playlist_range(path: str, start: int, end: int, identity: Tuple[int, int, int]) -> str:
+    """
+    并行解析的工作函数：解析文件中的一个字节范围 / Process-pool worker for IPTVPlaylist.parse_file
+
+    Returns:
+        每个频道 7 个字段 (按范围内序号计算的ID、name、group、tvg_id、url、extinf、以换行连接的 extras)，
+        全部以 \\x00 连接的字符串
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        stat = os.fstat(fd)
+        # 文件在切分后被替换时放弃，由调用方串行解析
+        if (stat.st_dev, stat.st_ino, stat.st_mtime_ns) != tuple(identity):
+            raise RuntimeError(f"{path} changed during parsing")
+        text = os.pread(fd, end - start, start).decode('utf-8', errors='replace')
+    finally:
+        os.close(fd)
+    fields = []
+    occurrences = {}
+    for name, group, tvg_id, url, extinf, extras in IPTVPlaylist.iter_entries(text):
+        key = tvg_id or name
+        occurrence = occurrences.get(key, 0)
+        occurrences[key] = occurrence + 1
+        fields += (IPTVPlaylist.channel_id(key, occurrence), name, group, tvg_id, url, extinf, '\n'.join(extras))
+    return '\x00'.join(fields)
+
+
+class IPTVTxtPlaylist:
+    """
+    TXT 格式直播源 / "name,url" text playlists
+
+    国内常见的文本格式：每行 "频道名,地址"，"分组名,#genre#" 开始一个分组，
+    同一行的多个地址以 # 分隔。逐行流式读取，转换为 M3U 后与 M3U 源走相同的校验和发布流程。
+    """
+
+    GENRE_MARKER = '#genre#'
+    SCHEME_PATTERN = re.compile(r'^[A-Za-z][A-Za-z0-9+.-]*://')
+    # 自动检测时查看的文本长度
+    DETECT_BYTES = 4096
+
+    @classmethod
+    def detect(cls, text: str) -> str:
+        """
+        根据开头内容判断格式
+
+        Returns:
+            'm3u' 或 'txt'
+        """
+        head = text[:cls.DETECT_BYTES].lstrip('\ufeff \t\r\n')
+        if head.startswith('#EXTM3U') or '#EXTINF' in head:
+            return 'm3u'
+        for line in head.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            _, separator, rest = line.partition(',')
+            rest = rest.strip()
+            if separator and (rest == cls.GENRE_MARKER or cls.SCHEME_PATTERN.match(rest)):
+                return 'txt'
+            break
+        return 'm3u'
+
+    @classmethod
+    def iter_channels(cls, lines):
+        """
+        逐行读取频道 / Stream channels from lines
+
+        Args:
+            lines: 文本行的可迭代对象 (如文件对象或 str.splitlines())
+
+        Yields:
+            (分组, 频道名, 地址)
+        """
+        group = ''
+        match_scheme = cls.SCHEME_PATTERN.match
+        for line in lines:
+            name, separator, urls = line.partition(',')
+            if not separator:
+                continue
+            urls = urls.strip()
+            name = name.strip()
+            if urls == cls.GENRE_MARKER:
+                group = name
+                continue
+            if '#' not in urls:
+                if match_scheme(urls):
+                    yield group, name, urls
+                continue
+            # 多个备用地址以 # 分隔；不以协议开头的片段属于前一个地址 (如 URL 片段)
+            current = ''
+            for part in urls.split('#'):
+                if match_scheme(part):
+                    if current:
+                        yield group, name, current
+                    current = part
+                elif current:
+                    current = f"{current}#{part}"
+            if current:
+                yield group, name, current
+
+    @classmethod
+    def to_m3u(cls, text: str) -> str:
+        """转换为 M3U 文本 / Convert TXT playlist text to M3U"""
+        lines = ['#EXTM3U']
+        append = lines.append
+        extinf_cache = {}
+        for group, name, url in cls.iter_channels(text.lstrip('\ufeff').splitlines()):
+            prefix = extinf_cache.get(group)
+            if prefix is None:
+                prefix = extinf_cache[group] = (f'#EXTINF:-1 group-title="{group.replace(chr(34), chr(39))}",'
+                                                if group else '#EXTINF:-1,')
+            append(prefix + name.replace(',', ' '))
+            append(url)
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def render(channels: List[Dict]) -> str:
+        """
+        将频道列表写为 TXT 格式，分组变化时写入 "分组,#genre#" / Render channels as TXT
+
+        Args:
+            channels: IPTVPlaylist.parse 的频道条目
+        """
+        lines = []
+        group = None
+        for channel in channels:
+            if channel['group'] != group:
+                group = channel['group']
+                lines.append(f"{group or '-'},#genre#")
+            lines.append(f"{channel['name'].replace(',', ' ')},{channel['url']}")
+        return '\n'.join(lines) + '\n' if lines else ''
+
+
+class IPTVChannelIndex:
+    """
+    二进制频道索引 / Memory-mappable binary channel index
+
+    下游服务通过 mmap 按频道ID直接查找，无需解析 M3U。文件布局 (小端)：
+    - 头部: 魔数 IPTVIDX1、版本、频道数、字符串区偏移
+    - 键表: (频道ID, 记录序号)，按ID排序，用于二分查找
+    - 记录: 频道ID、条目在 M3U 文件中的字节偏移和长度、name/group/tvg_id/url 在字符串区的 (偏移, 长度)
+    - 字符串区: UTF-8 文本，相同的分组名只存一次
+    """
+
+    MAGIC = b'IPTVIDX1'
+    VERSION = 1
+    HEADER = struct.Struct('<8sIIQ')
+    KEY = struct.Struct('<QI')
+    RECORD = struct.Struct('<QQI8I')
+    FIELDS = ('name', 'group', 'tvg_id', 'url')
+
+    def __init__(self, path: Path):
+        """
+        以只读方式映射索引文件
+
+        Raises:
+            ValueError: 文件不是有效的频道索引
+        """
+        import mmap
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, count, strings_offset = self.HEADER.unpack_from(self._map)
+        except struct.error:
+            magic = version = None
+        if magic != self.MAGIC or version != self.VERSION:
+            self._map.close()
+            raise ValueError(f"{get_text('index_invalid')}: {path}")
+        self.count = count
+        self._keys_offset = self.HEADER.size
+        self._records_offset = self._keys_offset + count * self.KEY.size
+        self._strings_offset = strings_offset
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        return (self.channel(position) for position in range(self.count))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self._map.close()
+
+    @classmethod
+    def build(cls, channels: List[Dict], spans: List[Tuple[int, int]]) -> bytes:
+        """
+        生成索引文件内容
+
+        Args:
+            channels: IPTVPlaylist.parse 的频道条目
+            spans: IPTVPlaylist.entry_spans 返回的各条目字节范围
+        """
+        strings = bytearray()
+        groups = {}
+        records = bytearray()
+        pack_record = cls.RECORD.pack
+
+        def store(value: str) -> Tuple[int, int]:
+            data = value.encode('utf-8')
+            offset = len(strings)
+            strings.extend(data)
+            return offset, len(data)
+
+        ids = [int(channel['id'], 16) for channel in channels]
+        for channel_id, channel, (start, end) in zip(ids, channels, spans):
+            group = groups.get(channel['group'])
+            if group is None:
+                group = groups[channel['group']] = store(channel['group'])
+            records += pack_record(channel_id, start, end - start, *store(channel['name']), *group,
+                                   *store(channel['tvg_id']), *store(channel['url']))
+
+        count = len(records) // cls.RECORD.size
+        keys = b''.join(cls.KEY.pack(channel_id, position)
+                        for channel_id, position in sorted(zip(ids[:count], range(count))))
+        strings_offset = cls.HEADER.size + len(keys) + len(records)
+        return cls.HEADER.pack(cls.MAGIC, cls.VERSION, count, strings_offset) + keys + bytes(records) + bytes(strings)
+
+    def channel(self, position: int) -> Dict:
+        """
+        读取第 position 个频道 (M3U 中的顺序)
+
+        Returns:
+            {id, name, group, tvg_id, url, offset, length}，offset/length 为条目在 M3U 文件中的字节范围
+        """
+        if not 0 <= position < self.count:
+            raise IndexError(position)
+        channel_id, offset, length, *refs = self.RECORD.unpack_from(self._map, self._records_offset + position * self.RECORD.size)
+        channel = {'id': f"{channel_id:012x}", 'offset': offset, 'length': length}
+        for index, field in enumerate(self.FIELDS):
+            start = self._strings_offset + refs[2 * index]
+            channel[field] = self._map[start:start + refs[2 * index + 1]].decode('utf-8')
+        return channel
+
+    def position(self, channel_id: str) -> Optional[int]:
+        """二分查找频道ID，返回记录序号 / Binary-search a channel ID"""
+        try:
+            key = int(channel_id, 16)
+        except ValueError:
+            return None
+        unpack, size, base = self.KEY.unpack_from, self.KEY.size, self._keys_offset
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            value, position = unpack(self._map, base + middle * size)
+            if value < key:
+                low = middle + 1
+            elif value > key:
+                high = middle
+            else:
+                return position
+        return None
+
+    def find(self, channel_id: str) -> Optional[Dict]:
+        """按频道ID查找 / Look up a channel by ID"""
+        position = self.position(channel_id)
+        return None if position is None else self.channel(position)
+
+    def lookup(self, key: str, occurrence: int = 0) -> Optional[Dict]:
+        """
+        按 tvg-id (没有时为频道名) 查找，ID 规则与 IPTVPlaylist.assign_ids 相同
+
+        Args:
+            key: tvg-id 或频道名
+            occurrence: 同名频道的出现序号
+        """
+        return self.find(IPTVPlaylist.channel_id(key, occurrence))
+
+
+class IPTVOutputFormats:
+    """
+    派生输出格式 / Derived output formats
+
+    按 output.formats 为每个源写入 <名称>.json (频道列表)、<名称>.txt (#genre# 格式)
+    和 <名称>.idx (IPTVChannelIndex)，与源文件一起进入暂存版本并发布。
+    output.merged 非空时，按配置顺序合并所有源为一个 M3U 文件并写入同样的派生格式。
+    """
+
+    SUFFIXES = {'json': '.json', 'txt': '.txt', 'index': '.idx'}
+
+    def __init__(self, settings: IPTVConfigSnapshot):
+        """
+        Args:
+            settings: 本次运行使用的配置快照
+        """
+        self.formats = settings.output.formats
+        self.merged = settings.output.merged
+        self.parse_workers = settings.publish.parse_workers
+        self.parse_min_size = int(settings.publish.parse_min_size_mb * 1024 * 1024)
+
+    @classmethod
+    def output_names(cls, filename: str, formats: List[str]) -> Dict[str, str]:
+        """源文件对应的派生文件名 {格式: 文件名}，与源文件同名的格式跳过"""
+        stem = Path(filename).stem
+        names = {}
+        for output_format in formats:
+            name = stem + cls.SUFFIXES[output_format]
+            if name != filename:
+                names[output_format] = name
+        return names
+
+    def names(self, filenames: List[str]) -> List[str]:
+        """需要从当前版本沿用的派生文件和合并输出 / Derived files carried into a new generation"""
+        names = [name for filename in filenames for name in self.output_names(filename, self.formats).values()]
+        if self.merged:
+            names += [self.merged] + list(self.output_names(self.merged, self.formats).values())
+        return names
+
+    @staticmethod
+    def _read(path: Path) -> str:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+
+    def write(self, directory: Path, filename: str, text: str, channels: Optional[List[Dict]] = None) -> List[str]:
+        """
+        写入一个 M3U 文件的派生文件
+
+        Args:
+            directory: 写入目录
+            filename: M3U 文件名
+            text: M3U 文本 (与写入的文件内容相同，索引中的偏移据此计算)
+            channels: 已解析的频道列表，默认解析 text
+
+        Returns:
+            写入的文件名列表
+        """
+        targets = self.output_names(filename, self.formats)
+        if not targets:
+            return []
+        if channels is None:
+            # 大文件按 publish.parse_workers 并行解析已写入的文件
+            if self.parse_workers != 1 and len(text) >= self.parse_min_size and (directory / filename).is_file():
+                channels = IPTVPlaylist.parse_file(directory / filename, self.parse_workers, self.parse_min_size)
+            else:
+                channels = IPTVPlaylist.parse(text)
+        for output_format, name in targets.items():
+            if output_format == 'json':
+                data = json.dumps({'source': filename, 'channels': channels}, ensure_ascii=False).encode('utf-8')
+            elif output_format == 'txt':
+                data = IPTVTxtPlaylist.render(channels).encode('utf-8')
+            else:
+                data = IPTVChannelIndex.build(channels, IPTVPlaylist.entry_spans(text))
+            IPTVDownloader._atomic_write(directory / name, data)
+        return list(targets.values())
+
+    def complete(self, staging_dir: Path, filenames: List[str], entries: Dict[str, Dict],
+                 previous: Dict[str, Dict], previous_merged: Dict) -> Optional[Dict]:
+        """
+        发布前补齐派生文件：沿用的源在格式配置变化或缺少派生文件时从暂存的源文件重新生成，
+        然后写入合并输出 (各源内容均未变化时沿用上一版本的合并输出)
+
+        Args:
+            staging_dir: 暂存目录
+            filenames: 启用的源文件名 (按配置顺序)
+            entries: 本次下载的清单条目，重新生成派生文件的源会加入其中
+            previous: 上一版本的清单条目
+            previous_merged: 上一版本清单中的合并输出记录
+
+        Returns:
+            合并输出记录 {filename, outputs, sources: {文件名: 内容哈希}}，未启用时为 None
+        """
+        staged = [filename for filename in filenames if (staging_dir / filename).is_file()]
+        for filename in staged:
+            names = list(self.output_names(filename, self.formats).values())
+            entry = entries.get(filename) or previous.get(filename)
+            if entry is not None and entry.get('outputs', []) == names and all((staging_dir / name).is_file() for name in names):
+                continue
+            entry = dict(entry or IPTVPublisher.describe_file(staging_dir / filename))
+            entry['outputs'] = self.write(staging_dir, filename, self._read(staging_dir / filename))
+            entries[filename] = entry
+
+        if not self.merged:
+            return None
+        hashes = {filename: (entries.get(filename) or previous.get(filename) or {}).get('content_hash') for filename in staged}
+        outputs = [self.merged] + list(self.output_names(self.merged, self.formats).values())
+        merged = {'filename': self.merged, 'outputs': outputs, 'sources': hashes}
+        if (previous_merged.get('sources') == hashes and previous_merged.get('outputs') == outputs and None not in hashes.values()
+                and all((staging_dir / name).is_file() for name in outputs)):
+            return merged
+
+        channels = []
+        for filename in staged:
+            channels.extend(IPTVPlaylist.parse_file(staging_dir / filename, self.parse_workers, self.parse_min_size))
+        # 合并后重新分配ID，不同源中的同名频道按出现序号区分
+        IPTVPlaylist.assign_ids(channels)
+        text = IPTVPlaylist.render(channels)
+        IPTVDownloader._atomic_write(staging_dir / self.merged, text.encode('utf-8'))
+        self.write(staging_dir, self.merged, text, channels)
+        return merged
+
+
+class IPTVPublisher:
+    """
+    IPTV版本发布类 / IPTV generation publisher
+
+    每次运行写入新的版本目录 data/generations/<N>，全部源就绪后通过原子替换
+    data/current 软链接一次性发布，data/<filename> 为指向 current/<filename>
+    的兼容软链接。
+    """
+
+    GENERATIONS_DIR = "generations"
+    CURRENT_LINK = "current"
+    STAGING_PREFIX = ".staging-"
+    MANIFEST_FILE = ".manifest.json"
+
+    def __init__(self, config: IPTVConfig):
+        """
+        初始化发布器
+
+        Args:
+            config: 配置管理器实例
+        """
+        self.config = config
+        self._lock = threading.Lock()
+        self.delta_log = IPTVDeltaLog(config, self)
+
+    @property
+    def data_dir(self) -> Path:
+        return Path(self.config.get('directories.base_dir')) / self.config.get('directories.data_dir')
+
+    @property
+    def generations_dir(self) -> Path:
+        return self.data_dir / self.GENERATIONS_DIR
+
+    @property
+    def current_link(self) -> Path:
+        return self.data_dir / self.CURRENT_LINK
+
+    @staticmethod
+    def _generation_name(generation: int) -> str:
+        return f"{generation:06d}"
+
+    def generation_path(self, generation: int) -> Path:
+        """获取版本目录路径 / Get generation directory path"""
+        return self.generations_dir / self._generation_name(generation)
+
+    def list_generations(self) -> List[int]:
+        """列出已发布的版本号 (升序) / List published generations in ascending order"""
+        if not self.generations_dir.exists():
+            return []
+        generations = []
+        for entry in self.generations_dir.iterdir():
+            if entry.name.isdigit() and entry.is_dir():
+                generations.append(int(entry.name))
+        return sorted(generations)
+
+    def current_generation(self) -> Optional[int]:
+        """获取当前发布的版本号 / Get currently published generation"""
+        try:
+            target = os.readlink(self.current_link)
+        except OSError:
+            return None
+        name = os.path.basename(target.rstrip('/'))
+        return int(name) if name.isdigit() else None
+
+    def _next_generation(self) -> int:
+        highest = 0
+        if self.generations_dir.exists():
+            for entry in self.generations_dir.iterdir():
+                name = entry.name[len(self.STAGING_PREFIX):] if entry.name.startswith(self.STAGING_PREFIX) else entry.name
+                if name.isdigit():
+                    highest = max(highest, int(name))
+        return highest + 1
+
+    def begin(self, filenames: List[str]) -> Tuple[int, Path]:
+        """
+        创建新的暂存版本目录，并以当前版本的文件作为初始内容
+
+        Args:
+            filenames: 需要沿用的源文件名列表
+
+        Returns:
+            (版本号, 暂存目录)
+        """
+        with self._lock:
+            self.generations_dir.mkdir(parents=True, exist_ok=True)
+            generation = self._next_generation()
+            staging_dir = self.generations_dir / f"{self.STAGING_PREFIX}{self._generation_name(generation)}"
+            staging_dir.mkdir()
+            os.chmod(staging_dir, 0o755)
+
+        # 未更新的源沿用当前发布的文件及其预压缩版本 (硬链接，失败时复制)
+        for filename in filenames:
+            for name in (filename, f"{filename}.gz"):
+                source_path = self.data_dir / self.CURRENT_LINK / name
+                if not source_path.exists():
+                    source_path = self.data_dir / name
+                if not source_path.exists():
+                    continue
+                try:
+                    os.link(os.path.realpath(source_path), staging_dir / name)
+                except OSError:
+                    shutil.copy2(source_path, staging_dir / name)
+
+        logging.debug(f"{get_text('generation_staging')}: {staging_dir}")
+        return generation, staging_dir
+
+    def discard(self, staging_dir: Path):
+        """丢弃暂存版本 / Discard a staging generation"""
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def read_manifest(self, generation: Optional[int] = None) -> Dict:
+        """
+        读取版本清单 (默认当前版本)，不读取任何直播源文件内容
+
+        Returns:
+            清单字典 {generation, published_at, sources: {filename: 条目}}，不存在时为空字典
+        """
+        directory = self.current_link if generation is None else self.generation_path(generation)
+        try:
+            with open(directory / self.MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def describe_file(path: Path) -> Dict:
+        """为没有清单记录的文件生成清单条目 (映射扫描文件) / Build a manifest entry by scanning a file"""
+        info = IPTVPlaylist.scan_file(path)
+        return {
+            'size': info['size'],
+            'channels': info['channels'],
+            'content_hash': info['content_hash'],
+            'fetched_at': path.stat().st_mtime,
+        }
+
+    def write_manifest(self, generation: int, staging_dir: Path, entries: Dict[str, Dict], previous: Dict[str, Dict],
+                       merged: Optional[Dict] = None):
+        """
+        原子写入暂存版本的清单
+
+        Args:
+            generation: 版本号
+            staging_dir: 暂存目录
+            entries: 本次下载的条目 {filename: 条目}
+            previous: 上一版本的条目，沿用的文件使用原有条目
+            merged: 合并输出记录 (IPTVOutputFormats.complete)
+
+        Returns:
+            写入的清单
+        """
+        # 派生输出和合并输出不是直播源文件
+        derived = set(merged['outputs']) if merged else set()
+        for entry in list(entries.values()) + list(previous.values()):
+            derived.update(entry.get('outputs', ()))
+        
+        sources = {}
+        for entry in staging_dir.iterdir():
+            if not entry.is_file() or entry.name.startswith('.') or entry.suffix == '.gz' or entry.name in derived:
+                continue
+            if entry.name in entries:
+                sources[entry.name] = entries[entry.name]
+            elif entry.name in previous:
+                sources[entry.name] = previous[entry.name]
+            else:
+                # 旧版本没有清单 (升级后首次运行)
+                sources[entry.name] = self.describe_file(entry)
+
+        manifest = {'generation': generation, 'published_at': time.time(), 'sources': sources}
+        if merged:
+            manifest['merged'] = merged
+        IPTVDownloader._atomic_write(staging_dir / self.MANIFEST_FILE,
+                                     json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8'))
+        return manifest
+
+    @staticmethod
+    def unchanged(manifest: Dict, previous: Dict) -> bool:
+        """
+        新清单发布的内容是否与上一版本完全相同：源文件集合、内容哈希、派生输出和合并输出都未变化
+        """
+        sources, previous_sources = manifest['sources'], previous.get('sources')
+        if not previous_sources or set(sources) != set(previous_sources):
+            return False
+        for filename, entry in sources.items():
+            old = previous_sources[filename]
+            if entry.get('content_hash') is None or entry.get('content_hash') != old.get('content_hash'):
+                return False
+            if entry.get('outputs') != old.get('outputs'):
+                return False
+        return manifest.get('merged') == previous.get('merged')
+
+    def keep_current(self, manifest: Dict, previous: Dict, staging_dir: Path):
+        """
+        内容未变化时保留当前版本：丢弃暂存目录，不产生新版本和增量记录，
+        只在当前版本的清单中更新获取时间等元数据 (健康检查依赖 fetched_at)
+
+        Args:
+            manifest: 暂存版本的清单
+            previous: 当前版本的清单
+            staging_dir: 暂存目录
+        """
+        manifest = dict(manifest, generation=previous['generation'], published_at=previous.get('published_at'))
+        IPTVDownloader._atomic_write(self.generation_path(previous['generation']) / self.MANIFEST_FILE,
+                                     json.dumps(manifest, indent=2, ensure_ascii=False).encode('utf-8'))
+        self.discard(staging_dir)
+
+    def commit(self, generation: int, staging_dir: Path) -> Path:
+        """
+        发布暂存版本：重命名为正式版本目录并原子切换 current 软链接
+
+        Args:
+            generation: 版本号
+            staging_dir: 暂存目录
+
+        Returns:
+            正式版本目录
+        """
+        if self.config.get('publish.precompress', True):
+            self._precompress(staging_dir)
+
+        generation_dir = self.generation_path(generation)
+        os.rename(staging_dir, generation_dir)
+
+        # 切换前记录频道变更，客户端看到新版本时增量数据已就绪
+        previous = self.current_generation()
+        try:
+            self.delta_log.record(generation, previous)
+        except Exception as e:
+            logging.warning(f"{get_text('delta_record_failed')}: {e}")
+
+        with self._lock:
+            self._swap_current(generation)
+            self._ensure_compat_links(self._published_files(generation_dir))
+
+        logging.info(f"{get_text('generation_published')}: {self._generation_name(generation)}")
+        self.prune()
+        return generation_dir
+
+    @staticmethod
+    def _published_files(generation_dir: Path) -> List[str]:
+        return [entry.name for entry in generation_dir.iterdir() if entry.is_file() and not entry.name.startswith('.')]
+
+    def _precompress(self, staging_dir: Path):
+        """为新写入的文件生成 .gz 预压缩版本 / Write .gz variants for new files"""
+        for entry in staging_dir.iterdir():
+            if not entry.is_file() or entry.name.startswith('.') or entry.suffix == '.gz':
+                continue
+            gz_path = entry.with_name(f"{entry.name}.gz")
+            # 沿用的硬链接文件已有对应的压缩版本
+            if gz_path.exists() and gz_path.stat().st_mtime_ns >= entry.stat().st_mtime_ns:
+                continue
+            tmp_path = gz_path.with_name(f".{gz_path.name}.tmp")
+            import gzip
+            with open(entry, 'rb') as src, open(tmp_path, 'wb') as raw:
+                # mtime=0 使相同内容得到相同的压缩结果
+                with gzip.GzipFile(filename='', mode='wb', fileobj=raw, compresslevel=9, mtime=0) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, gz_path)
+
+    def _replace_with_symlink(self, link_path: Path, target: str):
+        """以原子方式将路径替换为软链接 / Atomically replace a path with a symlink"""
+        tmp_link = link_path.with_name(f".{link_path.name}.tmp")
+        if os.path.lexists(tmp_link):
+            os.unlink(tmp_link)
+        os.symlink(target, tmp_link)
+        os.replace(tmp_link, link_path)
+
+    def _swap_current(self, generation: int):
+        target = os.path.join(self.GENERATIONS_DIR, self._generation_name(generation))
+        self._replace_with_symlink(self.current_link, target)
+
+    def _ensure_compat_links(self, filenames: List[str]):
+        """data/<filename> 指向 current/<filename>，兼容旧的目录布局"""
+        for filename in filenames:
+            link_path = self.data_dir / filename
+            target = os.path.join(self.CURRENT_LINK, filename)
+            if os.path.islink(link_path) and os.readlink(link_path) == target:
+                continue
+            self._replace_with_symlink(link_path, target)
+
+    def rollback(self, generation: Optional[int] = None) -> int:
+        """
+        回滚到指定版本，未指定时回滚到当前版本的上一个版本
+
+        Args:
+            generation: 目标版本号
+
+        Returns:
+            回滚后的版本号
+        """
+        generations = self.list_generations()
+        current = self.current_generation()
+
+        if generation is None:
+            previous = [g for g in generations if current is None or g < current]
+            if not previous:
+                raise ValueError(get_text('rollback_no_previous'))
+            generation = previous[-1]
+        elif generation not in generations:
+            raise ValueError(f"{get_text('generation_not_found')}: {generation}")
+
+        generation_dir = self.generation_path(generation)
+        with self._lock:
+            self._swap_current(generation)
+            self._ensure_compat_links(self._published_files(generation_dir))
+
+        logging.info(f"{get_text('rollback_success')}: {self._generation_name(generation)}")
+        return generation
+
+    def prune(self):
+        """保留最近 K 个版本，当前版本始终保留 / Keep the last K generations"""
+        keep = max(1, self.config.get('publish.keep_generations', 5))
+        current = self.current_generation()
+        generations = self.list_generations()
+
+        for generation in generations[:-keep]:
+            if generation == current:
+                continue
+            shutil.rmtree(self.generation_path(generation), ignore_errors=True)
+            logging.debug(f"{get_text('generation_pruned')}: {self._generation_name(generation)}")
+
+        # 清理异常退出残留的暂存目录
+        for entry in self.generations_dir.glob(f"{self.STAGING_PREFIX}*"):
+            if entry.stat().st_mtime < time.time() - 86400:
+                shutil.rmtree(entry, ignore_errors=True)
+
+        self.delta_log.prune()
+
+
+class IPTVDeltaLog:
+    """
+    频道增量变更日志 / Per-generation channel change log
+
+    每次发布时对比新旧版本的M3U文件，记录到 data/deltas/<N>/<filename>.json：
+    previous, added, modified, removed 以及 moves。moves 只包含新增和位置变化的频道，
+    每项为 [频道ID, 前一个频道ID (列表开头为 null)]，按新顺序排列；客户端依次把频道
+    移动 (或插入) 到前一个频道之后，最后删除 removed 中的频道，即得到新顺序。
+    保留最近 delta.history 个版本的日志，更早的版本请求将返回完整列表。
+    """
+
+    DELTAS_DIR = "deltas"
+    # 缓存的频道列表对应的源文件总大小上限
+    CACHE_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, config: IPTVConfig, publisher: 'IPTVPublisher'):
+        """
+        初始化增量日志
+
+        Args:
+            config: 配置管理器实例
+            publisher: 版本发布器实例
+        """
+        self.config = config
+        self.publisher = publisher
+        # (版本, 文件名) -> (源文件大小, 频道列表)，按最近使用排序
+        self._cache = {}
+        self._cache_bytes = 0
+        self._cache_lock = threading.Lock()
+
+    @property
+    def deltas_dir(self) -> Path:
+        return self.publisher.data_dir / self.DELTAS_DIR
+
+    def _entry_path(self, generation: int, filename: str) -> Path:
+        return self.deltas_dir / IPTVPublisher._generation_name(generation) / f"{filename}.json"
+
+    def channels(self, generation: int, filename: str) -> Optional[List[Dict]]:
+        """读取并缓存指定版本中某个文件的频道列表 / Load the channel list of a generation file"""
+        key = (generation, filename)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache[key] = self._cache.pop(key)
+                return self._cache[key][1]
+
+        path = self.publisher.generation_path(generation) / filename
+        if not path.is_file():
+            return None
+        size = path.stat().st_size
+        channels = IPTVPlaylist.parse_file(path, self.config.get('publish.parse_workers', 1),
+                                           int(self.config.get('publish.parse_min_size_mb', 8) * 1024 * 1024))
+
+        # 按源文件大小限制缓存总量，淘汰最久未使用的列表；超过上限的单个文件不缓存
+        with self._cache_lock:
+            if key not in self._cache and size <= self.CACHE_BYTES:
+                while self._cache and self._cache_bytes + size > self.CACHE_BYTES:
+                    self._cache_bytes -= self._cache.pop(next(iter(self._cache)))[0]
+                self._cache[key] = (size, channels)
+                self._cache_bytes += size
+        return channels
+
+    @staticmethod
+    def diff(old_channels: List[Dict], new_channels: List[Dict]) -> Dict:
+        """计算两个频道列表之间的变更 / Compute changes between two channel lists"""
+        old_by_id = {channel['id']: channel for channel in old_channels}
+        new_by_id = {channel['id']: channel for channel in new_channels}
+
+        added = [channel for channel in new_channels if channel['id'] not in old_by_id]
+        removed = [channel_id for channel_id in old_by_id if channel_id not in new_by_id]
+        modified = []
+        for channel in new_channels:
+            old = old_by_id.get(channel['id'])
+            if old is not None and (old['url'], old['extinf'], old['extras']) != (channel['url'], channel['extinf'], channel['extras']):
+                modified.append(channel)
+
+        return {'added': added, 'modified': modified, 'removed': removed, 'moves': IPTVDeltaLog.moves(old_channels, new_channels)}
+
+    @staticmethod
+    def moves(old_channels: List[Dict], new_channels: List[Dict]) -> List[List[Optional[str]]]:
+        """
+        计算把旧顺序变为新顺序所需的最少移动 / Minimal placements turning the old order into the new one
+
+        保留的频道中，旧位置构成最长递增子序列的部分保持不动，其余保留频道和新增频道
+        按新顺序记录为 [频道ID, 前一个频道ID]
+
+        Returns:
+            [[频道ID, 前一个频道ID 或 None]]
+        """
+        from bisect import bisect_left
+        old_position = {channel['id']: index for index, channel in enumerate(old_channels)}
+        ids = [channel['id'] for channel in new_channels]
+
+        # 最长递增子序列 (耐心排序)，tails[k] 为长度 k+1 的子序列末尾在 ids 中的下标
+        tails, tail_values, parent = [], [], {}
+        for index, channel_id in enumerate(ids):
+            position = old_position.get(channel_id)
+            if position is None:
+                continue
+            k = bisect_left(tail_values, position)
+            parent[index] = tails[k - 1] if k else None
+            if k == len(tails):
+                tails.append(index)
+                tail_values.append(position)
+            else:
+                tails[k] = index
+                tail_values[k] = position
+        stable = set()
+        index = tails[-1] if tails else None
+        while index is not None:
+            stable.add(index)
+            index = parent[index]
+
+        return [[channel_id, ids[index - 1] if index else None]
+                for index, channel_id in enumerate(ids) if index not in stable]
+
+    def record(self, generation: int, previous: Optional[int]):
+        """
+        记录新版本相对上一个发布版本的变更
+
+        Args:
+            generation: 新版本号
+            previous: 上一个发布的版本号
+        """
+        if previous is None:
+            return
+        generation_dir = self.publisher.generation_path(generation)
+        previous_dir = self.publisher.generation_path(previous)
+        output_dir = self.deltas_dir / IPTVPublisher._generation_name(generation)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        for path in generation_dir.glob("*.m3u"):
+            previous_path = previous_dir / path.name
+            if not previous_path.is_file():
+                continue
+            # 未更新的源与上一版本共享同一个 inode
+            if os.path.samefile(path, previous_path):
+                changes = {'added': [], 'modified': [], 'removed': [], 'moves': []}
+            else:
+                changes = self.diff(self.channels(previous, path.name), self.channels(generation, path.name))
+            changes['previous'] = previous
+            IPTVDownloader._atomic_write(output_dir / f"{path.name}.json",
+                                         json.dumps(changes, ensure_ascii=False).encode('utf-8'))
+
+    def changes_since(self, filename: str, since: int) -> Dict:
+        """
+        合并 since 之后到当前版本的所有变更
+
+        Args:
+            filename: 源文件名
+            since: 客户端持有的版本号
+
+        Returns:
+            增量响应；日志不足以覆盖时返回完整频道列表 (full=True)
+
+        Raises:
+            FileNotFoundError: 当前版本中没有该文件
+        """
+        current = self.publisher.current_generation()
+        if current is None or not (self.publisher.generation_path(current) / filename).is_file():
+            raise FileNotFoundError(filename)
+
+        # 沿 previous 链回溯到客户端版本
+        chain = []
+        generation = current
+        while generation != since:
+            path = self._entry_path(generation, filename)
+            if generation < since or not path.is_file():
+                return self._full_response(current, filename)
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            # 升级前记录的完整顺序无法与其他版本的移动合并
+            if 'moves' not in entry:
+                return self._full_response(current, filename)
+            chain.append(entry)
+            generation = entry['previous']
+
+        upserts = {}
+        removed = set()
+        moves = []
+        added = set()
+        for entry in reversed(chain):
+            for channel in entry['added']:
+                added.add(channel['id'])
+            for channel in entry['added'] + entry['modified']:
+                upserts[channel['id']] = channel
+                removed.discard(channel['id'])
+            for channel_id in entry['removed']:
+                # 链中新增后又删除的频道不在客户端列表中，但中间版本的移动仍引用它，
+                # 无法按版本合并；改为直接对比客户端版本和当前版本
+                if channel_id in added:
+                    return self._direct_response(since, current, filename)
+                upserts.pop(channel_id, None)
+                removed.add(channel_id)
+            # 各版本的移动按顺序依次执行；引用的频道都在客户端版本中或由此前的移动插入，
+            # 被删除的频道在全部移动之后才删除
+            moves.extend(entry['moves'])
+
+        return {
+            'source': filename,
+            'generation': current,
+            'since': since,
+            'full': False,
+            'upserted': list(upserts.values()),
+            'removed': sorted(removed),
+            'moves': moves,
+        }
+
+    def _direct_response(self, since: int, current: int, filename: str) -> Dict:
+        """对比客户端版本和当前版本的文件；客户端版本已被清理时返回完整列表"""
+        old_channels = self.channels(since, filename)
+        new_channels = self.channels(current, filename)
+        if old_channels is None or new_channels is None:
+            return self._full_response(current, filename)
+        changes = self.diff(old_channels, new_channels)
+        return {
+            'source': filename,
+            'generation': current,
+            'since': since,
+            'full': False,
+            'upserted': changes['added'] + changes['modified'],
+            'removed': sorted(changes['removed']),
+            'moves': changes['moves'],
+        }
+
+    def _full_response(self, current: int, filename: str) -> Dict:
+        channels = self.channels(current, filename)
+        if channels is None:
+            raise FileNotFoundError(filename)
+        return {'source': filename, 'generation': current, 'full': True, 'channels': channels}
+
+    def handle_request(self, path: str, query: str, headers: Dict[str, str]) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        """处理 /delta/<filename>?since=N 请求 / Serve /delta/<filename>?since=N"""
+        filename = path[len('/delta/'):]
+        params = parse_qs(query)
+        if not filename or '/' in filename or filename.startswith('.'):
+            return 404, [], b'Not Found\n'
+        try:
+            since = int(params.get('since', ['0'])[0])
+            response = self.changes_since(filename, since)
+        except ValueError:
+            return 400, [], b'Bad Request\n'
+        except FileNotFoundError:
+            return 404, [], b'Not Found\n'
+
+        body = json.dumps(response, ensure_ascii=False).encode('utf-8')
+        return 200, [
+            ('Content-Type', 'application/json; charset=utf-8'),
+            ('Cache-Control', 'no-cache'),
+            ('X-IPTV-Generation', str(response['generation'])),
+        ], body
+
+    def prune(self):
+        """只保留最近 delta.history 个版本的变更日志 / Keep a bounded change log"""
+        if not self.deltas_dir.exists():
+            return
+        history = max(1, self.config.get('delta.history', 20))
+        generations = sorted(int(entry.name) for entry in self.deltas_dir.iterdir() if entry.name.isdigit())
+        for generation in generations[:-history]:
+            shutil.rmtree(self.deltas_dir / IPTVPublisher._generation_name(generation), ignore_errors=True)
+
+
+class IPTVSingleFlight:
+    """
+    请求合并 / In-flight call coalescing
+
+    同一个键同时只执行一次调用，其余并发调用者等待并共享它的结果 (包括异常)。
+    调用结束后立即移除，不缓存结果；之后的调用会重新执行。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function) -> Tuple[object, bool]:
+        """
+        执行调用或等待正在进行的同键调用
+
+        Args:
+            key: 合并键
+            function: 无参数的调用
+
+        Returns:
+            (结果, 是否共享了其他调用者的结果)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], True
+
+        try:
+            call['result'] = function()
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+        return call['result'], False
+
+
+class IPTVFetchResult:
+    """一次 HTTP 获取的结果，可被多个源共享 / Outcome of one HTTP fetch, shareable between sources"""
+
+    __slots__ = ('url', 'status_code', 'headers', 'content')
+
+    def __init__(self, url: str, status_code: int, headers, content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+def normalize_url(url: str) -> str:
+    """
+    规范化地址用于合并请求 / Normalize a URL for request coalescing
+
+    协议和主机名小写，去掉默认端口和片段，查询参数按名称排序。
+    """
+    from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    if parts.username or parts.password:
+        host = f"{parts.username or ''}:{parts.password or ''}@{host}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+class IPTVNestedResolver:
+    """
+    嵌套播放列表解析 / Nested playlist resolver
+
+    索引播放列表中指向其他 .m3u 文件 (而非直播流) 的条目会被获取并展开为其中的频道。
+    按层 (广度优先) 获取：同一层的子列表通过下载器并发请求，宽索引只需约一次往返延迟。
+    超过 download.nested_max_depth 的条目保持原样；条目指向自身祖先时视为环并跳过。
+    获取结果在一次运行内缓存，多个源引用同一子列表时只请求一次。
+    """
+
+    def __init__(self, downloader: 'IPTVDownloader', settings: IPTVConfigSnapshot):
+        """
+        初始化解析器
+
+        Args:
+            downloader: 下载器实例 (共享会话和请求合并)
+            settings: 本次运行的配置快照
+        """
+        self.downloader = downloader
+        self.max_depth = settings.download.nested_max_depth
+        self.max_workers = settings.download.nested_max_workers
+        self.timeout = settings.download.timeout
+        # 规范化地址 -> 条目列表；获取失败时为 None，不是播放列表时为空元组
+        self.cache = {}
+
+    @staticmethod
+    def is_nested(url: str) -> bool:
+        """条目地址是否指向 .m3u 播放列表 (.m3u8 为 HLS 流，不展开)"""
+        parsed = urlparse(url)
+        return parsed.scheme in ('http', 'https') and parsed.path.lower().endswith('.m3u')
+
+    @staticmethod
+    def split_entries(text: str, base_url: Optional[str] = None) -> Tuple[List[str], List[Tuple[str, List[str], str]]]:
+        """
+        拆分播放列表
+
+        Args:
+            text: M3U文本
+            base_url: 子列表地址，相对地址据此转换为绝对地址
+
+        Returns:
+            (头部行, [(#EXTINF 行, 附加行, 地址)])
+        """
+        from urllib.parse import urljoin
+        header, entries = [], []
+        extinf, extras = None, []
+        for raw_line in text.splitlines():
+            line = raw_line.strip()
+            if not line:
+                continue
+            if line.startswith('#EXTINF:'):
+                extinf, extras = line, []
+            elif line.startswith('#'):
+                if extinf is not None:
+                    extras.append(line)
+                elif not entries:
+                    header.append(line)
+            elif extinf is not None:
+                entries.append((extinf, extras, urljoin(base_url, line) if base_url else line))
+                extinf, extras = None, []
+        return header, entries
+
+    def _fetch(self, url: str, source_id: str = '') -> Optional[List[Tuple[str, List[str], str]]]:
+        try:
+            result, _ = self.downloader.fetch(url, self.timeout, phase={'source': source_id, 'nested': url})
+            content = result.content
+            try:
+                text = content.decode('utf-8')
+            except UnicodeDecodeError:
+                text = content.decode(self.downloader._detect_encoding(content), errors='ignore')
+        except Exception as e:
+            logging.warning(f"{get_text('nested_fetch_failed')} {url}: {e}")
+            return None
+        # 只有单个地址、没有 #EXTINF 的 .m3u (如电台) 按直播流保留
+        if '#EXTINF:' not in text:
+            return ()
+        return self.split_entries(text, url)[1]
+
+    def _fetch_level(self, urls: Dict[str, str], source_id: str):
+        """并发获取同一层的子列表 / Fetch one level of children concurrently"""
+        if len(urls) == 1:
+            key, url = next(iter(urls.items()))
+            self.cache[key] = self._fetch(url, source_id)
+            return
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(len(urls), self.max_workers)) as executor:
+            for key, entries in zip(urls, executor.map(partial(self._fetch, source_id=source_id), urls.values())):
+                self.cache[key] = entries
+
+    def resolve(self, text: str, url: str, source_id: str = '') -> Tuple[str, Dict[str, int]]:
+        """
+        展开播放列表中的嵌套列表
+
+        Args:
+            text: 源播放列表文本
+            url: 源地址
+            source_id: 源标识符 (用于指标和追踪)
+
+        Returns:
+            (展开后的文本, 统计 {playlists, failed, cycles, depth_limited})
+        """
+        header, entries = self.split_entries(text, base_url=url)
+        stats = {'playlists': 0, 'failed': 0, 'cycles': 0, 'depth_limited': 0}
+        if not any(self.is_nested(entry_url) for _, _, entry_url in entries):
+            return text, stats
+
+        # 广度优先：每层收集新访问的子列表，其中尚未缓存的一次并发获取；
+        # 已缓存 (其他源获取过) 的子列表同样继续向下遍历，其后代未缓存时也会被获取
+        root = normalize_url(url)
+        # 其他源引用本源地址时无需再次请求
+        self.cache.setdefault(root, entries)
+        visited = {root}
+        level = [entries]
+        for _ in range(self.max_depth):
+            discovered, pending = [], {}
+            for current in level:
+                for _, _, entry_url in current or ():
+                    if not self.is_nested(entry_url):
+                        continue
+                    key = normalize_url(entry_url)
+                    if key not in visited:
+                        visited.add(key)
+                        discovered.append(key)
+                        if key not in self.cache:
+                            pending[key] = entry_url
+            if not discovered:
+                break
+            if pending:
+                self._fetch_level(pending, source_id)
+            level = [self.cache.get(key) for key in discovered]
+
+        lines = header if header and header[0].startswith('#EXTM3U') else ['#EXTM3U'] + header
+        self._expand(entries, (root,), 0, lines, stats)
+        return '\n'.join(lines) + '\n', stats
+
+    def _expand(self, entries, ancestors: Tuple[str, ...], depth: int, lines: List[str], stats: Dict[str, int]):
+        for extinf, extras, entry_url in entries:
+            if self.is_nested(entry_url):
+                key = normalize_url(entry_url)
+                if key in ancestors:
+                    stats['cycles'] += 1
+                    continue
+                children = self.cache.get(key)
+                if depth >= self.max_depth:
+                    stats['depth_limited'] += 1
+                elif children is None:
+                    stats['failed'] += 1
+                elif children:
+                    stats['playlists'] += 1
+                    self._expand(self.cache[key], ancestors + (key,), depth + 1, lines, stats)
+                    continue
+            lines.append(extinf)
+            lines.extend(extras)
+            lines.append(entry_url)
+
+
+class IPTVDownloader:
+    """IPTV下载器类"""
+    
+    def __init__(self, config: IPTVConfig, publisher: Optional[IPTVPublisher] = None,
+                 metrics: Optional['IPTVMetrics'] = None):
+        """
+        初始化下载器
+        
+        Args:
+            config: 配置管理器实例
+            publisher: 版本发布器实例，默认新建
+            metrics: 运行指标实例，默认新建
+        """
+        # 执行依赖检查
+        check_dependencies()
+        
+        self.config = config
+        self.session = self._create_session()
+        self.publisher = publisher or IPTVPublisher(config)
+        self.breaker = IPTVCircuitBreaker(config)
+        self.metrics = metrics or IPTVMetrics()
+        self.tracer = IPTVTracer(config)
+        # 下载器和其他获取方 (如嵌套播放列表解析) 共享，同一地址同时只请求一次
+        self.single_flight = IPTVSingleFlight()
+        self.resolver = None
+        self.fetch_info = {}
+        self.attempt_log = []
+        self._previous_manifest = {}
+        self._setup_directories()
+    
+    def _create_session(self) -> 'requests.Session':
+        """创建HTTP会话"""
+        import requests
+        session = requests.Session()
+        # 连接池容纳所有并发下载 (每个源还可能并发获取嵌套列表)，避免多余连接被丢弃
+        pool_size = max(10, self.config.get('download.max_workers', 4) * self.config.get('download.nested_max_workers', 16))
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({
+            'User-Agent': self.config.get('download.user_agent'),
+            'Accept': '*/*',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        })
+        return session
+    
+    def _setup_directories(self):
+        """创建必要的目录结构"""
+        base_dir = Path(self.config.get('directories.base_dir'))
+        
+        directories = [
+            base_dir,
+            base_dir / self.config.get('directories.data_dir'),
+            base_dir / self.config.get('directories.backup_dir'),
+            base_dir / self.config.get('directories.log_dir'),
+            base_dir / self.config.get('directories.state_dir', 'state')
+        ]
+        
+        for directory in directories:
+            directory.mkdir(parents=True, exist_ok=True)
+            # 设置目录权限 (755)
+            os.chmod(directory, 0o755)
+            logging.debug(f"{get_text('create_directory')}: {directory}")    
+
+    def _detect_encoding(self, content: bytes) -> str:
+        """检测文件编码 / Detect file encoding"""
+        try:
+            import chardet
+            result = chardet.detect(content)
+            encoding = result.get('encoding', 'utf-8')
+            confidence = result.get('confidence', 0)
+            
+            if confidence < 0.7:
+                logging.warning(f"{get_text('encoding_detection_low')}: {confidence}, {get_text('encoding_detection_failed')}")
+                return 'utf-8'
+            
+            logging.debug(f"{get_text('detected_encoding')}: {encoding}, {get_text('confidence')}: {confidence}")
+            return encoding
+        except Exception as e:
+            logging.warning(f"{get_text('encoding_detection_failed')}: {e}")
+            return 'utf-8'
+    
+    def _download_source(self, source_id: str, source_config: Dict, target_dir: Optional[Path] = None,
+                         max_attempts: Optional[int] = None,
+                         settings: Optional[IPTVConfigSnapshot] = None) -> Tuple[bool, str]:
+        """
+        下载单个直播源
+        
+        Args:
+            source_id: 源标识符
+            source_config: 源配置信息
+            target_dir: 写入目录 (暂存版本目录)，默认为数据目录
+            max_attempts: 最大尝试次数，默认为 download.retry_count
+            settings: 本次运行使用的配置快照，默认为当前快照
+            
+        Returns:
+            (成功标志, 错误信息)
+        """
+        settings = settings or self.config.snapshot
+        download = settings.download
+        url = source_config['url']
+        filename = source_config['filename']
+        name = settings.source_name(source_id, source_config)
+        
+        logging.info(f"{get_text('download_source')} {name}: {url}")
+        
+        import requests
+        retry_count = max_attempts or download.retry_count
+        retry_delay = download.retry_delay
+        timeout = download.timeout
+        
+        data_dir = settings.data_dir
+        file_path = (target_dir or data_dir) / filename
+        
+        # 展开嵌套列表的源内容取决于子列表，不能只凭上层列表的校验信息判断未变化
+        resolve_nested = source_config.get('resolve_nested', download.resolve_nested)
+        
+        # 上次下载记录的 HTTP 校验信息，用于条件请求
+        previous = self._previous_manifest.get(filename, {})
+        conditional_headers = {}
+        if download.conditional_requests and not resolve_nested and previous.get('url') == url and file_path.exists():
+            if previous.get('etag'):
+                conditional_headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                conditional_headers['If-Modified-Since'] = previous['last_modified']
+        
+        labels = {'source': source_id}
+        span = self.tracer.span
+        for attempt in range(retry_count):
+            started = time.time()
+            phase = {'source': source_id, 'attempt': attempt + 1}
+            try:
+                with span('fetch', **phase) as attributes:
+                    response, shared = self.fetch(url, timeout, conditional_headers, phase)
+                    attributes['status'] = response.status_code
+                    attributes['shared'] = shared
+                if shared:
+                    self.metrics.inc('iptv_download_coalesced', labels)
+                
+                # 内容未变化，沿用当前版本中的文件
+                if response.status_code == 304 and conditional_headers:
+                    self.fetch_info[source_id] = dict(previous, fetched_at=time.time(), fetch_duration=round(time.time() - started, 3))
+                    entry = self._record_attempt(source_id, 'not_modified', started, attempt + 1)
+                    logging.info(f"{get_text('download_not_modified')} {name}: {filename}", extra=entry)
+                    return True, ""
+                
+                content = response.content
+                if not content:
+                    raise ValueError(get_text('empty_content'))
+                
+                # 检测编码并解码
+                with span('detect_encoding', **phase):
+                    encoding = self._detect_encoding(content)
+                with span('decode', **phase):
+                    try:
+                        text_content = content.decode(encoding)
+                    except UnicodeDecodeError:
+                        text_content = content.decode('utf-8', errors='ignore')
+                        logging.warning(f"{get_text('force_utf8')}: {filename}")
+                
+                # TXT 格式 ("频道名,地址" / "分组,#genre#") 转换为 M3U
+                source_format = source_config.get('format', 'auto')
+                if source_format == 'auto':
+                    source_format = IPTVTxtPlaylist.detect(text_content)
+                if source_format == 'txt':
+                    with span('convert', **phase):
+                        text_content = IPTVTxtPlaylist.to_m3u(text_content)
+                
+                # 验证M3U格式
+                with span('validate', **phase):
+                    valid = self._validate_m3u_content(text_content)
+                if not valid:
+                    raise ValueError(get_text('invalid_m3u'))
+                
+                # 展开嵌套播放列表
+                if resolve_nested:
+                    resolver = self.resolver or IPTVNestedResolver(self, settings)
+                    with span('resolve_nested', **phase) as attributes:
+                        text_content, stats = resolver.resolve(text_content, url, source_id)
+                        attributes.update(stats)
+                    if stats['playlists'] or stats['failed'] or stats['cycles']:
+                        logging.info(f"{get_text('nested_resolved')} {name}: {stats['playlists']} {get_text('nested_playlists')}, "
+                                     f"{stats['failed']} {get_text('nested_failed')}, {stats['cycles']} {get_text('nested_cycles')}",
+                                     extra=dict(stats, source_id=source_id))
+                
+                # 保存文件
+                published_path = data_dir / filename
+                
+                # 备份现有文件
+                if published_path.exists() and settings.maintenance.enable_backup:
+                    with span('backup', **phase):
+                        self._backup_file(published_path, settings.backup_dir)
+                
+                # 写入新文件 (原子替换，避免修改与旧版本共享的硬链接)
+                import hashlib
+                with span('write', **phase):
+                    data = text_content.encode('utf-8')
+                    self._atomic_write(file_path, data)
+                
+                # JSON / TXT / 二进制索引等派生格式
+                outputs = IPTVOutputFormats(settings)
+                if outputs.formats:
+                    with span('outputs', **phase):
+                        output_names = outputs.write(file_path.parent, filename, text_content)
+                
+                with span('hash', **phase):
+                    content_hash = hashlib.sha256(data).hexdigest()
+                    channel_count = text_content.count('#EXTINF:')
+                file_size = len(data)
+                self.fetch_info[source_id] = {
+                    'source_id': source_id,
+                    'url': url,
+                    'size': file_size,
+                    'channels': channel_count,
+                    'content_hash': content_hash,
+                    'encoding': encoding,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'fetched_at': time.time(),
+                    'fetch_duration': round(time.time() - started, 3),
+                }
+                if outputs.formats:
+                    self.fetch_info[source_id]['outputs'] = output_names
+                entry = self._record_attempt(source_id, 'success', started, attempt + 1, len(content))
+                
+                logging.info(f"{get_text('download_success')} {name}: {filename} ({file_size} bytes, {channel_count} {get_text('channels')})",
+                             extra=dict(entry, channels=channel_count))
+                return True, ""
+                
+            except requests.exceptions.RequestException as e:
+                error_msg = f"{get_text('network_error')}: {e}"
+                entry = self._record_attempt(source_id, 'network_error', started, attempt + 1, error=error_msg)
+                logging.warning(f"{get_text('download_failed')} {name} ({get_text('download_retry')} {attempt + 1}/{retry_count}): {error_msg}",
+                                extra=entry)
+                
+                if attempt < retry_count - 1:
+                    self.metrics.inc('iptv_download_retries', labels)
+                    with span('retry_wait', **phase):
+                        time.sleep(retry_delay)
+                else:
+                    logging.error(f"{get_text('download_final_failed')} {name}: {error_msg}")
+                    return False, error_msg
+                    
+            except Exception as e:
+                error_msg = f"{get_text('unknown_error')}: {e}"
+                entry = self._record_attempt(source_id, 'error', started, attempt + 1, error=error_msg)
+                logging.error(f"{get_text('download_failed')} {name}: {error_msg}", extra=entry)
+                return False, error_msg
+        
+        return False, get_text('retry_exhausted')
+    
+    def fetch(self, url: str, timeout: float, headers: Optional[Dict[str, str]] = None,
+              phase: Optional[Dict] = None) -> Tuple[IPTVFetchResult, bool]:
+        """
+        获取地址内容；同一规范化地址 (及相同条件请求头) 的并发请求合并为一次
+        
+        Args:
+            url: 地址
+            timeout: 超时秒数
+            headers: 附加请求头 (条件请求)
+            phase: 追踪 span 的属性
+        
+        Returns:
+            (获取结果, 是否共享了其他调用者的请求)
+        
+        Raises:
+            requests.exceptions.RequestException: 网络错误或 HTTP 错误状态 (304 除外)
+        """
+        headers = headers or {}
+        key = (normalize_url(url), tuple(sorted(headers.items())))
+        return self.single_flight.do(key, lambda: self._fetch(url, timeout, headers, phase or {}))
+    
+    def _fetch(self, url: str, timeout: float, headers: Dict[str, str], phase: Dict) -> IPTVFetchResult:
+        span = self.tracer.span
+        labels = {'source': phase.get('source', '')}
+        # requests 不单独暴露 DNS/连接/TLS 耗时，request 阶段包含它们直到收到响应头 (TTFB)
+        with span('request', **phase) as attributes:
+            response = self.session.get(url, timeout=timeout, stream=True, headers=headers)
+            attributes['status'] = response.status_code
+        if response.status_code == 304:
+            response.close()
+            return IPTVFetchResult(url, 304, response.headers, b'')
+        response.raise_for_status()
+        
+        # 获取内容
+        with span('body', **phase) as attributes:
+            content = response.content
+            attributes['bytes'] = len(content)
+        self.metrics.inc('iptv_download_bytes', labels, len(content))
+        return IPTVFetchResult(url, response.status_code, response.headers, content)
+    
+    def _record_attempt(self, source_id: str, result: str, started: float, attempt: int,
+                        size: int = 0, error: str = '') -> Dict:
+        """
+        记录单次下载尝试的指标和运行历史
+
+        Returns:
+            尝试记录，同时作为结构化日志字段
+        """
+        duration = time.time() - started
+        self.metrics.inc('iptv_download_attempts', {'source': source_id, 'result': result})
+        self.metrics.observe('iptv_download_duration_seconds', duration, {'source': source_id})
+        entry = {
+            'event': 'download_attempt',
+            'source_id': source_id,
+            'attempt': attempt,
+            'result': result,
+            'started_at': started,
+            'duration': round(duration, 3),
+            'bytes': size,
+            'error': error,
+        }
+        self.attempt_log.append(entry)
+        return entry
+    
+    @staticmethod
+    def _atomic_write(file_path: Path, data: bytes):
+        """写入临时文件后原子替换目标文件 / Write to a temp file and atomically replace"""
+        tmp_path = file_path.with_name(f".{file_path.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        # 设置文件权限 (644)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, file_path)
+    
+    def _validate_m3u_content(self, content: str) -> bool:
+        """验证M3U文件内容格式 / Validate M3U file content format"""
+        if not content or content.isspace():
+            return False
+        
+        if not content.lstrip().startswith('#EXTM3U'):
+            logging.warning(get_text('m3u_missing_header'))
+        
+        # 检查是否包含频道信息 (按行匹配，找到第一处即停止，不拆分整个文本)
+        return bool(IPTVPlaylist.EXTINF_LINE.search(content) and IPTVPlaylist.URL_LINE.search(content))
+    
+    def _backup_file(self, file_path: Path, backup_dir: Optional[Path] = None):
+        """备份现有文件 / Backup existing file"""
+        try:
+            backup_dir = backup_dir or self.config.snapshot.backup_dir
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            backup_name = f"{file_path.stem}_{timestamp}{file_path.suffix}"
+            backup_path = backup_dir / backup_name
+            
             shutil.copy2(file_path, backup_path)
             logging.debug(f"{get_text('backup_file')}: {file_path} -> {backup_path}")
             
         except Exception as e:
-            logging.warning(f"{get_text('backup_failed')}: {e}")
-    
-    def download_all_sources(self) -> Dict[str, Tuple[bool, str]]:
+            logging.warning(f"{get_text('backup_failed')}: {e}")
+    
+    def download_all_sources(self, sources: Optional[Dict] = None) -> Dict[str, Tuple[bool, str]]:
+        """
+        并发下载所有启用的直播源
+        
+        Args:
+            sources: 仅下载这些源 (默认全部启用的源)，其余源沿用当前版本
+        
+        Returns:
+            下载结果字典 {source_id: (成功标志, 错误信息)}
+        """
+        # 整次运行使用同一个配置快照，运行期间重新加载配置不影响工作线程
+        settings = self.config.snapshot
+        enabled_sources = self.config.get_sources()
+        if sources is None:
+            sources = enabled_sources
+        if not sources:
+            logging.warning(get_text('no_enabled_sources'))
+            return {}
+        
+        logging.info(f"Starting download of {len(sources)} live sources" if get_text('language') == 'en' else f"开始下载 {len(sources)} 个直播源")
+        
+        results = {}
+        self.tracer.reset()
+        self.attempt_log = []
+        # 嵌套列表的获取结果只在本次运行内缓存
+        self.resolver = IPTVNestedResolver(self, settings)
+        
+        # 熔断中的源直接跳过；冷却期结束的源只做一次半开探测
+        attempts = {}
+        for source_id in sources:
+            allowed, state = self.breaker.allow(source_id)
+            if not allowed:
+                results[source_id] = (False, self.breaker.describe(source_id))
+                self.metrics.inc('iptv_breaker_skips', {'source': source_id})
+                logging.warning(f"{get_text('breaker_skip')} {source_id}: {results[source_id][1]}")
+            elif state == IPTVCircuitBreaker.HALF_OPEN:
+                attempts[source_id] = 1
+                self.metrics.inc('iptv_breaker_probes', {'source': source_id})
+                logging.info(f"{get_text('breaker_probe')} {source_id}")
+            else:
+                attempts[source_id] = None
+        
+        # 所有源写入同一个暂存版本，全部完成后一次性发布
+        outputs = IPTVOutputFormats(settings)
+        filenames = [source_config['filename'] for source_config in enabled_sources.values()]
+        with self.tracer.span('stage', files=len(filenames)):
+            generation, staging_dir = self.publisher.begin(filenames + outputs.names(filenames))
+            previous_manifest = self.publisher.read_manifest()
+            self._previous_manifest = previous_manifest.get('sources', {})
+        for source_id in attempts:
+            self.fetch_info.pop(source_id, None)
+        
+        if attempts:
+            from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+            from itertools import islice
+            max_workers = min(len(attempts), settings.download.max_workers)
+            # 按优先级顺序分批提交，排队的任务不超过线程数的两倍，数千个源时不一次创建全部任务
+            pending = iter(sorted(attempts.items(), key=lambda item: -sources[item[0]].get('priority', 0)))
+            future_to_source = {}
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                while True:
+                    for source_id, max_attempts in islice(pending, max_workers * 2 - len(future_to_source)):
+                        future = executor.submit(self._traced_download, source_id, sources[source_id], staging_dir,
+                                                 max_attempts, settings)
+                        future_to_source[future] = source_id
+                    if not future_to_source:
+                        break
+                    done, _ = wait(future_to_source, return_when=FIRST_COMPLETED)
+                    
+                    # 收集结果
+                    for future in done:
+                        source_id = future_to_source.pop(future)
+                        try:
+                            success, error_msg = future.result()
+                            results[source_id] = (success, error_msg)
+                        except Exception as e:
+                            error_msg = f"任务执行异常: {e}"
+                            logging.error(f"{get_text('source_download_error', source_id)}: {error_msg}")
+                            results[source_id] = (False, error_msg)
+                        
+                        if results[source_id][0]:
+                            self.breaker.record_success(source_id)
+                        else:
+                            self.breaker.record_failure(source_id, results[source_id][1])
+            self.breaker.save()
+        
+        for source_id, (success, _) in results.items():
+            labels = {'source': source_id}
+            self.metrics.set('iptv_source_up', 1 if success else 0, labels)
+            if success and source_id in self.fetch_info:
+                self.metrics.set('iptv_source_channels', self.fetch_info[source_id]['channels'], labels)
+                self.metrics.set('iptv_source_last_success_timestamp_seconds', self.fetch_info[source_id]['fetched_at'], labels)
+            elif not success:
+                self.metrics.inc('iptv_source_failures', labels)
+        
+        # 统计结果
+        success_count = sum(1 for success, _ in results.values() if success)
+        total_count = len(results)
+        
+        logging.info(f"{get_text('download_complete_stats')}: {success_count}/{total_count} {get_text('success_sources')}")
+        
+        # 发布新版本；全部失败时保留当前版本
+        if success_count > 0:
+            try:
+                entries = {
+                    sources[source_id]['filename']: self.fetch_info[source_id]
+                    for source_id, (success, _) in results.items()
+                    if success and source_id in self.fetch_info
+                }
+                with self.tracer.span('outputs', generation=generation):
+                    merged = outputs.complete(staging_dir, filenames, entries, self._previous_manifest,
+                                              previous_manifest.get('merged', {}))
+                with self.tracer.span('publish', generation=generation):
+                    manifest = self.publisher.write_manifest(generation, staging_dir, entries, self._previous_manifest,
+                                                             merged)
+                    if self.publisher.unchanged(manifest, previous_manifest):
+                        # 没有文件内容变化：不切换版本，避免无意义的版本号和增量记录
+                        generation = previous_manifest['generation']
+                        self.publisher.keep_current(manifest, previous_manifest, staging_dir)
+                        logging.info(f"{get_text('generation_unchanged')}: {generation}")
+                    else:
+                        self.publisher.commit(generation, staging_dir)
+                self.metrics.set('iptv_generation', generation)
+            except Exception as e:
+                logging.error(f"{get_text('generation_publish_failed')}: {e}")
+                self.publisher.discard(staging_dir)
+        else:
+            logging.warning(get_text('generation_publish_skipped'))
+            self.publisher.discard(staging_dir)
+        
+        self.tracer.write_chrome_trace()
+        return results
+    
+    def _traced_download(self, source_id: str, source_config: Dict, target_dir: Optional[Path] = None,
+                         max_attempts: Optional[int] = None,
+                         settings: Optional[IPTVConfigSnapshot] = None) -> Tuple[bool, str]:
+        """下载单个源并记录整体 span / Download one source inside a per-source span"""
+        with self.tracer.span('source', source=source_id) as attributes:
+            success, error_msg = self._download_source(source_id, source_config, target_dir, max_attempts, settings)
+            attributes['success'] = success
+        return success, error_msg
+
+
+class IPTVCircuitBreaker:
+    """
+    直播源熔断器 / Per-source circuit breaker
+
+    连续失败 download.breaker_threshold 次后熔断 (open)，之后的运行直接跳过该源；
+    冷却 download.breaker_cooldown 秒后进入半开 (half_open) 状态，只尝试一次，
+    成功则恢复 (closed)，失败则重新熔断。状态保存在 state/breakers.json。
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    STATE_FILE = "breakers.json"
+
+    def __init__(self, config: IPTVConfig):
+        """
+        初始化熔断器
+
+        Args:
+            config: 配置管理器实例
+        """
+        self.config = config
+        self._lock = threading.Lock()
+        self.states = self._load()
+
+    @property
+    def state_path(self) -> Path:
+        return Path(self.config.get('directories.base_dir')) / self.config.get('directories.state_dir', 'state') / self.STATE_FILE
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """保存熔断状态 / Persist breaker states"""
+        with self._lock:
+            data = json.dumps(self.states, indent=2, ensure_ascii=False).encode('utf-8')
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            IPTVDownloader._atomic_write(self.state_path, data)
+        except Exception as e:
+            logging.warning(f"{get_text('breaker_save_failed')}: {e}")
+
+    def _entry(self, source_id: str) -> Dict:
+        return self.states.setdefault(source_id, {'state': self.CLOSED, 'failures': 0})
+
+    def allow(self, source_id: str) -> Tuple[bool, str]:
+        """
+        判断本次是否下载该源
+
+        Returns:
+            (是否允许, 当前状态)
+        """
+        if not self.config.get('download.breaker_enabled', True):
+            return True, self.CLOSED
+        with self._lock:
+            entry = self._entry(source_id)
+            if entry['state'] == self.OPEN:
+                cooldown = self.config.get('download.breaker_cooldown', 3600)
+                if time.time() - entry.get('opened_at', 0) < cooldown:
+                    return False, self.OPEN
+                entry['state'] = self.HALF_OPEN
+            return True, entry['state']
+
+    def record_success(self, source_id: str):
+        with self._lock:
+            entry = self._entry(source_id)
+            if entry['state'] != self.CLOSED:
+                logging.info(f"{get_text('breaker_closed')} {source_id}")
+            entry.update({'state': self.CLOSED, 'failures': 0, 'last_success': time.time()})
+            entry.pop('opened_at', None)
+
+    def record_failure(self, source_id: str, error_msg: str):
+        threshold = self.config.get('download.breaker_threshold', 5)
+        with self._lock:
+            entry = self._entry(source_id)
+            entry['failures'] = entry.get('failures', 0) + 1
+            entry['last_failure'] = time.time()
+            entry['last_error'] = error_msg
+            if entry['state'] == self.HALF_OPEN or entry['failures'] >= threshold:
+                if entry['state'] != self.OPEN:
+                    logging.warning(f"{get_text('breaker_opened')} {source_id}: {entry['failures']} {get_text('breaker_consecutive_failures')}")
+                entry['state'] = self.OPEN
+                entry['opened_at'] = time.time()
+
+    def describe(self, source_id: str) -> str:
+        """熔断状态的可读描述 / Human readable breaker state"""
+        entry = self.states.get(source_id)
+        if not entry:
+            return get_text('breaker_state_closed')
+        text = get_text(f"breaker_state_{entry['state']}")
+        if entry.get('failures'):
+            text += f", {entry['failures']} {get_text('breaker_consecutive_failures')}"
+        if entry['state'] == self.OPEN:
+            retry_at = entry.get('opened_at', 0) + self.config.get('download.breaker_cooldown', 3600)
+            text += f", {get_text('breaker_retry_at')} {datetime.fromtimestamp(retry_at).strftime('%Y-%m-%d %H:%M:%S')}"
+        return text
+
+
+class IPTVMetrics:
+    """
+    运行指标 / Run metrics in Prometheus/OpenMetrics format
+
+    记录每个源的下载次数、耗时、传输字节数、重试与失败等计数器和直方图。
+    --download 运行结束后写入 textfile collector 文件 (metrics.textfile)，
+    --serve/--daemon 模式下由发布服务器在 /metrics 提供。
+    """
+
+    DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+    OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+    PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    # 名称: (类型, 说明)；计数器名称不含 _total 后缀
+    METRICS = {
+        'iptv_download_attempts': ('counter', 'Download attempts per source and result'),
+        'iptv_download_retries': ('counter', 'Download retries after a failed attempt'),
+        'iptv_download_bytes': ('counter', 'Playlist bytes transferred'),
+        'iptv_download_coalesced': ('counter', 'Downloads that shared an in-flight request for the same URL'),
+        'iptv_download_duration_seconds': ('histogram', 'Duration of a single download attempt'),
+        'iptv_source_failures': ('counter', 'Sources that failed after all attempts'),
+        'iptv_breaker_skips': ('counter', 'Downloads skipped by an open circuit breaker'),
+        'iptv_breaker_probes': ('counter', 'Half-open circuit breaker probe downloads'),
+        'iptv_source_up': ('gauge', 'Whether the last download of the source succeeded'),
+        'iptv_source_channels': ('gauge', 'Channel count of the published playlist'),
+        'iptv_source_last_success_timestamp_seconds': ('gauge', 'Time of the last successful download'),
+        'iptv_runs': ('counter', 'Completed download runs per result'),
+        'iptv_run_duration_seconds': ('histogram', 'Duration of a complete download run'),
+        'iptv_last_run_timestamp_seconds': ('gauge', 'Time the last download run finished'),
+        'iptv_generation': ('gauge', 'Currently published generation'),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._histograms = {}
+
+    @staticmethod
+    def _key(labels: Optional[Dict[str, str]]) -> Tuple:
+        return tuple(sorted((labels or {}).items()))
+
+    def inc(self, name: str, labels: Optional[Dict[str, str]] = None, amount: float = 1):
+        """计数器加值 / Increment a counter"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """设置仪表值 / Set a gauge"""
+        with self._lock:
+            self._values.setdefault(name, {})[self._key(labels)] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """记录直方图观测值 / Observe a histogram value"""
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            buckets, total, count = series.get(key, ([0] * len(self.DEFAULT_BUCKETS), 0.0, 0))
+            buckets = [n + (1 if value <= bound else 0) for n, bound in zip(buckets, self.DEFAULT_BUCKETS)]
+            series[key] = (buckets, total + value, count + 1)
+
+    @staticmethod
+    def _format_labels(key: Tuple, extra: Tuple = ()) -> str:
+        pairs = key + extra
+        if not pairs:
+            return ''
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return '{' + ','.join(f'{label}="{escape(value)}"' for label, value in pairs) + '}'
+
+    @staticmethod
+    def _format_value(value: float) -> str:
+        return repr(float(value)) if isinstance(value, float) else str(value)
+
+    def render(self, openmetrics: bool = True) -> str:
+        """
+        生成指标文本
+
+        Args:
+            openmetrics: True 为 OpenMetrics 格式，False 为 Prometheus 文本格式 (textfile collector)
+        """
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in self.METRICS.items():
+                if kind == 'histogram':
+                    series = self._histograms.get(name)
+                else:
+                    series = self._values.get(name)
+                if not series:
+                    continue
+                family = name if openmetrics or kind != 'counter' else f"{name}_total"
+                lines.append(f"# HELP {family} {help_text}")
+                lines.append(f"# TYPE {family} {kind}")
+                for key in sorted(series):
+                    if kind == 'histogram':
+                        buckets, total, count = series[key]
+                        for bound, n in zip(self.DEFAULT_BUCKETS, buckets):
+                            lines.append(f"{name}_bucket{self._format_labels(key, (('le', repr(bound)),))} {n}")
+                        lines.append(f"{name}_bucket{self._format_labels(key, (('le', '+Inf'),))} {count}")
+                        lines.append(f"{name}_count{self._format_labels(key)} {count}")
+                        lines.append(f"{name}_sum{self._format_labels(key)} {self._format_value(total)}")
+                    else:
+                        sample = f"{name}_total" if kind == 'counter' else name
+                        lines.append(f"{sample}{self._format_labels(key)} {self._format_value(series[key])}")
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path):
+        """原子写入 textfile collector 文件 / Atomically write a node_exporter textfile"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        IPTVDownloader._atomic_write(path, self.render(openmetrics=False).encode('utf-8'))
+
+    def handle_request(self, path: str, query: str, headers: Dict[str, str]) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        """/metrics 路由，按 Accept 协商格式 / /metrics route with content negotiation"""
+        openmetrics = 'application/openmetrics-text' in headers.get('accept', '')
+        content_type = self.OPENMETRICS_CONTENT_TYPE if openmetrics else self.PROMETHEUS_CONTENT_TYPE
+        return 200, [('Content-Type', content_type), ('Cache-Control', 'no-store')], self.render(openmetrics).encode('utf-8')
+
+
+class IPTVTracer:
+    """
+    阶段耗时追踪 / Lightweight phase tracing
+
+    为每个源、每次尝试的各个阶段 (请求、接收、编码检测、校验、备份、写入等) 记录一个 span。
+    span 作为结构化日志记录输出到 iptv_manager.trace 日志器 (记录的 span 属性包含完整字段)，
+    开启 tracing.chrome_trace 后每次运行另存为 Chrome trace JSON (chrome://tracing / Perfetto)。
+    """
+
+    def __init__(self, config: IPTVConfig):
+        """
+        初始化追踪器
+
+        Args:
+            config: 配置管理器实例
+        """
+        self.config = config
+        self.logger = logging.getLogger('iptv_manager.trace')
+        self.events = []
+        self._origin = time.perf_counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.config.get('tracing.enabled', True)
+
+    def reset(self):
+        """开始新的一次运行 / Start a new trace"""
+        self.events = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        记录一个阶段
+
+        Args:
+            name: 阶段名称
+            attributes: 附加属性，如 source、attempt
+        """
+        if not self.enabled:
+            yield attributes
+            return
+        started = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes['error'] = type(e).__name__
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            event = {
+                'name': name,
+                'ts': round((started - self._origin) * 1e6),
+                'dur': round(duration * 1e6),
+                'tid': threading.get_ident(),
+                'args': attributes,
+            }
+            self.events.append(event)
+            level = logging.getLevelName(self.config.get('tracing.log_level', 'DEBUG'))
+            if self.logger.isEnabledFor(level):
+                details = ' '.join(f"{key}={value}" for key, value in attributes.items())
+                self.logger.log(level, f"span {name} {duration * 1000:.1f}ms {details}".rstrip(),
+                                extra={'span': dict(event, duration=duration)})
+
+    def write_chrome_trace(self) -> Optional[Path]:
+        """
+        按配置将本次运行的 span 保存为 Chrome trace JSON
+
+        Returns:
+            文件路径，未开启或没有 span 时为 None
+        """
+        if not self.config.get('tracing.chrome_trace', False) or not self.events:
+            return None
+        log_dir = Path(self.config.get('directories.base_dir')) / self.config.get('directories.log_dir')
+        trace_path = log_dir / f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        pid = os.getpid()
+        trace = {
+            'traceEvents': [
+                {'name': event['name'], 'cat': 'iptv', 'ph': 'X', 'ts': event['ts'], 'dur': event['dur'],
+                 'pid': pid, 'tid': event['tid'], 'args': event['args']}
+                for event in self.events
+            ],
+            'displayTimeUnit': 'ms',
+        }
+        try:
+            log_dir.mkdir(parents=True, exist_ok=True)
+            IPTVDownloader._atomic_write(trace_path, json.dumps(trace, ensure_ascii=False).encode('utf-8'))
+            logging.info(f"{get_text('trace_saved')}: {trace_path}")
+            return trace_path
+        except Exception as e:
+            logging.warning(f"{get_text('trace_save_failed')}: {e}")
+            return None
+
+
+class IPTVProfiler:
+    """
+    性能剖析 / Built-in profiling for --profile
+
+    在任务运行期间同时启用：
+    - cProfile (Python 3.12 以下为每个工作线程单独剖析后合并)，保存为 .pstats
+    - 基于 sys._current_frames 的采样器，保存为 collapsed stack 格式 (flamegraph.pl / speedscope)
+    - 可选 tracemalloc，在各阶段结束时记录内存峰值和分配位置
+    文件写入日志目录，命名为 profile_<任务>_<时间>.*
+    """
+
+    def __init__(self, config: IPTVConfig, job: str, memory: bool = False):
+        """
+        初始化剖析器
+
+        Args:
+            config: 配置管理器实例
+            job: 任务名称，用于文件名
+            memory: 是否启用 tracemalloc
+        """
+        self.config = config
+        self.job = job
+        self.memory = memory
+        self.sample_interval = config.get('profile.sample_interval', 0.005)
+        self.samples = {}
+        self.phases = []
+        self._profile = None
+        self._thread_profiles = []
+        self._sampler = None
+        self._stop = threading.Event()
+
+    @property
+    def output_prefix(self) -> Path:
+        log_dir = Path(self.config.get('directories.base_dir')) / self.config.get('directories.log_dir')
+        return log_dir / f"profile_{self.job}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    def _profile_thread(self, frame, event, arg):
+        # 新线程启动时由 threading.setprofile 调用一次，随后由 cProfile 接管该线程
+        import cProfile
+        profile = cProfile.Profile()
+        self._thread_profiles.append(profile)
+        profile.enable()
+
+    def _sample(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                # 采样时只记录代码对象，保存时再格式化，减少采样开销
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                key = (names.get(ident, str(ident)), tuple(reversed(stack)))
+                self.samples[key] = self.samples.get(key, 0) + 1
+
+    def collapsed_stacks(self) -> Dict[str, int]:
+        """采样结果转换为 collapsed stack 格式 / Samples as collapsed stacks"""
+        collapsed = {}
+        for (thread_name, codes), count in self.samples.items():
+            frames = [f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})" for code in codes]
+            stack = ';'.join([thread_name] + frames)
+            collapsed[stack] = collapsed.get(stack, 0) + count
+        return collapsed
+
+    def __enter__(self):
+        import cProfile
+        if self.memory:
+            import tracemalloc
+            tracemalloc.start()
+        if sys.version_info < (3, 12):
+            threading.setprofile(self._profile_thread)
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        self._sampler = threading.Thread(target=self._sample, name='iptv-profile-sampler', daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        threading.setprofile(None)
+        for profile in self._thread_profiles:
+            profile.disable()
+        self._stop.set()
+        self._sampler.join()
+        if self.memory:
+            import tracemalloc
+            tracemalloc.stop()
+        self.save()
+        return False
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        标记一个阶段；启用 tracemalloc 时记录该阶段的内存峰值与分配快照
+
+        Args:
+            name: 阶段名称
+        """
+        if not self.memory:
+            yield
+            return
+        import tracemalloc
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            self.phases.append((name, current, peak, tracemalloc.take_snapshot()))
+
+    def _write_memory_report(self, path: Path):
+        import tracemalloc
+        lines = []
+        previous = None
+        for name, current, peak, snapshot in self.phases:
+            snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                               tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')])
+            lines.append(f"== {name}: current {current / 1024 / 1024:.2f} MB, peak {peak / 1024 / 1024:.2f} MB")
+            if previous is None:
+                statistics = snapshot.statistics('lineno')
+            else:
+                statistics = snapshot.compare_to(previous, 'lineno')
+            for stat in statistics[:15]:
+                lines.append(f"  {stat}")
+            lines.append("")
+            previous = snapshot
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+
+    def save(self):
+        """写入剖析结果 / Write profiling output files"""
+        import pstats
+        prefix = self.output_prefix
+        try:
+            prefix.parent.mkdir(parents=True, exist_ok=True)
+            stats = pstats.Stats(self._profile)
+            for profile in self._thread_profiles:
+                try:
+                    stats.add(profile)
+                except TypeError:
+                    # 线程中没有执行任何被剖析的函数
+                    continue
+            stats.dump_stats(f"{prefix}.pstats")
+            with open(f"{prefix}.collapsed", 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self.collapsed_stacks().items()):
+                    f.write(f"{stack} {count}\n")
+            written = [f"{prefix}.pstats", f"{prefix}.collapsed"]
+            if self.phases:
+                self._write_memory_report(Path(f"{prefix}.memory.txt"))
+                written.append(f"{prefix}.memory.txt")
+            print(f"{get_text('profile_saved')}: {', '.join(written)}")
+        except Exception as e:
+            print(f"{get_text('profile_save_failed')}: {e}")
+
+
+class IPTVRunHistory:
+    """
+    运行历史数据库 / SQLite run history
+
+    每次运行和每个源的每次下载尝试记录在 state/history.db (WAL 模式)，
+    按源和时间建立覆盖索引，趋势查询 (如 30 天内某源下载耗时 p95) 无需扫描日志。
+    """
+
+    DB_FILE = "history.db"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at REAL NOT NULL,
+            finished_at REAL NOT NULL,
+            duration REAL NOT NULL,
+            generation INTEGER,
+            sources INTEGER NOT NULL,
+            failed INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started_at);
+        CREATE TABLE IF NOT EXISTS attempts (
+            id INTEGER PRIMARY KEY,
+            run_id INTEGER NOT NULL REFERENCES runs (id),
+            source_id TEXT NOT NULL,
+            attempt INTEGER NOT NULL,
+            result TEXT NOT NULL,
+            started_at REAL NOT NULL,
+            duration REAL NOT NULL,
+            bytes INTEGER NOT NULL DEFAULT 0,
+            error TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_attempts_source_time ON attempts (source_id, started_at, result, duration);
+        CREATE INDEX IF NOT EXISTS idx_attempts_run ON attempts (run_id);
+    """
+    # 计入耗时统计的结果
+    COMPLETED_RESULTS = ('success', 'not_modified')
+
+    def __init__(self, config: IPTVConfig):
         """
-        并发下载所有启用的直播源
-        
+        初始化运行历史
+
+        Args:
+            config: 配置管理器实例
+        """
+        self.config = config
+        self._initialized = False
+
+    @property
+    def db_path(self) -> Path:
+        return Path(self.config.get('directories.base_dir')) / self.config.get('directories.state_dir', 'state') / self.DB_FILE
+
+    def _connect(self):
+        import sqlite3
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.db_path), timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if not self._initialized:
+            connection.executescript(self.SCHEMA)
+            self._initialized = True
+        return connection
+
+    def record_run(self, started_at: float, finished_at: float, download_results: Dict[str, Tuple[bool, str]],
+                   attempts: List[Dict], generation: Optional[int]) -> Optional[int]:
+        """
+        记录一次运行及其下载尝试
+
+        Args:
+            started_at: 运行开始时间戳
+            finished_at: 运行结束时间戳
+            download_results: 下载结果
+            attempts: 下载器记录的尝试列表
+            generation: 当前发布版本
+
         Returns:
-            下载结果字典 {source_id: (成功标志, 错误信息)}
+            运行ID，失败时为 None
         """
-        sources = self.config.get_sources()
-        if not sources:
-            logging.warning(get_text('no_enabled_sources'))
-            return {}
-        
-        logging.info(f"Starting download of {len(sources)} live sources" if get_text('language') == 'en' else f"开始下载 {len(sources)} 个直播源")
-        
-        results = {}
-        max_workers = min(len(sources), self.config.get('download.max_workers', 4))
-        
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # 提交所有下载任务
-            future_to_source = {
-                executor.submit(self._download_source, source_id, source_config): source_id
-                for source_id, source_config in sources.items()
-            }
-            
-            # 收集结果
-            for future in as_completed(future_to_source):
-                source_id = future_to_source[future]
-                try:
-                    success, error_msg = future.result()
-                    results[source_id] = (success, error_msg)
-                except Exception as e:
-                    error_msg = f"任务执行异常: {e}"
-                    logging.error(f"{get_text('source_download_error', source_id)}: {error_msg}")
-                    results[source_id] = (False, error_msg)
-        
-        # 统计结果
-        success_count = sum(1 for success, _ in results.values() if success)
-        total_count = len(results)
-        
-        logging.info(f"{get_text('download_complete_stats')}: {success_count}/{total_count} {get_text('success_sources')}")
-        
-        return results
+        try:
+            rows = [(entry['source_id'], entry['attempt'], entry['result'], entry['started_at'],
+                     entry['duration'], entry['bytes'], entry['error'] or None) for entry in attempts]
+            # 被熔断跳过的源没有下载尝试，记录为 skipped
+            attempted = {entry['source_id'] for entry in attempts}
+            rows += [(source_id, 0, 'skipped', started_at, 0.0, 0, error_msg)
+                     for source_id, (_, error_msg) in download_results.items() if source_id not in attempted]
+            failed = sum(1 for success, _ in download_results.values() if not success)
+
+            connection = self._connect()
+            try:
+                with connection:
+                    cursor = connection.execute(
+                        "INSERT INTO runs (started_at, finished_at, duration, generation, sources, failed) VALUES (?, ?, ?, ?, ?, ?)",
+                        (started_at, finished_at, finished_at - started_at, generation, len(download_results), failed))
+                    run_id = cursor.lastrowid
+                    connection.executemany(
+                        "INSERT INTO attempts (run_id, source_id, attempt, result, started_at, duration, bytes, error) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [(run_id,) + row for row in rows])
+            finally:
+                connection.close()
+            return run_id
+        except Exception as e:
+            logging.warning(f"{get_text('history_save_failed')}: {e}")
+            return None
+
+    @staticmethod
+    def _percentile(connection, source_id: str, since: float, count: int, fraction: float) -> Optional[float]:
+        if not count:
+            return None
+        row = connection.execute(
+            "SELECT duration FROM attempts WHERE source_id = ? AND started_at >= ? AND result IN (?, ?) "
+            "ORDER BY duration LIMIT 1 OFFSET ?",
+            (source_id, since) + IPTVRunHistory.COMPLETED_RESULTS + (min(count - 1, int(fraction * count)),)).fetchone()
+        return row[0] if row else None
+
+    def source_stats(self, days: float = 30, source_id: Optional[str] = None) -> List[Dict]:
+        """
+        按源汇总最近 N 天的下载情况
+
+        Args:
+            days: 统计天数
+            source_id: 只统计该源
+
+        Returns:
+            每个源一项：尝试次数、成功率、p50/p95/最大耗时、最近成功时间
+        """
+        if not self.db_path.exists():
+            return []
+        since = time.time() - days * 86400
+        connection = self._connect()
+        try:
+            if source_id:
+                source_ids = [source_id]
+            else:
+                source_ids = [row[0] for row in connection.execute("SELECT DISTINCT source_id FROM attempts ORDER BY source_id")]
+            stats = []
+            for current in source_ids:
+                total, completed, max_duration, last_success = connection.execute(
+                    "SELECT COUNT(*), SUM(result IN (?, ?)), MAX(CASE WHEN result IN (?, ?) THEN duration END), "
+                    "MAX(CASE WHEN result IN (?, ?) THEN started_at END) "
+                    "FROM attempts WHERE source_id = ? AND started_at >= ? AND result != 'skipped'",
+                    self.COMPLETED_RESULTS * 3 + (current, since)).fetchone()
+                completed = completed or 0
+                stats.append({
+                    'source_id': current,
+                    'attempts': total,
+                    'success_rate': round(completed / total, 3) if total else None,
+                    'p50': self._percentile(connection, current, since, completed, 0.50),
+                    'p95': self._percentile(connection, current, since, completed, 0.95),
+                    'max': max_duration,
+                    'last_success': last_success,
+                })
+            return stats
+        finally:
+            connection.close()
+
+    def prune(self):
+        """删除超过 history.retention_days 的记录 / Drop records past retention"""
+        if not self.db_path.exists():
+            return
+        cutoff = time.time() - self.config.get('history.retention_days', 365) * 86400
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.execute("DELETE FROM attempts WHERE run_id IN (SELECT id FROM runs WHERE started_at < ?)", (cutoff,))
+                    connection.execute("DELETE FROM runs WHERE started_at < ?", (cutoff,))
+            finally:
+                connection.close()
+        except Exception as e:
+            logging.warning(f"{get_text('history_save_failed')}: {e}")
+
+
+class IPTVSourceRegistry:
+    """
+    直播源注册表 / SQLite source registry
+
+    大量社区直播源保存在 state/sources.db (WAL 模式)，与 config.json 中的源合并使用：
+    支持从地址列表或目录批量导入、标签、优先级，启用/禁用只修改对应的行，无需重写配置文件。
+    启用的源按优先级排序并缓存，数据库文件未变化时直接返回缓存。
+    """
+
+    DB_FILE = "sources.db"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sources (
+            source_id TEXT PRIMARY KEY,
+            name TEXT,
+            name_en TEXT,
+            url TEXT NOT NULL UNIQUE,
+            filename TEXT NOT NULL UNIQUE,
+            enabled INTEGER NOT NULL DEFAULT 1,
+            priority INTEGER NOT NULL DEFAULT 0,
+            refresh_interval REAL,
+            added_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_sources_enabled ON sources (enabled, priority DESC, source_id);
+        CREATE TABLE IF NOT EXISTS source_tags (
+            tag TEXT NOT NULL,
+            source_id TEXT NOT NULL,
+            PRIMARY KEY (tag, source_id)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_source_tags_source ON source_tags (source_id);
+    """
+    COLUMNS = ('source_id', 'name', 'name_en', 'url', 'filename', 'enabled', 'priority', 'refresh_interval')
+
+    def __init__(self, config: IPTVConfig):
+        """
+        初始化直播源注册表
+
+        Args:
+            config: 配置管理器实例
+        """
+        self.config = config
+        self._initialized = False
+        self._cache = (None, {})
+
+    @property
+    def db_path(self) -> Path:
+        return self.config.snapshot.state_dir / self.DB_FILE
+
+    def exists(self) -> bool:
+        return self.db_path.exists()
+
+    def _connect(self):
+        import sqlite3
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.db_path), timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if not self._initialized:
+            connection.executescript(self.SCHEMA)
+            self._initialized = True
+        return connection
+
+    def _stamp(self) -> Tuple:
+        """数据库及 WAL 文件的修改时间和大小，任一连接提交后都会变化"""
+        stamp = []
+        for suffix in ('', '-wal'):
+            try:
+                stat = os.stat(f"{self.db_path}{suffix}")
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    @staticmethod
+    def make_id(url: str) -> str:
+        """由地址生成稳定的源ID，重复导入同一地址得到同一个源 / Stable ID derived from the URL"""
+        import hashlib
+        parsed = urlparse(url)
+        slug = re.sub(r'[^a-z0-9]+', '_', f"{parsed.netloc}{parsed.path}".lower()).strip('_')[:40]
+        return f"{slug}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}"
+
+    @staticmethod
+    def read_entries(path: str):
+        """
+        读取地址列表：文件、目录 (递归读取其中所有文件) 或 "-" (标准输入)
+
+        文本文件每行一个地址或 "名称,地址"，# 开头为注释；
+        .json 文件为与 config.json 中 sources 相同格式的字典，或源配置的列表。
+        不是字典的条目 (包括不是列表或字典的 JSON 顶层值) 原样产出，由 import_sources 计为无效。
+
+        Yields:
+            源配置字典
+        """
+        if path == '-':
+            files = [sys.stdin]
+        elif Path(path).is_dir():
+            files = sorted(item for item in Path(path).rglob('*') if item.is_file())
+        else:
+            files = [Path(path)]
+        for item in files:
+            if isinstance(item, Path) and item.suffix.lower() == '.json':
+                with open(item, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    data = [dict(value, source_id=key) if isinstance(value, dict) else value
+                            for key, value in data.items()]
+                elif not isinstance(data, list):
+                    data = [data]
+                yield from data
+                continue
+            handle = open(item, 'r', encoding='utf-8', errors='replace') if isinstance(item, Path) else item
+            try:
+                for line in handle:
+                    line = line.strip()
+                    if not line or line.startswith('#'):
+                        continue
+                    # 地址本身可能包含逗号：只有第一个逗号之后是地址时才视为 "名称,地址"
+                    name, _, url = line.partition(',')
+                    if not url.strip().lower().startswith(('http://', 'https://')):
+                        name, url = '', line
+                    entry = {'url': url.strip()}
+                    if name.strip():
+                        entry['name'] = name.strip()
+                    yield entry
+            finally:
+                if handle is not sys.stdin:
+                    handle.close()
+
+    def import_sources(self, entries, tags: Optional[List[str]] = None, priority: int = 0,
+                       enabled: bool = True) -> Tuple[int, int, int]:
+        """
+        批量导入直播源 (单个事务)；已存在的地址保留原有设置，只追加标签
+
+        新的源使用与 config.json 相同的检查：地址协议、文件名不含路径且不以点开头、
+        ID 和文件名 (含派生文件名) 不与配置、注册表或同批次中的其他源冲突，无效的行不写入
+
+        Args:
+            entries: 源配置字典，至少包含 url；不是字典的条目计为无效
+            tags: 附加到所有导入源的标签
+            priority: 未单独指定时的优先级
+            enabled: 是否启用
+
+        Returns:
+            (新增数, 已存在数, 无效数)
+        """
+        now = time.time()
+        snapshot = self.config.snapshot
+        taken = self.config.reserved_names(snapshot)
+        formats = snapshot.data['output']['formats']
+        known = {}
+        connection = self._connect()
+        try:
+            for source_id, url, filename in connection.execute("SELECT source_id, url, filename FROM sources"):
+                known[source_id] = known[url] = source_id
+                for name in [filename] + list(IPTVOutputFormats.output_names(filename, formats).values()):
+                    taken.setdefault(name, f"sources.{source_id}")
+        finally:
+            connection.close()
+
+        rows, tag_rows, existing, invalid = [], [], 0, 0
+        for entry in entries:
+            if not isinstance(entry, dict):
+                logging.warning(f"{get_text('registry_rejected')}: {entry!r}: {get_text('config_expected_type')} object")
+                invalid += 1
+                continue
+            url = str(entry.get('url', '')).strip()
+            source_id = str(entry.get('source_id') or self.make_id(url))
+            if source_id in known or url in known:
+                # 已存在的源保留原有设置，只追加标签
+                existing += 1
+                source_id = known.get(source_id) or known[url]
+                tag_rows.extend((tag, source_id) for tag in list(tags or []) + list(entry.get('tags', [])))
+                continue
+            source = {key: entry[key] for key in self.config.SOURCE_SCHEMA if key in entry}
+            source.update(url=url, filename=entry.get('filename') or f"{source_id}.m3u")
+            errors = self.config.claim_source(source_id, source, taken, snapshot)
+            if errors:
+                logging.warning(f"{get_text('registry_rejected')}: {errors[0]}")
+                invalid += 1
+                continue
+            known[source_id] = known[url] = source_id
+            rows.append((source_id, entry.get('name') or source_id, entry.get('name_en'), url,
+                         source['filename'], int(entry.get('enabled', enabled)),
+                         int(entry.get('priority', priority)), entry.get('refresh_interval'), now, now))
+            tag_rows.extend((tag, source_id) for tag in list(tags or []) + list(entry.get('tags', [])))
+
+        connection = self._connect()
+        try:
+            with connection:
+                before = connection.total_changes
+                connection.executemany(
+                    "INSERT OR IGNORE INTO sources (source_id, name, name_en, url, filename, enabled, priority, "
+                    "refresh_interval, added_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                added = connection.total_changes - before
+                # 只给实际存在的源打标签 (其他进程同时导入而未插入的行除外)
+                connection.executemany(
+                    "INSERT OR IGNORE INTO source_tags (tag, source_id) "
+                    "SELECT ?, source_id FROM sources WHERE source_id = ?", tag_rows)
+        finally:
+            connection.close()
+        return added, existing + len(rows) - added, invalid
+
+    def _where(self, selectors: List[str]) -> Tuple[str, List]:
+        """选择器：源ID 或 tag:<标签> / Selectors are source IDs or tag:<name>"""
+        ids = [selector for selector in selectors if not selector.startswith('tag:')]
+        tags = [selector[4:] for selector in selectors if selector.startswith('tag:')]
+        clauses, params = [], []
+        if ids:
+            clauses.append(f"source_id IN ({', '.join('?' * len(ids))})")
+            params.extend(ids)
+        if tags:
+            clauses.append(f"source_id IN (SELECT source_id FROM source_tags WHERE tag IN ({', '.join('?' * len(tags))}))")
+            params.extend(tags)
+        return ' OR '.join(clauses) or '0', params
+
+    def update(self, selectors: List[str], enabled: Optional[bool] = None, priority: Optional[int] = None,
+               add_tags: Optional[List[str]] = None, remove_tags: Optional[List[str]] = None) -> int:
+        """
+        修改选中的源
+
+        Returns:
+            匹配的源数量
+        """
+        where, params = self._where(selectors)
+        connection = self._connect()
+        try:
+            with connection:
+                source_ids = [row[0] for row in connection.execute(f"SELECT source_id FROM sources WHERE {where}", params)]
+                assignments, values = ['updated_at = ?'], [time.time()]
+                if enabled is not None:
+                    assignments.append('enabled = ?')
+                    values.append(int(enabled))
+                if priority is not None:
+                    assignments.append('priority = ?')
+                    values.append(priority)
+                connection.executemany(f"UPDATE sources SET {', '.join(assignments)} WHERE source_id = ?",
+                                       [values + [source_id] for source_id in source_ids])
+                connection.executemany("INSERT OR IGNORE INTO source_tags (tag, source_id) VALUES (?, ?)",
+                                       [(tag, source_id) for tag in add_tags or [] for source_id in source_ids])
+                connection.executemany("DELETE FROM source_tags WHERE tag = ? AND source_id = ?",
+                                       [(tag, source_id) for tag in remove_tags or [] for source_id in source_ids])
+        finally:
+            connection.close()
+        return len(source_ids)
+
+    def remove(self, selectors: List[str]) -> int:
+        """删除选中的源 / Remove the selected sources"""
+        where, params = self._where(selectors)
+        connection = self._connect()
+        try:
+            with connection:
+                source_ids = [(row[0],) for row in connection.execute(f"SELECT source_id FROM sources WHERE {where}", params)]
+                connection.executemany("DELETE FROM source_tags WHERE source_id = ?", source_ids)
+                connection.executemany("DELETE FROM sources WHERE source_id = ?", source_ids)
+        finally:
+            connection.close()
+        return len(source_ids)
+
+    def _row_to_source(self, row, tags: Optional[str]) -> Dict:
+        source = dict(zip(self.COLUMNS, row))
+        source['enabled'] = bool(source['enabled'])
+        source['tags'] = sorted(tags.split('\x1f')) if tags else []
+        for key in ('name_en', 'refresh_interval'):
+            if source[key] is None:
+                del source[key]
+        return source
+
+    def list_sources(self, tag: Optional[str] = None, enabled_only: bool = False) -> List[Dict]:
+        """按优先级列出源 (含标签) / List sources by priority, with tags"""
+        if not self.exists():
+            return []
+        conditions, params = [], []
+        if enabled_only:
+            conditions.append("s.enabled = 1")
+        if tag:
+            conditions.append("s.source_id IN (SELECT source_id FROM source_tags WHERE tag = ?)")
+            params.append(tag)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                f"SELECT {', '.join('s.' + column for column in self.COLUMNS)}, "
+                f"(SELECT group_concat(tag, char(31)) FROM source_tags t WHERE t.source_id = s.source_id) "
+                f"FROM sources s {where} ORDER BY s.enabled DESC, s.priority DESC, s.source_id", params).fetchall()
+        finally:
+            connection.close()
+        return [self._row_to_source(row[:-1], row[-1]) for row in rows]
+
+    def enabled_sources(self) -> Dict[str, Dict]:
+        """
+        启用的源 {source_id: 源配置}，按优先级从高到低排序
+
+        数据库未变化时返回缓存，调用方不应修改
+        """
+        stamp = self._stamp()
+        if stamp != self._cache[0]:
+            sources = {}
+            for source in self.list_sources(enabled_only=True):
+                source_id = source.pop('source_id')
+                sources[source_id] = source
+            # 读取期间 WAL 可能被检查点合并，使用读取后的状态作为缓存键
+            self._cache = (self._stamp(), sources)
+        return self._cache[1]
+
+    def get(self, source_id: str) -> Optional[Dict]:
+        """获取单个源 (包括禁用的源) / Look up one source, enabled or not"""
+        if not self.exists():
+            return None
+        connection = self._connect()
+        try:
+            row = connection.execute(f"SELECT {', '.join(self.COLUMNS)} FROM sources WHERE source_id = ?",
+                                     (source_id,)).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            return None
+        source = self._row_to_source(row, None)
+        source.pop('source_id')
+        return source
 
 
 class IPTVMaintenance:
@@ -544,27 +4191,41 @@ class IPTVMaintenance:
             report_lines.append(f"{get_text('detailed_results')}:")
             for source_id, (success, error_msg) in download_results.items():
                 status = f"✓ {get_text('success_sources')}" if success else f"✗ {get_text('failed_sources')}: {error_msg}"
-                source_name = self.config.get_source_name(source_id, self.config.config['sources'][source_id])
+                source_name = self.config.get_source_name(source_id, self.config.get_source(source_id) or {})
                 report_lines.append(f"  {source_name}: {status}")
             
             report_lines.append("")
         
-        # 文件信息
+        # 熔断状态
+        breaker = IPTVCircuitBreaker(self.config)
+        tripped = {source_id: entry for source_id, entry in breaker.states.items()
+                   if entry.get('state') != IPTVCircuitBreaker.CLOSED or entry.get('failures')}
+        if tripped:
+            report_lines.append(f"{get_text('breaker_status')}:")
+            for source_id in tripped:
+                source_config = self.config.get_source(source_id) or {}
+                source_name = self.config.get_source_name(source_id, source_config)
+                report_lines.append(f"  {source_name}: {breaker.describe(source_id)}")
+                if tripped[source_id].get('last_error'):
+                    report_lines.append(f"    {get_text('breaker_last_error')}: {tripped[source_id]['last_error']}")
+            report_lines.append("")
+        
+        # 文件信息 (只读取版本清单，不读取直播源文件内容)
         data_dir = Path(self.config.get('directories.base_dir')) / self.config.get('directories.data_dir')
-        if data_dir.exists():
+        manifest = IPTVPublisher(self.config).read_manifest()
+        if manifest:
+            report_lines.append(f"{get_text('file_info')} ({get_text('generation')} {manifest.get('generation')}):")
+            for filename, entry in sorted(manifest.get('sources', {}).items()):
+                mtime = datetime.fromtimestamp(entry.get('fetched_at', 0)).strftime('%Y-%m-%d %H:%M:%S')
+                report_lines.append(f"  {filename}: {entry.get('size', 0)} bytes, {entry.get('channels', 0)} {get_text('channels')}, {get_text('update_time')}: {mtime}")
+        elif data_dir.exists():
+            # 尚未生成清单的旧目录布局，只显示文件属性
             report_lines.append(f"{get_text('file_info')}:")
             for m3u_file in data_dir.glob("*.m3u"):
                 try:
                     stat = m3u_file.stat()
-                    size = stat.st_size
                     mtime = datetime.fromtimestamp(stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    # 统计频道数量
-                    with open(m3u_file, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        channel_count = content.count('#EXTINF:')
-                    
-                    report_lines.append(f"  {m3u_file.name}: {size} bytes, {channel_count} {get_text('channels')}, {get_text('update_time')}: {mtime}")
+                    report_lines.append(f"  {m3u_file.name}: {stat.st_size} bytes, {get_text('update_time')}: {mtime}")
                 except Exception as e:
                     report_lines.append(f"  {m3u_file.name}: {get_text('read_failed')} - {e}")
         
@@ -573,18 +4234,758 @@ class IPTVMaintenance:
     def save_status_report(self, download_results: Dict[str, Tuple[bool, str]]):
         """保存状态报告到文件"""
         try:
-            report_content = self.generate_status_report(download_results)
-            
-            log_dir = Path(self.config.get('directories.base_dir')) / self.config.get('directories.log_dir')
-            report_file = log_dir / f"status_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            
-            with open(report_file, 'w', encoding='utf-8') as f:
-                f.write(report_content)
-            
-            logging.info(f"{get_text('status_report_saved')}: {report_file}")
-            
+            report_content = self.generate_status_report(download_results)
+            
+            log_dir = Path(self.config.get('directories.base_dir')) / self.config.get('directories.log_dir')
+            report_file = log_dir / f"status_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+            
+            with open(report_file, 'w', encoding='utf-8') as f:
+                f.write(report_content)
+            
+            logging.info(f"{get_text('status_report_saved')}: {report_file}")
+            
+        except Exception as e:
+            logging.error(f"{get_text('save_report_failed')}: {e}")
+    
+    @property
+    def last_run_path(self) -> Path:
+        return Path(self.config.get('directories.base_dir')) / self.config.get('directories.state_dir', 'state') / "last_run.json"
+    
+    def load_last_run(self) -> Dict:
+        """读取最近一次运行的元数据 / Load metadata of the last run"""
+        try:
+            with open(self.last_run_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def save_run_metadata(self, download_results: Dict[str, Tuple[bool, str]], started_at: float):
+        """
+        保存本次运行的元数据，供 --status --json 和 --health 使用
+        
+        Args:
+            download_results: 下载结果
+            started_at: 运行开始时间戳
+        """
+        try:
+            finished_at = time.time()
+            metadata = self.load_last_run()
+            results = metadata.get('results', {})
+            for source_id, (success, error_msg) in download_results.items():
+                results[source_id] = {'success': success, 'error': error_msg, 'finished_at': finished_at}
+            metadata.update({
+                'started_at': started_at,
+                'finished_at': finished_at,
+                'duration': round(finished_at - started_at, 3),
+                'attempted': len(download_results),
+                'failed': sum(1 for success, _ in download_results.values() if not success),
+                'results': results,
+            })
+            self.last_run_path.parent.mkdir(parents=True, exist_ok=True)
+            IPTVDownloader._atomic_write(self.last_run_path, json.dumps(metadata, indent=2, ensure_ascii=False).encode('utf-8'))
+        except Exception as e:
+            logging.error(f"{get_text('save_run_metadata_failed')}: {e}")
+    
+    def record_run_metrics(self, metrics: IPTVMetrics, download_results: Dict[str, Tuple[bool, str]], started_at: float):
+        """
+        记录整次运行的指标，并写入 textfile collector 文件 (metrics.textfile 为空时不写)
+        
+        Args:
+            metrics: 运行指标实例
+            download_results: 下载结果
+            started_at: 运行开始时间戳
+        """
+        finished_at = time.time()
+        failed = any(not success for success, _ in download_results.values())
+        metrics.inc('iptv_runs', {'result': 'partial_failure' if failed else 'success'})
+        metrics.observe('iptv_run_duration_seconds', finished_at - started_at)
+        metrics.set('iptv_last_run_timestamp_seconds', finished_at)
+        
+        textfile = self.config.get('metrics.textfile', '')
+        if not self.config.get('metrics.enabled', True) or not textfile:
+            return
+        try:
+            metrics.write_textfile(Path(self.config.get('directories.base_dir')) / textfile)
+        except Exception as e:
+            logging.warning(f"{get_text('metrics_write_failed')}: {e}")
+    
+    def collect_status(self) -> Dict:
+        """
+        汇总机器可读的状态 (只读取清单、熔断状态和运行元数据，不读取直播源文件)
+        
+        Returns:
+            状态字典，包含 healthy 和 problems 字段
+        """
+        now = time.time()
+        manifest = IPTVPublisher(self.config).read_manifest()
+        manifest_sources = manifest.get('sources', {})
+        breakers = IPTVCircuitBreaker(self.config).states
+        last_run = self.load_last_run()
+        last_results = last_run.get('results', {})
+        
+        default_max_age = self.config.get('health.max_age_hours', 26) * 3600
+        problems = []
+        sources = {}
+        failed_count = 0
+        for source_id, source_config in self.config.get_sources().items():
+            filename = source_config['filename']
+            entry = manifest_sources.get(filename, {})
+            breaker = breakers.get(source_id, {'state': IPTVCircuitBreaker.CLOSED, 'failures': 0})
+            last_result = last_results.get(source_id)
+            age = round(now - entry['fetched_at'], 1) if 'fetched_at' in entry else None
+            max_age = source_config.get('max_age_hours')
+            max_age = max_age * 3600 if max_age is not None else default_max_age
+            
+            sources[source_id] = {
+                'name': self.config.get_source_name(source_id, source_config),
+                'filename': filename,
+                'size': entry.get('size'),
+                'channels': entry.get('channels'),
+                'content_hash': entry.get('content_hash'),
+                'fetched_at': entry.get('fetched_at'),
+                'age_seconds': age,
+                'stale': age is None or age > max_age,
+                'breaker': {
+                    'state': breaker.get('state'),
+                    'failures': breaker.get('failures', 0),
+                    'last_error': breaker.get('last_error'),
+                },
+                'last_result': last_result,
+            }
+            
+            if age is None:
+                problems.append(f"{source_id}: {get_text('health_never_fetched')}")
+            elif age > max_age:
+                problems.append(f"{source_id}: {get_text('health_stale')} ({age / 3600:.1f}h)")
+            if breaker.get('state') == IPTVCircuitBreaker.OPEN or (last_result and not last_result.get('success')):
+                failed_count += 1
+        
+        max_failed = self.config.get('health.max_failed_sources', 0)
+        if failed_count > max_failed:
+            problems.append(f"{get_text('health_too_many_failed')}: {failed_count} > {max_failed}")
+        
+        max_run_age = self.config.get('health.max_run_age_hours', 0)
+        if max_run_age and now - last_run.get('finished_at', 0) > max_run_age * 3600:
+            problems.append(get_text('health_no_recent_run'))
+        
+        return {
+            'generated_at': now,
+            'generation': manifest.get('generation'),
+            'published_at': manifest.get('published_at'),
+            'last_run': {key: value for key, value in last_run.items() if key != 'results'},
+            'sources': sources,
+            'failed_sources': failed_count,
+            'healthy': not problems,
+            'problems': problems,
+        }
+
+
+class IPTVServer:
+    """
+    IPTV发布服务器 / IPTV publishing HTTP server
+
+    基于 asyncio 的 HTTP/1.1 服务器，直接提供 data/current 中的文件：
+    - 基于内容哈希的强 ETag，If-None-Match 命中时返回 304
+    - 根据 Accept-Encoding 提供发布时生成的 .gz 预压缩版本
+    - 通过 loop.sendfile (os.sendfile) 零拷贝发送文件内容
+    - 支持 keep-alive 长连接
+    """
+
+    CONTENT_TYPES = {
+        '.m3u': 'audio/x-mpegurl; charset=utf-8',
+        '.m3u8': 'application/vnd.apple.mpegurl',
+        '.json': 'application/json; charset=utf-8',
+        '.txt': 'text/plain; charset=utf-8',
+        '.xml': 'application/xml; charset=utf-8',
+    }
+    STATUS_TEXT = {
+        200: 'OK',
+        304: 'Not Modified',
+        400: 'Bad Request',
+        404: 'Not Found',
+        405: 'Method Not Allowed',
+        500: 'Internal Server Error',
+    }
+    MAX_HEADER_SIZE = 16 * 1024
+    MAX_BODY_SIZE = 64 * 1024
+
+    def __init__(self, config: IPTVConfig, publisher: IPTVPublisher):
+        """
+        初始化发布服务器
+
+        Args:
+            config: 配置管理器实例
+            publisher: 版本发布器实例
+        """
+        self.config = config
+        self.publisher = publisher
+        self.routes = {}
+        self._etag_cache = {}
+        self._loop = None
+        self._stop_event = None
+        self.add_route('/delta/', publisher.delta_log.handle_request)
+
+    def add_route(self, path: str, handler):
+        """
+        注册动态路由
+
+        Args:
+            path: 请求路径，如 /metrics；以 / 结尾时按前缀匹配
+            handler: 处理函数 handler(path, query, headers) -> (状态码, 响应头, 响应体)
+        """
+        self.routes[path] = handler
+
+    def _find_route(self, path: str):
+        handler = self.routes.get(path)
+        if handler is None:
+            for prefix, candidate in self.routes.items():
+                if prefix.endswith('/') and path.startswith(prefix):
+                    return candidate
+        return handler
+
+    @staticmethod
+    def _hash_fd(fd: int, size: int) -> str:
+        """对已打开的文件计算哈希 (映射整个文件，不改变读取位置) / Hash an open file through a memory map"""
+        import hashlib
+        import mmap
+        if size == 0:
+            return f'"{hashlib.sha256(b"").hexdigest()[:32]}"'
+        with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as buffer:
+            return f'"{hashlib.sha256(buffer).hexdigest()[:32]}"'
+
+    async def _etag_for(self, f, stat: os.stat_result) -> str:
+        """计算并缓存已打开文件的强 ETag / Compute and cache a strong ETag for an open file"""
+        # 版本目录中的文件不会被原地修改，按 fstat 得到的 inode 缓存即可
+        key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        etag = self._etag_cache.get(key)
+        if etag is None:
+            etag = await self._loop.run_in_executor(None, self._hash_fd, f.fileno(), stat.st_size)
+            if len(self._etag_cache) > 4096:
+                self._etag_cache.clear()
+            self._etag_cache[key] = etag
+        return etag
+
+    @staticmethod
+    def _etag_matches(if_none_match: str, etag: str) -> bool:
+        if if_none_match.strip() == '*':
+            return True
+        for candidate in if_none_match.split(','):
+            candidate = candidate.strip()
+            if candidate.startswith('W/'):
+                candidate = candidate[2:]
+            if candidate == etag:
+                return True
+        return False
+
+    @staticmethod
+    def _accepts_gzip(accept_encoding: str) -> bool:
+        for part in accept_encoding.split(','):
+            coding, _, params = part.strip().partition(';')
+            if coding.strip().lower() not in ('gzip', '*'):
+                continue
+            params = params.strip().replace(' ', '')
+            return params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+        return False
+
+    def _open(self, request_path: str, gzip: bool) -> Optional[Tuple]:
+        """
+        打开当前版本中的文件 / Open a published file in the current generation
+
+        current 链接只解析一次，文件 (及 .gz 版本) 在同一个版本目录中只打开一次，
+        之后的 ETag、响应头和发送都基于这个文件描述符，发布切换版本不会造成不一致。
+
+        Returns:
+            (文件对象, fstat 结果, 内容编码, 版本号)，文件不存在时为 None
+        """
+        from stat import S_ISREG
+        name = request_path.lstrip('/')
+        if not name or '/' in name or '\\' in name or name.startswith('.'):
+            return None
+        directory = Path(os.path.realpath(self.publisher.current_link))
+        generation = int(directory.name) if directory.name.isdigit() else None
+        candidates = [(directory / name, None)]
+        if generation is None:
+            # 尚未启用版本发布的旧目录布局
+            candidates = [(self.publisher.data_dir / name, None)]
+        if gzip:
+            candidates.insert(0, (candidates[0][0].with_name(f"{name}.gz"), 'gzip'))
+        for path, encoding in candidates:
+            try:
+                f = open(path, 'rb')
+            except OSError:
+                continue
+            stat = os.fstat(f.fileno())
+            if S_ISREG(stat.st_mode):
+                return f, stat, encoding, generation
+            f.close()
+        return None
+
+    @staticmethod
+    def _format_head(status: int, headers: List[Tuple[str, str]]) -> bytes:
+        lines = [f"HTTP/1.1 {status} {IPTVServer.STATUS_TEXT.get(status, '')}"]
+        lines.extend(f"{key}: {value}" for key, value in headers)
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+    async def _read_request(self, reader) -> Optional[Tuple[str, str, str, Dict[str, str]]]:
+        import asyncio
+        timeout = self.config.get('server.keepalive_timeout', 30)
+        try:
+            raw = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None
+        except asyncio.LimitOverrunError:
+            raise ValueError('header too large')
+
+        lines = raw.decode('latin-1').split('\r\n')
+        parts = lines[0].split(' ')
+        if len(parts) != 3:
+            raise ValueError('malformed request line')
+        method, target, version = parts
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            key, _, value = line.partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        # 不使用请求体，但必须将其从连接中读走，否则会被当作下一个请求解析；
+        # 分块请求体无法在不解析的情况下跳过，按错误请求处理并关闭连接
+        if 'transfer-encoding' in headers:
+            raise ValueError('chunked request body')
+        length = headers.get('content-length')
+        if length is not None:
+            if not length.isdigit():
+                raise ValueError('invalid content-length')
+            if int(length) > self.MAX_BODY_SIZE:
+                raise ValueError('request body too large')
+            try:
+                await asyncio.wait_for(reader.readexactly(int(length)), timeout)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                return None
+        return method, target, version, headers
+
+    async def _send_file(self, writer, f, status_headers: List[Tuple[str, str]], size: int, head_only: bool):
+        writer.write(self._format_head(200, status_headers))
+        await writer.drain()
+        if head_only or size == 0:
+            return
+        # 普通 TCP 连接上由 os.sendfile 零拷贝发送
+        await self._loop.sendfile(writer.transport, f, 0, size)
+
+    async def _handle_request(self, writer, method: str, target: str, version: str, headers: Dict[str, str]) -> bool:
+        """处理单个请求，返回是否保持连接 / Handle one request, return keep-alive flag"""
+        connection = headers.get('connection', '').lower()
+        keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+        base_headers = [
+            ('Server', f"IPTV-Manager/{get_current_version()}"),
+            ('Connection', 'keep-alive' if keep_alive else 'close'),
+        ]
+
+        if method not in ('GET', 'HEAD'):
+            body = b'Method Not Allowed\n'
+            writer.write(self._format_head(405, base_headers + [
+                ('Allow', 'GET, HEAD'), ('Content-Length', str(len(body)))]) + body)
+            await writer.drain()
+            return keep_alive
+
+        path_part, _, query = target.partition('?')
+
+        handler = self._find_route(path_part)
+        if handler is not None:
+            status, extra_headers, body = await self._loop.run_in_executor(None, handler, path_part, query, headers)
+            response_headers = base_headers + list(extra_headers)
+            if len(body) > 1024 and self._accepts_gzip(headers.get('accept-encoding', '')):
+                import gzip
+                body = gzip.compress(body, compresslevel=6, mtime=0)
+                response_headers += [('Content-Encoding', 'gzip'), ('Vary', 'Accept-Encoding')]
+            response_headers.append(('Content-Length', str(len(body))))
+            writer.write(self._format_head(status, response_headers))
+            if method != 'HEAD' and status != 304:
+                writer.write(body)
+            await writer.drain()
+            return keep_alive
+
+        opened = self._open(path_part, self._accepts_gzip(headers.get('accept-encoding', '')))
+        if opened is None:
+            body = b'Not Found\n'
+            writer.write(self._format_head(404, base_headers + [('Content-Length', str(len(body)))]))
+            if method != 'HEAD':
+                writer.write(body)
+            await writer.drain()
+            return keep_alive
+
+        from email.utils import formatdate
+        f, stat, encoding, generation = opened
+        with f:
+            etag = await self._etag_for(f, stat)
+            if generation is not None:
+                base_headers.append(('X-IPTV-Generation', str(generation)))
+            response_headers = base_headers + [
+                ('ETag', etag),
+                ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+                ('Cache-Control', 'no-cache'),
+                ('Vary', 'Accept-Encoding'),
+            ]
+
+            if 'if-none-match' in headers and self._etag_matches(headers['if-none-match'], etag):
+                writer.write(self._format_head(304, response_headers))
+                await writer.drain()
+                return keep_alive
+
+            content_type = self.CONTENT_TYPES.get(Path(path_part).suffix.lower(), 'application/octet-stream')
+            response_headers.append(('Content-Type', content_type))
+            if encoding:
+                response_headers.append(('Content-Encoding', encoding))
+            response_headers.append(('Content-Length', str(stat.st_size)))
+            await self._send_file(writer, f, response_headers, stat.st_size, method == 'HEAD')
+        return keep_alive
+
+    async def _handle_connection(self, reader, writer):
+        import asyncio
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except ValueError:
+                    body = b'Bad Request\n'
+                    writer.write(self._format_head(400, [('Connection', 'close'), ('Content-Length', str(len(body)))]) + body)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                if not await self._handle_request(writer, *request):
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            logging.error(f"{get_text('server_request_failed')}: {e}")
+        finally:
+            writer.close()
+
+    async def _serve(self, install_signal_handlers: bool):
+        import asyncio
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+
+        host = self.config.get('server.host', '0.0.0.0')
+        port = self.config.get('server.port', 8080)
+        server = await asyncio.start_server(
+            self._handle_connection, host, port,
+            backlog=self.config.get('server.backlog', 1024),
+            limit=self.MAX_HEADER_SIZE,
+            reuse_address=True
+        )
+
+        if install_signal_handlers:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                self._loop.add_signal_handler(sig, self._stop_event.set)
+
+        logging.info(f"{get_text('server_started')}: http://{host}:{port}/")
+        async with server:
+            await self._stop_event.wait()
+        logging.info(get_text('server_stopped'))
+
+    def run(self, install_signal_handlers: bool = True):
+        """运行服务器直到收到停止信号 / Run until stopped"""
+        import asyncio
+        asyncio.run(self._serve(install_signal_handlers))
+
+    def stop(self):
+        """从其他线程停止服务器 / Stop the server from another thread"""
+        if self._loop is not None and self._stop_event is not None:
+            self._loop.call_soon_threadsafe(self._stop_event.set)
+
+
+class IPTVScheduler:
+    """
+    直播源刷新调度器 / Per-source refresh scheduler
+
+    每个源按 sources.<id>.refresh_interval (秒，默认 daemon.default_interval)
+    独立刷新；启动时根据已发布文件的修改时间推算下一次刷新时间。
+
+    启用 daemon.adaptive 时根据内容哈希是否变化调整各源的刷新间隔：
+    内容变化时间隔乘以 adaptive_decrease，未变化时乘以 adaptive_increase，
+    并限制在 min_interval 与 max_interval 之间。调度状态保存在
+    state/schedule.json，重启后继续沿用。
+    """
+
+    STATE_FILE = "schedule.json"
+
+    def __init__(self, config: IPTVConfig, publisher: IPTVPublisher):
+        """
+        初始化调度器
+
+        Args:
+            config: 配置管理器实例
+            publisher: 版本发布器实例
+        """
+        self.config = config
+        self.publisher = publisher
+        self.next_due = {}
+        self.state = self._load_state()
+
+    @property
+    def state_path(self) -> Path:
+        return Path(self.config.get('directories.base_dir')) / self.config.get('directories.state_dir', 'state') / self.STATE_FILE
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            IPTVDownloader._atomic_write(self.state_path, json.dumps(self.state, indent=2).encode('utf-8'))
+        except Exception as e:
+            logging.warning(f"{get_text('schedule_save_failed')}: {e}")
+
+    def _bounds(self, source_config: Dict) -> Tuple[float, float]:
+        minimum = float(source_config.get('min_interval', self.config.get('daemon.min_interval', 600)))
+        maximum = float(source_config.get('max_interval', self.config.get('daemon.max_interval', 86400)))
+        return minimum, max(minimum, maximum)
+
+    def interval_for(self, source_id: str, source_config: Dict) -> float:
+        """获取源的刷新间隔 (秒) / Get the refresh interval of a source"""
+        configured = float(source_config.get('refresh_interval', self.config.get('daemon.default_interval', 21600)))
+        if not self.config.get('daemon.adaptive', True):
+            return configured
+        learned = self.state.get(source_id, {}).get('interval')
+        if learned is None:
+            return configured
+        minimum, maximum = self._bounds(source_config)
+        return min(maximum, max(minimum, float(learned)))
+
+    def observe(self, source_id: str, source_config: Dict, content_hash: Optional[str]) -> float:
+        """
+        根据本次获取的内容哈希调整刷新间隔
+
+        Args:
+            source_id: 源标识符
+            source_config: 源配置信息
+            content_hash: 本次内容的哈希值
+
+        Returns:
+            调整后的刷新间隔 (秒)
+        """
+        interval = self.interval_for(source_id, source_config)
+        entry = self.state.setdefault(source_id, {})
+        previous_hash = entry.get('content_hash')
+
+        if self.config.get('daemon.adaptive', True) and content_hash and previous_hash:
+            minimum, maximum = self._bounds(source_config)
+            if content_hash != previous_hash:
+                factor = self.config.get('daemon.adaptive_decrease', 0.5)
+            else:
+                factor = self.config.get('daemon.adaptive_increase', 1.5)
+            new_interval = min(maximum, max(minimum, interval * factor))
+            if new_interval != interval:
+                logging.debug(f"{get_text('schedule_interval_adjusted')} {source_id}: {interval:.0f}s -> {new_interval:.0f}s")
+            interval = new_interval
+
+        now = time.time()
+        if content_hash:
+            if content_hash != previous_hash:
+                entry['last_change'] = now
+                entry['changes'] = entry.get('changes', 0) + 1
+            entry['content_hash'] = content_hash
+        entry['checks'] = entry.get('checks', 0) + 1
+        entry['interval'] = interval
+        return interval
+
+    def _configured(self, source_config: Dict) -> List[float]:
+        """配置的刷新间隔及上下限 / Configured interval and bounds"""
+        interval = float(source_config.get('refresh_interval', self.config.get('daemon.default_interval', 21600)))
+        return [interval, *self._bounds(source_config)]
+
+    def _last_fetch(self, source_id: str, source_config: Dict) -> float:
+        """上次获取时间，没有记录时使用已发布文件的修改时间 / Last fetch time, or the published file's mtime"""
+        last_fetch = self.state.get(source_id, {}).get('last_fetch')
+        if last_fetch is not None:
+            return last_fetch
+        try:
+            return (self.publisher.data_dir / source_config['filename']).stat().st_mtime
+        except OSError:
+            return 0
+
+    def sync(self):
+        """
+        与当前配置同步：新增的源加入调度，删除或禁用的源移出调度；
+        配置的刷新间隔或上下限变化时 (SIGHUP、config.json 修改或重启之间) 丢弃学习到的间隔，
+        按上次获取时间重新计算下一次刷新时间
+        """
+        sources = self.config.get_sources()
+        for source_id in list(self.next_due):
+            if source_id not in sources:
+                del self.next_due[source_id]
+
+        now = time.time()
+        for source_id, source_config in sources.items():
+            entry = self.state.setdefault(source_id, {})
+            configured = self._configured(source_config)
+            changed = entry.get('configured') not in (None, configured)
+            entry['configured'] = configured
+            if changed:
+                entry.pop('interval', None)
+                entry.pop('next_due', None)
+                self.next_due.pop(source_id, None)
+            if source_id in self.next_due:
+                continue
+            saved_due = entry.get('next_due')
+            if saved_due is not None:
+                self.next_due[source_id] = max(now, saved_due)
+                continue
+            last_fetch = self._last_fetch(source_id, source_config)
+            self.next_due[source_id] = max(now, last_fetch + self.interval_for(source_id, source_config))
+
+    def due_sources(self, now: float) -> Dict:
+        """
+        获取到期的源；在 daemon.batch_window 秒内即将到期的源一并返回，
+        以便合并到同一个版本中发布
+        """
+        window = self.config.get('daemon.batch_window', 60)
+        sources = self.config.get_sources()
+        return {
+            source_id: sources[source_id]
+            for source_id, due in self.next_due.items()
+            if due <= now + window and source_id in sources
+        }
+
+    def mark_done(self, source_id: str, source_config: Dict, success: bool, now: float,
+                  content_hash: Optional[str] = None):
+        """记录一次刷新，安排下一次刷新时间 / Schedule the next refresh"""
+        if success:
+            interval = self.observe(source_id, source_config, content_hash)
+        else:
+            # 失败的源提前重试，但不超过正常间隔
+            interval = min(self.interval_for(source_id, source_config),
+                           self.config.get('daemon.failure_retry_interval', 900))
+        self.next_due[source_id] = now + interval
+        entry = self.state.setdefault(source_id, {})
+        entry['next_due'] = self.next_due[source_id]
+        entry['last_fetch'] = now
+
+    def flush(self):
+        """保存调度状态 / Persist the schedule state"""
+        for source_id in list(self.state):
+            if source_id not in self.next_due:
+                del self.state[source_id]
+        self._save_state()
+
+    def seconds_until_next(self, now: float) -> Optional[float]:
+        if not self.next_due:
+            return None
+        return max(0.0, min(self.next_due.values()) - now)
+
+
+class IPTVDaemon:
+    """
+    常驻进程模式 / Long-running daemon mode
+
+    替代 crontab 定时冷启动：HTTP 会话与连接池、已解析的配置和缓存在进程内常驻。
+    SIGTERM/SIGINT 在当前批次完成后退出，SIGHUP 或 config.json 被修改时重新加载配置。
+    """
+
+    def __init__(self, manager: 'IPTVManager'):
+        """
+        初始化守护进程
+
+        Args:
+            manager: IPTV管理器实例
+        """
+        self.manager = manager
+        self.config = manager.config
+        self.scheduler = IPTVScheduler(manager.config, manager.publisher)
+        self._wakeup = threading.Event()
+        self._stopping = 0
+        self._reload_requested = False
+        self._last_maintenance = 0.0
+
+    def _handle_stop(self, signum, frame):
+        # 信号处理函数中只设置标志，日志由主循环输出
+        self._stopping = signum
+        self._wakeup.set()
+
+    def _handle_reload(self, signum, frame):
+        self._reload_requested = True
+        self._wakeup.set()
+
+    def _install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self._handle_reload)
+
+    def reload(self):
+        """重新加载配置并同步调度 / Reload configuration and resync the schedule"""
+        self._reload_requested = False
+        try:
+            self.config.reload()
+            self.manager.downloader.session.headers['User-Agent'] = self.config.get('download.user_agent')
         except Exception as e:
-            logging.error(f"{get_text('save_report_failed')}: {e}")
+            logging.error(f"{get_text('config_reload_failed')}: {e}")
+        self.scheduler.sync()
+
+    def _maintenance(self, now: float):
+        interval = self.config.get('daemon.maintenance_interval', 86400)
+        if now - self._last_maintenance < interval:
+            return
+        self._last_maintenance = now
+        self.manager.logger.cleanup_old_logs()
+        self.manager.maintenance.cleanup_old_backups()
+        self.manager.history.prune()
+
+    def run_once(self):
+        """刷新所有到期的源 / Refresh all due sources"""
+        now = time.time()
+        self._maintenance(now)
+
+        due = self.scheduler.due_sources(now)
+        if not due:
+            return
+        started_at = time.time()
+        downloader = self.manager.downloader
+        results = downloader.download_all_sources(due)
+        finished = time.time()
+        for source_id, (success, _) in results.items():
+            content_hash = downloader.fetch_info.get(source_id, {}).get('content_hash')
+            self.scheduler.mark_done(source_id, due[source_id], success, finished, content_hash)
+        self.scheduler.flush()
+        self.manager.maintenance.save_status_report(results)
+        self.manager.finish_run(results, started_at)
+
+    def run(self) -> int:
+        """运行调度循环直到收到停止信号 / Run the scheduling loop until stopped"""
+        self._install_signal_handlers()
+        self.scheduler.sync()
+        logging.info(f"{get_text('daemon_started')}: {len(self.scheduler.next_due)} {get_text('sources')}")
+
+        while not self._stopping:
+            if self._reload_requested:
+                self.reload()
+            try:
+                if not self._stopping:
+                    self.run_once()
+            except Exception as e:
+                logging.error(f"{get_text('task_error')}: {e}")
+
+            wait = self.scheduler.seconds_until_next(time.time())
+            # 定期检查 config.json 是否被修改，修改后自动重新加载
+            check_interval = self.config.get('daemon.config_check_interval', 5)
+            timeout = wait if wait is not None else 3600
+            if check_interval > 0:
+                timeout = min(timeout, check_interval)
+            self._wakeup.wait(timeout=timeout)
+            self._wakeup.clear()
+            if check_interval > 0 and self.config.changed():
+                self._reload_requested = True
+
+        logging.info(f"{get_text('daemon_stopping')} ({signal.Signals(self._stopping).name})")
+        IPTVPlaylist.shutdown_pool()
+        logging.info(get_text('daemon_stopped'))
+        return 0
 
 
 class IPTVManager:
@@ -599,30 +5000,119 @@ class IPTVManager:
         """
         try:
             self.config = IPTVConfig(config_path)
-            self.logger = IPTVLogger(self.config)
-            self.downloader = IPTVDownloader(self.config)
-            self.maintenance = IPTVMaintenance(self.config)
-            
-            logging.info(get_text('init_complete'))
-            
         except Exception as e:
             print(f"{get_text('init_failed')}: {e}")
             sys.exit(1)
+        
+        # 其余组件按命令需要延迟初始化：--status 等命令不创建会话、目录和日志文件
+        self._logger = None
+        self._publisher = None
+        self._downloader = None
+        self._maintenance = None
+        self._metrics = None
+        self._history = None
+        self.profiler = None
+    
+    @property
+    def logger(self) -> IPTVLogger:
+        """日志管理器 (首次访问时挂载日志处理器) / Logger, attaches handlers on first use"""
+        if self._logger is None:
+            self._logger = IPTVLogger(self.config)
+            logging.info(get_text('init_complete'))
+        return self._logger
+    
+    @property
+    def publisher(self) -> IPTVPublisher:
+        if self._publisher is None:
+            self._publisher = IPTVPublisher(self.config)
+        return self._publisher
+    
+    @property
+    def downloader(self) -> IPTVDownloader:
+        """下载器 (首次访问时创建会话和目录) / Downloader, creates session and directories on first use"""
+        if self._downloader is None:
+            self._downloader = IPTVDownloader(self.config, self.publisher, self.metrics)
+        return self._downloader
+    
+    @property
+    def metrics(self) -> IPTVMetrics:
+        if self._metrics is None:
+            self._metrics = IPTVMetrics()
+        return self._metrics
+    
+    @property
+    def history(self) -> IPTVRunHistory:
+        if self._history is None:
+            self._history = IPTVRunHistory(self.config)
+        return self._history
+    
+    def finish_run(self, download_results: Dict[str, Tuple[bool, str]], started_at: float):
+        """
+        记录一次运行的结果：运行元数据、指标和运行历史
+        
+        Args:
+            download_results: 下载结果
+            started_at: 运行开始时间戳
+        """
+        self.maintenance.save_run_metadata(download_results, started_at)
+        self.maintenance.record_run_metrics(self.metrics, download_results, started_at)
+        self.history.record_run(started_at, time.time(), download_results, self.downloader.attempt_log,
+                                self.publisher.current_generation())
+        failed = [source_id for source_id, (success, _) in download_results.items() if not success]
+        logging.info(get_text('run_finished'), extra={
+            'event': 'run', 'started_at': started_at, 'duration': round(time.time() - started_at, 3),
+            'sources': len(download_results), 'failed_sources': failed})
+    
+    def create_server(self) -> IPTVServer:
+        """创建发布服务器，并按配置注册 /metrics / Create the server and register /metrics"""
+        server = IPTVServer(self.config, self.publisher)
+        if self.config.get('metrics.enabled', True):
+            server.add_route('/metrics', self.metrics.handle_request)
+        return server
+    
+    @property
+    def maintenance(self) -> IPTVMaintenance:
+        if self._maintenance is None:
+            self._maintenance = IPTVMaintenance(self.config)
+        return self._maintenance
+    
+    @contextmanager
+    def _phase(self, name: str):
+        """--profile 下标记任务阶段 / Mark a job phase for the profiler"""
+        if self.profiler is None:
+            yield
+            return
+        with self.profiler.phase(name):
+            yield
+    
+    def initialize(self, download: bool = True):
+        """提前初始化组件 (长时间运行模式和会写日志的命令) / Eagerly initialize subsystems for long-running modes and logging commands"""
+        _ = self.logger
+        if download:
+            _ = self.downloader
     
     def run(self):
         """执行主要任务流程"""
         try:
+            started_at = time.time()
+            # 先挂载日志处理器，否则此前的日志记录会丢失
+            self.initialize(download=False)
             logging.info(get_text('task_start'))
             
             # 清理过期文件
-            self.logger.cleanup_old_logs()
-            self.maintenance.cleanup_old_backups()
+            with self._phase('cleanup'):
+                self.logger.cleanup_old_logs()
+                self.maintenance.cleanup_old_backups()
+                self.history.prune()
             
             # 下载直播源
-            download_results = self.downloader.download_all_sources()
+            with self._phase('download'):
+                download_results = self.downloader.download_all_sources()
             
             # 生成状态报告
-            self.maintenance.save_status_report(download_results)
+            with self._phase('report'):
+                self.maintenance.save_status_report(download_results)
+                self.finish_run(download_results, started_at)
             
             # 检查是否有失败的下载
             failed_sources = [source_id for source_id, (success, _) in download_results.items() if not success]
@@ -638,6 +5128,168 @@ class IPTVManager:
             logging.error(f"{get_text('task_error')}: {e}")
             return 1
     
+    def show_status_json(self) -> int:
+        """以JSON格式输出状态 / Print machine-readable status"""
+        status = self.maintenance.collect_status()
+        print(json.dumps(status, indent=2, ensure_ascii=False))
+        return 0
+    
+    def health_check(self, as_json: bool = False) -> int:
+        """
+        健康检查：数据过期或失败源超过阈值时返回非零退出码
+        
+        Returns:
+            0 健康，1 不健康
+        """
+        status = self.maintenance.collect_status()
+        if as_json:
+            print(json.dumps({key: status[key] for key in ('healthy', 'problems', 'generation', 'failed_sources')}, ensure_ascii=False))
+        elif status['healthy']:
+            print("OK")
+        else:
+            print(f"UNHEALTHY: {'; '.join(status['problems'])}")
+        return 0 if status['healthy'] else 1
+    
+    def show_history(self, source_id: Optional[str] = None, days: float = 30, as_json: bool = False) -> int:
+        """
+        显示运行历史统计
+        
+        Args:
+            source_id: 只显示该源
+            days: 统计天数
+            as_json: 以JSON格式输出
+        """
+        stats = self.history.source_stats(days, source_id)
+        if as_json:
+            print(json.dumps({'days': days, 'sources': stats}, indent=2, ensure_ascii=False))
+            return 0
+        if not stats:
+            print(get_text('history_empty'))
+            return 0
+        
+        def seconds(value):
+            return f"{value:.2f}" if value is not None else "-"
+        
+        print(f"{get_text('history_title')} ({days:g} {get_text('days')}):")
+        print(f"  {get_text('history_source'):<20} {get_text('history_attempts'):>8} {get_text('history_success_rate'):>8} "
+              f"{'p50(s)':>8} {'p95(s)':>8} {'max(s)':>8}  {get_text('history_last_success')}")
+        for entry in stats:
+            rate = f"{entry['success_rate'] * 100:.0f}%" if entry['success_rate'] is not None else "-"
+            last = datetime.fromtimestamp(entry['last_success']).strftime('%Y-%m-%d %H:%M') if entry['last_success'] else "-"
+            print(f"  {entry['source_id']:<20} {entry['attempts']:>8} {rate:>8} {seconds(entry['p50']):>8} "
+                  f"{seconds(entry['p95']):>8} {seconds(entry['max']):>8}  {last}")
+        return 0
+    
+    def import_sources(self, paths: List[str], tags: Optional[List[str]] = None, priority: int = 0,
+                       enabled: bool = True) -> int:
+        """
+        批量导入直播源到注册表
+        
+        Args:
+            paths: 地址列表文件、目录或 "-" (标准输入)
+            tags: 附加的标签
+            priority: 优先级
+            enabled: 是否启用
+        """
+        self.initialize(download=False)
+        registry = IPTVSourceRegistry(self.config)
+        entries = (entry for path in paths for entry in registry.read_entries(path))
+        added, existing, invalid = registry.import_sources(entries, tags, priority, enabled)
+        print(f"{get_text('registry_imported')}: {added}, {get_text('registry_existing')}: {existing}, "
+              f"{get_text('registry_invalid')}: {invalid}")
+        return 0
+    
+    def update_sources(self, selectors: List[str], enabled: Optional[bool] = None, priority: Optional[int] = None,
+                       add_tags: Optional[List[str]] = None, remove_tags: Optional[List[str]] = None,
+                       remove: bool = False) -> int:
+        """
+        修改或删除注册表中的源
+        
+        Args:
+            selectors: 源ID 或 tag:<标签>
+            enabled: 启用/禁用
+            priority: 新优先级
+            add_tags: 添加的标签
+            remove_tags: 移除的标签
+            remove: 删除选中的源
+        """
+        registry = self.config.registry
+        if registry is None:
+            print(get_text('registry_empty'))
+            return 1
+        if remove:
+            count = registry.remove(selectors)
+        else:
+            count = registry.update(selectors, enabled, priority, add_tags, remove_tags)
+        print(f"{get_text('registry_updated')}: {count}")
+        return 0 if count else 1
+    
+    def list_sources(self, tag: Optional[str] = None, as_json: bool = False) -> int:
+        """
+        列出注册表中的源
+        
+        Args:
+            tag: 只列出带该标签的源
+            as_json: 以JSON格式输出
+        """
+        registry = self.config.registry
+        sources = registry.list_sources(tag) if registry else []
+        if as_json:
+            print(json.dumps(sources, indent=2, ensure_ascii=False))
+            return 0
+        if not sources:
+            print(get_text('registry_empty'))
+            return 0
+        print(f"  {get_text('history_source'):<40} {get_text('registry_priority'):>8}  {get_text('registry_tags'):<20} URL")
+        for source in sources:
+            marker = ' ' if source['enabled'] else '-'
+            print(f"{marker} {source['source_id']:<40} {source['priority']:>8}  {','.join(source['tags']):<20} {source['url']}")
+        enabled = sum(1 for source in sources if source['enabled'])
+        print(f"{get_text('total_sources')}: {len(sources)}, {get_text('registry_enabled')}: {enabled}")
+        return 0
+    
+    def show_logs(self, count: int = 50, follow: bool = False, level: Optional[str] = None,
+                  source: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None) -> int:
+        """
+        查看日志：默认显示最近 count 条记录，可按级别/源/时间过滤并持续跟踪
+        
+        Args:
+            count: 显示的记录数，0 表示时间范围内全部
+            follow: 持续输出新日志
+            level: 最低日志级别
+            source: 源ID或名称
+            since: 起始时间 (YYYY-MM-DD[ HH:MM[:SS]] 或 30m/2h/7d)
+            until: 结束时间
+        """
+        try:
+            viewer = IPTVLogViewer(self.config, level=level, source=source,
+                                   since=IPTVLogViewer.parse_time(since) if since else None,
+                                   until=IPTVLogViewer.parse_time(until) if until else None)
+        except ValueError as e:
+            print(f"{get_text('error')}: {e}")
+            return 1
+        if viewer.newest_file() is None and not follow:
+            print(get_text('log_no_files'))
+            return 0
+        
+        if since and not follow:
+            # 时间范围：从起始位置顺序流式读取
+            if count > 0:
+                from collections import deque
+                lines = deque(viewer.scan(), maxlen=count)
+            else:
+                lines = viewer.scan()
+        else:
+            lines = viewer.tail(count) if count > 0 else []
+        for line in lines:
+            print(line)
+        
+        if follow:
+            sys.stdout.flush()
+            for line in viewer.follow():
+                print(line, flush=True)
+        return 0
+    
     def show_status(self):
         """显示当前状态 / Display current status"""
         try:
@@ -647,6 +5299,66 @@ class IPTVManager:
             
         except Exception as e:
             logging.error(f"{get_text('show_status_failed')}: {e}")
+    
+    def show_generations(self):
+        """显示已发布的版本 / Display published generations"""
+        publisher = self.publisher
+        current = publisher.current_generation()
+        generations = publisher.list_generations()
+        if not generations:
+            print(get_text('generation_none'))
+            return
+        
+        print(f"{get_text('generation_list')}:")
+        for generation in reversed(generations):
+            generation_dir = publisher.generation_path(generation)
+            mtime = datetime.fromtimestamp(generation_dir.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+            file_count = sum(1 for entry in generation_dir.iterdir() if entry.is_file())
+            marker = f" <- {get_text('current')}" if generation == current else ""
+            print(f"  {generation:6d}  {mtime}  {file_count} {get_text('files')}{marker}")
+    
+    def serve(self) -> int:
+        """运行发布服务器 / Run the publishing HTTP server"""
+        try:
+            self.initialize(download=False)
+            self.create_server().run()
+            return 0
+        except Exception as e:
+            logging.error(f"{get_text('server_failed')}: {e}")
+            return 1
+    
+    def daemon(self, serve: bool = False) -> int:
+        """
+        以常驻进程模式运行
+        
+        Args:
+            serve: 是否同时在后台线程中运行发布服务器
+        """
+        self.initialize()
+        server = None
+        server_thread = None
+        if serve:
+            server = self.create_server()
+            server_thread = threading.Thread(target=server.run, kwargs={'install_signal_handlers': False},
+                                             name='iptv-server', daemon=True)
+            server_thread.start()
+        try:
+            return IPTVDaemon(self).run()
+        finally:
+            if server is not None:
+                server.stop()
+                server_thread.join(timeout=10)
+    
+    def rollback(self, generation: Optional[int] = None) -> int:
+        """回滚到指定版本 / Roll back to a published generation"""
+        try:
+            self.initialize(download=False)
+            restored = self.publisher.rollback(generation)
+            print(f"{get_text('rollback_success')}: {restored}")
+            return 0
+        except Exception as e:
+            logging.error(f"{get_text('rollback_failed')}: {e}")
+            return 1
 
 
 def show_menu():
@@ -771,32 +5483,15 @@ def interactive_mode(manager):
 def show_source_files(manager):
     """显示直播源文件信息"""
     try:
-        # 获取数据目录路径
-        if hasattr(manager.config, 'get'):
-            # 如果config是字典
-            data_dir_path = manager.config.get('directories', {}).get('data_dir')
-        else:
-            # 如果config是对象，尝试访问属性
-            data_dir_path = getattr(manager.config, 'data_dir', None)
-            if not data_dir_path:
-                # 尝试从directories属性获取
-                directories = getattr(manager.config, 'directories', {})
-                if hasattr(directories, 'get'):
-                    data_dir_path = directories.get('data_dir')
-                else:
-                    data_dir_path = getattr(directories, 'data_dir', None)
-        
-        if not data_dir_path:
-            print("[错误] 无法获取数据目录配置")
-            return
-            
-        data_dir = Path(data_dir_path)
+        # 数据目录 (base_dir 下的 data_dir)
+        data_dir = manager.config.snapshot.data_dir
         if not data_dir.exists():
             print(f"[信息] 数据目录不存在: {data_dir}")
             print("       请先执行下载操作")
             return
             
-        m3u_files = list(data_dir.glob("*.m3u"))
+        # 跳过指向已不再发布文件的兼容软链接
+        m3u_files = [path for path in data_dir.glob("*.m3u") if path.is_file()]
         if not m3u_files:
             print(f"[信息] 数据目录: {data_dir}")
             print("       未找到直播源文件，请先下载直播源")
@@ -810,6 +5505,8 @@ def show_source_files(manager):
             stat = file_path.stat()
             size = stat.st_size
             mtime = datetime.fromtimestamp(stat.st_mtime)
+            # 映射扫描频道数并校验格式，不读入整个文件
+            info = IPTVPlaylist.scan_file(file_path, content_hash=False)
             
             # 格式化文件大小
             if size < 1024:
@@ -822,6 +5519,9 @@ def show_source_files(manager):
             print(f"{i:2d}. [{get_text('label_file')}] {file_path.name}")
             print(f"    [{get_text('label_size')}] {size_str}")
             print(f"    [{get_text('label_time')}] {mtime.strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"    [{get_text('label_channels')}] {info['channels']}")
+            if not info['valid']:
+                print(f"    [{get_text('label_warning')}] {get_text('invalid_m3u')}")
             print()
             
     except Exception as e:
@@ -923,43 +5623,21 @@ def show_config_info(manager):
 def show_recent_logs(manager):
     """显示最近的日志"""
     try:
-        # 获取日志目录
-        if hasattr(manager.config, 'get'):
-            log_dir_path = manager.config.get('directories', {}).get('log_dir')
-        else:
-            directories = getattr(manager.config, 'directories', {})
-            if hasattr(directories, 'get'):
-                log_dir_path = directories.get('log_dir')
-            else:
-                log_dir_path = getattr(directories, 'log_dir', None)
-        
-        if not log_dir_path:
-            print("[错误] 无法获取日志目录配置")
-            return
-            
-        log_dir = Path(log_dir_path)
-        if not log_dir.exists():
-            print("[信息] 日志目录不存在")
+        viewer = IPTVLogViewer(manager.config)
+        latest_log = viewer.newest_file()
+        if latest_log is None:
+            print(f"[{get_text('info')}] {get_text('log_no_files')}")
             return
             
-        # 查找最新的日志文件
-        log_files = list(log_dir.glob("iptv_manager_*.log"))
-        if not log_files:
-            print("[信息] 未找到日志文件")
-            return
-            
-        latest_log = max(log_files, key=lambda x: x.stat().st_mtime)
         print(f"[{get_text('label_file')}] {get_text('log_latest_file')}: {latest_log.name}")
         print(f"[{get_text('label_content')}] {get_text('log_recent')} 20 {get_text('log_recent_lines')}:")
         print("-" * 50)
         
-        with open(latest_log, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            for line in lines[-20:]:
-                print(line.rstrip())
+        for line in viewer.tail(20):
+            print(line)
                 
     except Exception as e:
-        print(f"[错误] 读取日志失败: {e}")
+        print(f"[{get_text('error')}] {get_text('log_read_failed')}: {e}")
 
 
 def cleanup_files(manager):
@@ -1187,7 +5865,7 @@ def switch_language(manager):
             return
         
         # 更新配置文件
-        manager.config.config['language'] = new_lang
+        manager.config.set('language', new_lang)
         manager.config._save_config()
         
         # 设置新语言
@@ -1545,6 +6223,178 @@ def main():
         help='Show system status / 显示系统状态'
     )
     
+    parser.add_argument(
+        '--json',
+        action='store_true',
+        help='Machine-readable JSON output for --status/--health/--history/--list-sources / 以JSON格式输出 --status/--health/--history/--list-sources'
+    )
+    
+    parser.add_argument(
+        '--health',
+        action='store_true',
+        help='Health check, exits non-zero when sources are stale or failing / 健康检查，数据过期或失败时返回非零'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Profile --download/--status, output written to the log directory / 剖析 --download/--status，结果写入日志目录'
+    )
+    
+    parser.add_argument(
+        '--profile-memory',
+        action='store_true',
+        help='With --profile, also trace memory allocations per phase / 配合 --profile 记录各阶段内存分配'
+    )
+    
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='Serve published playlists over HTTP / 通过HTTP发布直播源文件'
+    )
+    
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Run as a long-running daemon instead of cron (combine with --serve) / 以常驻进程模式运行 (可与 --serve 同时使用)'
+    )
+    
+    parser.add_argument(
+        '--rollback',
+        nargs='?',
+        type=int,
+        const=-1,
+        metavar='GENERATION',
+        help='Roll back to the previous (or given) generation / 回滚到上一个(或指定)版本'
+    )
+    
+    parser.add_argument(
+        '--generations',
+        action='store_true',
+        help='List published generations / 列出已发布的版本'
+    )
+    
+    parser.add_argument(
+        '--history',
+        nargs='?',
+        const='',
+        metavar='SOURCE',
+        help='Show download history statistics (optionally for one source) / 显示下载历史统计 (可指定源)'
+    )
+    
+    parser.add_argument(
+        '--days',
+        type=float,
+        default=30,
+        help='Time window for --history in days (default 30) / --history 统计天数 (默认30)'
+    )
+    
+    parser.add_argument(
+        '--import-sources',
+        nargs='+',
+        metavar='PATH',
+        help='Bulk import sources into the registry from URL list files, directories or - (stdin) / 从地址列表文件、目录或标准输入批量导入直播源'
+    )
+    
+    parser.add_argument(
+        '--list-sources',
+        nargs='?',
+        const='',
+        metavar='TAG',
+        help='List registry sources (optionally only one tag) / 列出注册表中的直播源 (可指定标签)'
+    )
+    
+    parser.add_argument(
+        '--enable-sources',
+        nargs='+',
+        metavar='SOURCE',
+        help='Enable registry sources by ID or tag:<name> / 按ID或 tag:<标签> 启用直播源'
+    )
+    
+    parser.add_argument(
+        '--disable-sources',
+        nargs='+',
+        metavar='SOURCE',
+        help='Disable registry sources by ID or tag:<name> / 按ID或 tag:<标签> 禁用直播源'
+    )
+    
+    parser.add_argument(
+        '--update-sources',
+        nargs='+',
+        metavar='SOURCE',
+        help='Apply --tag/--untag/--priority to registry sources / 对直播源应用 --tag/--untag/--priority'
+    )
+    
+    parser.add_argument(
+        '--remove-sources',
+        nargs='+',
+        metavar='SOURCE',
+        help='Remove registry sources by ID or tag:<name> / 按ID或 tag:<标签> 删除直播源'
+    )
+    
+    parser.add_argument(
+        '--tag',
+        action='append',
+        metavar='TAG',
+        help='Tag to add with --import-sources/--update-sources (repeatable) / 导入或修改时添加的标签 (可重复)'
+    )
+    
+    parser.add_argument(
+        '--untag',
+        action='append',
+        metavar='TAG',
+        help='Tag to remove with --update-sources (repeatable) / 修改时移除的标签 (可重复)'
+    )
+    
+    parser.add_argument(
+        '--priority',
+        type=int,
+        help='Priority for --import-sources/--update-sources, higher downloads first / 优先级，数值越大越先下载'
+    )
+    
+    parser.add_argument(
+        '--logs',
+        nargs='?',
+        type=int,
+        const=50,
+        metavar='N',
+        help='Show the last N log records (default 50, 0 = whole --since range) / 显示最近N条日志 (默认50，0表示 --since 范围内全部)'
+    )
+    
+    parser.add_argument(
+        '--follow',
+        action='store_true',
+        help='With --logs, keep printing new log output / 配合 --logs 持续输出新日志'
+    )
+    
+    parser.add_argument(
+        '--level',
+        type=str,
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+        help='With --logs, minimum log level / 配合 --logs 指定最低日志级别'
+    )
+    
+    parser.add_argument(
+        '--source',
+        type=str,
+        metavar='SOURCE',
+        help='With --logs, only records mentioning this source / 配合 --logs 只显示该源的日志'
+    )
+    
+    parser.add_argument(
+        '--since',
+        type=str,
+        metavar='TIME',
+        help='With --logs, start time: "YYYY-MM-DD[ HH:MM[:SS]]" or relative 30m/2h/7d / 配合 --logs 指定起始时间'
+    )
+    
+    parser.add_argument(
+        '--until',
+        type=str,
+        metavar='TIME',
+        help='With --logs, end time (same formats as --since) / 配合 --logs 指定结束时间'
+    )
+    
     parser.add_argument(
         '--config', 
         type=str, 
@@ -1576,13 +6426,67 @@ def main():
         
         manager = IPTVManager(args.config)
         
+        if args.profile and (args.download or args.status):
+            # 性能剖析模式
+            manager.profiler = IPTVProfiler(manager.config, 'download' if args.download else 'status',
+                                            memory=args.profile_memory)
+            with manager.profiler:
+                if args.download:
+                    return manager.run()
+                with manager._phase('status'):
+                    if args.json:
+                        return manager.show_status_json()
+                    manager.show_status()
+                return 0
+        
         if args.download:
             # 直接下载模式
             return manager.run()
+        elif args.health:
+            # 健康检查
+            return manager.health_check(as_json=args.json)
         elif args.status:
             # 显示状态
+            if args.json:
+                return manager.show_status_json()
             manager.show_status()
             return 0
+        elif args.daemon:
+            # 常驻进程模式
+            return manager.daemon(serve=args.serve)
+        elif args.serve:
+            # 发布服务器
+            return manager.serve()
+        elif args.rollback is not None:
+            # 回滚版本
+            return manager.rollback(None if args.rollback < 0 else args.rollback)
+        elif args.generations:
+            # 列出版本
+            manager.show_generations()
+            return 0
+        elif args.history is not None:
+            # 运行历史
+            return manager.show_history(args.history or None, args.days, as_json=args.json)
+        elif args.import_sources:
+            # 批量导入直播源
+            return manager.import_sources(args.import_sources, args.tag, args.priority or 0)
+        elif args.list_sources is not None:
+            # 列出注册表中的源
+            return manager.list_sources(args.list_sources or None, as_json=args.json)
+        elif args.enable_sources or args.disable_sources:
+            # 启用/禁用直播源
+            return manager.update_sources(args.enable_sources or args.disable_sources, enabled=bool(args.enable_sources))
+        elif args.update_sources:
+            # 修改标签和优先级
+            return manager.update_sources(args.update_sources, priority=args.priority,
+                                          add_tags=args.tag, remove_tags=args.untag)
+        elif args.remove_sources:
+            # 删除直播源
+            return manager.update_sources(args.remove_sources, remove=True)
+        elif args.logs is not None or args.follow:
+            # 查看日志
+            return manager.show_logs(50 if args.logs is None else args.logs, follow=args.follow, level=args.level,
+                                     source=args.source, since=args.since, until=args.until)
         else:
             # 交互式模式
             return interactive_mode(manager)
@@ -156,6 +156,8 @@ LANG_ZH = {
     "label_file": "文件",
     "label_size": "大小",
     "label_time": "时间",
+    "label_channels": "频道数",
+    "label_warning": "警告",
     "label_content": "内容",
     "label_language": "语言",
     "label_directories": "目录配置",
@@ -226,6 +228,122 @@ LANG_ZH = {
     "cron_no_permission": "无权限操作 crontab",
     "task_content": "任务内容",
     "enter_choice_default_1": "输入选择 (默认: 1) >",
+    
+    # 版本发布相关
+    "generation_staging": "创建暂存版本",
+    "generation_published": "已发布版本",
+    "generation_publish_failed": "发布版本失败",
+    "generation_publish_skipped": "所有源下载失败，保留当前版本",
+    "generation_unchanged": "内容未变化，保留当前版本",
+    "generation_pruned": "删除旧版本",
+    "generation_not_found": "版本不存在",
+    "generation_none": "暂无已发布的版本",
+    "generation_list": "已发布的版本",
+    "rollback_success": "已回滚到版本",
+    "rollback_failed": "回滚失败",
+    "rollback_no_previous": "没有可回滚的上一个版本",
+    
+    # 发布服务器相关
+    "server_started": "发布服务器已启动",
+    "server_stopped": "发布服务器已停止",
+    "server_failed": "发布服务器运行失败",
+    "server_request_failed": "处理请求失败",
+    "delta_record_failed": "记录频道变更失败",
+    
+    # 常驻进程相关
+    "daemon_started": "常驻进程已启动，调度直播源",
+    "daemon_stopping": "收到停止信号，退出调度循环",
+    "daemon_stopped": "常驻进程已退出",
+    "config_reloaded": "配置已重新加载",
+    "config_reload_failed": "重新加载配置失败，继续使用当前配置",
+    "schedule_interval_adjusted": "调整刷新间隔",
+    "schedule_save_failed": "保存调度状态失败",
+    
+    # 熔断器相关
+    "breaker_status": "熔断状态",
+    "breaker_skip": "熔断中，跳过直播源",
+    "breaker_probe": "冷却结束，半开探测直播源",
+    "breaker_opened": "直播源已熔断",
+    "breaker_closed": "直播源已恢复",
+    "breaker_consecutive_failures": "次连续失败",
+    "breaker_retry_at": "下次探测时间",
+    "breaker_last_error": "最近错误",
+    "breaker_state_closed": "正常",
+    "breaker_state_open": "已熔断",
+    "breaker_state_half_open": "半开探测中",
+    "breaker_save_failed": "保存熔断状态失败",
+    
+    # 版本清单相关
+    "generation": "版本",
+    "download_not_modified": "内容未变化，沿用当前文件",
+    
+    # 健康检查相关
+    "save_run_metadata_failed": "保存运行元数据失败",
+    "health_never_fetched": "尚未成功下载",
+    "health_stale": "数据已过期",
+    "health_too_many_failed": "失败的源过多",
+    "health_no_recent_run": "最近没有完成的运行",
+    
+    # 运行指标相关
+    "metrics_write_failed": "写入指标文件失败",
+    "trace_saved": "追踪文件已保存",
+    "trace_save_failed": "保存追踪文件失败",
+    
+    # 性能剖析相关
+    "profile_saved": "剖析结果已保存",
+    "profile_save_failed": "保存剖析结果失败",
+    
+    # 运行历史相关
+    "run_finished": "运行记录已保存",
+    "history_save_failed": "保存运行历史失败",
+    "history_empty": "暂无运行历史",
+    "history_title": "下载历史统计",
+    "days": "天",
+    "history_source": "源",
+    "history_attempts": "尝试次数",
+    "history_success_rate": "成功率",
+    "history_last_success": "最近成功",
+    
+    # 日志查看相关
+    "log_no_files": "未找到日志文件",
+    "log_invalid_time": "无法解析的时间",
+    "log_read_failed": "读取日志失败",
+    
+    # 配置校验相关
+    "config_invalid": "配置无效",
+    "config_parse_failed": "配置文件解析失败",
+    "config_expected_type": "类型应为",
+    "config_invalid_choice": "取值应为",
+    "config_out_of_range": "取值范围应为",
+    "config_unknown_key": "未知的配置项",
+    "config_missing_field": "缺少必填项",
+    "config_invalid_url": "地址必须以 http:// 或 https:// 开头",
+    "config_invalid_filename": "文件名不能包含路径或以点开头",
+    "config_duplicate_filename": "文件名与其他源重复",
+    
+    # 直播源注册表相关
+    "registry_imported": "新增",
+    "registry_existing": "已存在",
+    "registry_invalid": "无效或冲突",
+    "registry_updated": "已修改的源",
+    "registry_empty": "注册表中没有直播源",
+    "registry_priority": "优先级",
+    "registry_tags": "标签",
+    "registry_enabled": "启用",
+    "registry_duplicate_id": "源ID已在 config.json 中使用",
+    "registry_rejected": "已拒绝注册表中的源",
+    
+    # 嵌套播放列表相关
+    "nested_resolved": "已展开嵌套播放列表",
+    "nested_playlists": "个子列表",
+    "nested_failed": "个失败",
+    "nested_cycles": "个循环引用",
+    "nested_fetch_failed": "获取嵌套播放列表失败",
+    
+    # 输出格式相关
+    "config_output_conflict": "派生输出文件名冲突",
+    "index_invalid": "无效的频道索引文件",
+    "parallel_parse_failed": "并行解析失败，改为串行解析",
 }
 
 # 英文语言包
@@ -383,6 +501,8 @@ LANG_EN = {
     "label_file": "File",
     "label_size": "Size", 
     "label_time": "Time",
+    "label_channels": "Channels",
+    "label_warning": "Warning",
     "label_content": "Content",
     "label_language": "Language",
     "label_directories": "Directory Configuration",
@@ -447,6 +567,122 @@ LANG_EN = {
     "cron_no_permission": "No permission to operate crontab",
     "task_content": "Task content",
     "enter_choice_default_1": "Enter choice (default: 1) >",
+    
+    # Generation publishing related
+    "generation_staging": "Created staging generation",
+    "generation_published": "Published generation",
+    "generation_publish_failed": "Failed to publish generation",
+    "generation_publish_skipped": "All sources failed, keeping current generation",
+    "generation_unchanged": "Content unchanged, keeping current generation",
+    "generation_pruned": "Removed old generation",
+    "generation_not_found": "Generation not found",
+    "generation_none": "No published generations",
+    "generation_list": "Published generations",
+    "rollback_success": "Rolled back to generation",
+    "rollback_failed": "Rollback failed",
+    "rollback_no_previous": "No previous generation to roll back to",
+    
+    # Publishing server related
+    "server_started": "Publishing server started",
+    "server_stopped": "Publishing server stopped",
+    "server_failed": "Publishing server failed",
+    "server_request_failed": "Failed to handle request",
+    "delta_record_failed": "Failed to record channel changes",
+    
+    # Daemon related
+    "daemon_started": "Daemon started, scheduling live sources",
+    "daemon_stopping": "Stop signal received, leaving the scheduling loop",
+    "daemon_stopped": "Daemon stopped",
+    "config_reloaded": "Configuration reloaded",
+    "config_reload_failed": "Failed to reload configuration, keeping current configuration",
+    "schedule_interval_adjusted": "Adjusted refresh interval",
+    "schedule_save_failed": "Failed to save schedule state",
+    
+    # Circuit breaker related
+    "breaker_status": "Circuit Breakers",
+    "breaker_skip": "Circuit open, skipping source",
+    "breaker_probe": "Cool-down elapsed, half-open probe for source",
+    "breaker_opened": "Circuit opened for source",
+    "breaker_closed": "Circuit closed for source",
+    "breaker_consecutive_failures": "consecutive failures",
+    "breaker_retry_at": "next probe at",
+    "breaker_last_error": "Last error",
+    "breaker_state_closed": "closed",
+    "breaker_state_open": "open",
+    "breaker_state_half_open": "half-open",
+    "breaker_save_failed": "Failed to save circuit breaker state",
+    
+    # Manifest related
+    "generation": "generation",
+    "download_not_modified": "Not modified, keeping current file",
+    
+    # Health check related
+    "save_run_metadata_failed": "Failed to save run metadata",
+    "health_never_fetched": "never fetched successfully",
+    "health_stale": "data is stale",
+    "health_too_many_failed": "too many failing sources",
+    "health_no_recent_run": "no recent completed run",
+    
+    # Metrics related
+    "metrics_write_failed": "Failed to write metrics file",
+    "trace_saved": "Trace saved",
+    "trace_save_failed": "Failed to save trace",
+    
+    # Profiling related
+    "profile_saved": "Profile saved",
+    "profile_save_failed": "Failed to save profile",
+    
+    # Run history related
+    "run_finished": "Run recorded",
+    "history_save_failed": "Failed to save run history",
+    "history_empty": "No run history yet",
+    "history_title": "Download history",
+    "days": "days",
+    "history_source": "Source",
+    "history_attempts": "Attempts",
+    "history_success_rate": "Success",
+    "history_last_success": "Last success",
+    
+    # Log viewer related
+    "log_no_files": "No log files found",
+    "log_invalid_time": "Unrecognized time",
+    "log_read_failed": "Failed to read logs",
+    
+    # Config validation related
+    "config_invalid": "Invalid configuration",
+    "config_parse_failed": "Failed to parse configuration file",
+    "config_expected_type": "expected",
+    "config_invalid_choice": "expected one of",
+    "config_out_of_range": "expected",
+    "config_unknown_key": "Unknown configuration key",
+    "config_missing_field": "required field missing",
+    "config_invalid_url": "URL must start with http:// or https://",
+    "config_invalid_filename": "filename must not contain a path or start with a dot",
+    "config_duplicate_filename": "filename already used by another source",
+    
+    # Source registry related
+    "registry_imported": "Added",
+    "registry_existing": "Already present",
+    "registry_invalid": "Invalid or conflicting",
+    "registry_updated": "Sources changed",
+    "registry_empty": "No sources in the registry",
+    "registry_priority": "Priority",
+    "registry_tags": "Tags",
+    "registry_enabled": "Enabled",
+    "registry_duplicate_id": "source ID already used in config.json",
+    "registry_rejected": "Rejected registry source",
+    
+    # Nested playlist related
+    "nested_resolved": "Resolved nested playlists",
+    "nested_playlists": "playlists",
+    "nested_failed": "failed",
+    "nested_cycles": "cycles",
+    "nested_fetch_failed": "Failed to fetch nested playlist",
+    
+    # Output format related
+    "config_output_conflict": "derived output filename conflicts with",
+    "index_invalid": "Invalid channel index file",
+    "parallel_parse_failed": "Parallel parsing failed, parsing serially",
 }
 
 # 语言映射
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+测试共用的夹具 / Shared test fixtures
+
+所有测试都在 tmp_path 中创建独立的 base_dir，不访问网络。
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import iptv_manager  # noqa: E402
+
+
+def make_playlist(channels) -> str:
+    """生成 M3U 文本，channels 为 (名称, 地址) 或 (名称, 地址, tvg-id) / Build an M3U text"""
+    lines = ['#EXTM3U']
+    for channel in channels:
+        name, url = channel[0], channel[1]
+        tvg_id = f' tvg-id="{channel[2]}"' if len(channel) > 2 else ''
+        lines.append(f'#EXTINF:-1{tvg_id} group-title="Test",{name}')
+        lines.append(url)
+    return '\n'.join(lines) + '\n'
+
+
+def sample_playlist(count=400) -> str:
+    """包含引号内逗号、附加行、重复频道名、CRLF 和非 ASCII 文本的播放列表 / Playlist with parser edge cases"""
+    lines = ['#EXTM3U x-tvg-url="http://example.com/epg.xml"']
+    for index in range(count):
+        tvg_id = f' tvg-id="id{index % 37}"' if index % 3 else ''
+        lines.append(f'#EXTINF:-1{tvg_id} tvg-name="A, B" group-title="组{index % 5}",频道 {index % 50}')
+        if index % 7 == 0:
+            lines.append('#EXTVLCOPT:http-user-agent=Test')
+        lines.append(f'http://example.com/live/{index}.m3u8')
+        if index % 11 == 0:
+            lines.append('')
+    return '\r\n'.join(lines[:len(lines) // 2]) + '\n' + '\n'.join(lines[len(lines) // 2:])
+
+
+def publish(publisher, files, carry=()):
+    """
+    发布一个版本：沿用 carry 中的文件，写入 files {文件名: 内容}
+
+    Returns:
+        版本号
+    """
+    generation, staging_dir = publisher.begin(list(carry))
+    for name, text in files.items():
+        (staging_dir / name).write_text(text, encoding='utf-8')
+    entries = {name: publisher.describe_file(staging_dir / name) for name in files}
+    previous = publisher.read_manifest().get('sources', {})
+    publisher.write_manifest(generation, staging_dir, entries, previous)
+    publisher.commit(generation, staging_dir)
+    return generation
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """写入 config.json 并返回 IPTVConfig；默认源全部禁用 / Write config.json and load it"""
+    def factory(sources=None, **sections):
+        data = {
+            'language': 'en',
+            'sources': {'domestic': {'enabled': False}, 'international': {'enabled': False}},
+            'directories': {'base_dir': str(tmp_path / 'base'), 'data_dir': 'data', 'backup_dir': 'backup',
+                            'log_dir': 'logs'},
+            'download': {'retry_count': 1, 'retry_delay': 0, 'timeout': 5},
+        }
+        data['sources'].update(sources or {})
+        data.update(sections)
+        path = tmp_path / 'config.json'
+        path.write_text(json.dumps(data), encoding='utf-8')
+        return iptv_manager.IPTVConfig(str(path))
+    return factory
+
+
+@pytest.fixture
+def publisher(make_config):
+    config = make_config({'a': {'name': 'A', 'url': 'http://127.0.0.1/a.m3u', 'filename': 'a.m3u'}})
+    return iptv_manager.IPTVPublisher(config)
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""配置加载与热重载 / Configuration loading and hot reload"""
+
+import json
+
+import pytest
+
+import iptv_manager
+
+SOURCES = {'a': {'name': 'A', 'url': 'http://example.com/a.m3u', 'filename': 'a.m3u'}}
+
+
+def test_get_sources_is_read_only(make_config):
+    config = make_config(SOURCES)
+    sources = config.get_sources()
+    with pytest.raises(TypeError):
+        sources['new'] = {}
+    with pytest.raises(TypeError):
+        sources['a']['url'] = 'http://example.com/other.m3u'
+    assert config.get_source('a')['url'] == 'http://example.com/a.m3u'
+
+
+@pytest.mark.parametrize('text', ['{"sources": {', '[]', '"config"', '42'])
+def test_invalid_config_file_is_an_error(make_config, tmp_path, text):
+    make_config(SOURCES)
+    (tmp_path / 'config.json').write_text(text, encoding='utf-8')
+    with pytest.raises(ValueError):
+        iptv_manager.IPTVConfig(str(tmp_path / 'config.json'))
+
+
+def test_reload_applies_changes(make_config, tmp_path):
+    config = make_config(SOURCES)
+    path = tmp_path / 'config.json'
+    data = json.loads(path.read_text(encoding='utf-8'))
+    data['download']['timeout'] = 9
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+    config.reload()
+    assert config.get('download.timeout') == 9
+
+
+@pytest.mark.parametrize('text', ['{"sources": {', '[]', '"config"', '42'])
+def test_failed_reload_keeps_current_snapshot(make_config, tmp_path, text):
+    config = make_config(SOURCES)
+    snapshot = config.snapshot
+    (tmp_path / 'config.json').write_text(text, encoding='utf-8')
+
+    with pytest.raises(ValueError, match='config.json'):
+        config.reload()
+    assert config.snapshot is snapshot
+    assert config.get_source('a')['url'] == 'http://example.com/a.m3u'
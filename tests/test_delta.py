@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""增量播放列表 / Delta playlists"""
+
+import json
+import random
+
+import pytest
+
+import iptv_manager
+from conftest import make_playlist, publish
+
+GEN1 = [('A', 'http://example.com/a'), ('B', 'http://example.com/b'), ('C', 'http://example.com/c'),
+        ('D', 'http://example.com/d')]
+# B 地址变化，C 删除，E 插入到 A 之后
+GEN2 = [('A', 'http://example.com/a'), ('E', 'http://example.com/e'), ('B', 'http://example.com/b2'),
+        ('D', 'http://example.com/d')]
+# D 移到开头，F 追加到末尾
+GEN3 = [('D', 'http://example.com/d'), ('A', 'http://example.com/a'), ('E', 'http://example.com/e'),
+        ('B', 'http://example.com/b2'), ('F', 'http://example.com/f')]
+
+
+def apply_delta(channels, delta):
+    """
+    按客户端的方式应用增量响应 / Apply a delta response the way a client would
+
+    引用客户端没有、响应中也没有的频道时断言失败
+    """
+    if delta['full']:
+        return delta['channels']
+    by_id = {channel['id']: channel for channel in channels}
+    assert set(delta['removed']) <= set(by_id)
+    by_id.update({channel['id']: channel for channel in delta['upserted']})
+    ids = [channel['id'] for channel in channels]
+    for channel_id, after in delta['moves']:
+        assert channel_id in by_id
+        if channel_id in ids:
+            ids.remove(channel_id)
+        ids.insert(ids.index(after) + 1 if after is not None else 0, channel_id)
+    removed = set(delta['removed'])
+    return [by_id[channel_id] for channel_id in ids if channel_id not in removed]
+
+
+def summary(channels):
+    return [(channel['id'], channel['name'], channel['url']) for channel in channels]
+
+
+@pytest.fixture
+def generations(publisher):
+    return [publish(publisher, {'a.m3u': make_playlist(channels)}) for channels in (GEN1, GEN2, GEN3)]
+
+
+@pytest.mark.parametrize('since_index', [0, 1])
+def test_round_trip(publisher, generations, since_index):
+    delta_log = publisher.delta_log
+    since = generations[since_index]
+    delta = delta_log.changes_since('a.m3u', since)
+
+    assert not delta['full']
+    assert delta['generation'] == generations[-1]
+    result = apply_delta(delta_log.channels(since, 'a.m3u'), delta)
+    assert summary(result) == summary(delta_log.channels(generations[-1], 'a.m3u'))
+
+
+def test_channel_added_and_removed_within_chain(publisher):
+    base = [('A', 'http://example.com/a'), ('B', 'http://example.com/b')]
+    # X 在第二个版本插入，Y 插入到 X 之后；第三个版本删除 X
+    middle = [('A', 'http://example.com/a'), ('X', 'http://example.com/x'), ('Y', 'http://example.com/y'),
+              ('B', 'http://example.com/b')]
+    final = [('A', 'http://example.com/a'), ('Y', 'http://example.com/y'), ('B', 'http://example.com/b')]
+    generations = [publish(publisher, {'a.m3u': make_playlist(channels)}) for channels in (base, middle, final)]
+    delta_log = publisher.delta_log
+
+    delta = delta_log.changes_since('a.m3u', generations[0])
+    assert not delta['full']
+    removed_id = next(channel['id'] for channel in delta_log.channels(generations[1], 'a.m3u') if channel['name'] == 'X')
+    assert removed_id not in {channel_id for move in delta['moves'] for channel_id in move}
+    assert removed_id not in delta['removed']
+    result = apply_delta(delta_log.channels(generations[0], 'a.m3u'), delta)
+    assert summary(result) == summary(delta_log.channels(generations[-1], 'a.m3u'))
+
+
+def test_random_chains_round_trip(publisher):
+    rng = random.Random(28)
+    pool = [(f"C{i}", f"http://example.com/{i}") for i in range(12)]
+    generations = [publish(publisher, {'a.m3u': make_playlist(rng.sample(pool, 6))}) for _ in range(6)]
+    delta_log = publisher.delta_log
+    current = delta_log.channels(generations[-1], 'a.m3u')
+
+    for since in generations:
+        delta = delta_log.changes_since('a.m3u', since)
+        assert not delta['full']
+        assert summary(apply_delta(delta_log.channels(since, 'a.m3u'), delta)) == summary(current)
+
+
+def test_moves_only_list_changed_positions():
+    channels = iptv_manager.IPTVPlaylist.parse(make_playlist([(f"C{i}", f"http://example.com/{i}") for i in range(100)]))
+    inserted = iptv_manager.IPTVPlaylist.parse(make_playlist(
+        [(f"C{i}", f"http://example.com/{i}") for i in range(50)] + [('New', 'http://example.com/new')]
+        + [(f"C{i}", f"http://example.com/{i}") for i in range(50, 100)]))
+
+    changes = iptv_manager.IPTVDeltaLog.diff(channels, inserted)
+    new_id = inserted[50]['id']
+    assert changes['moves'] == [[new_id, channels[49]['id']]]
+    assert iptv_manager.IPTVDeltaLog.diff(channels, channels)['moves'] == []
+
+
+def test_current_generation_has_no_changes(publisher, generations):
+    delta = publisher.delta_log.changes_since('a.m3u', generations[-1])
+    assert (delta['upserted'], delta['removed'], delta['moves']) == ([], [], [])
+
+
+def test_unknown_generation_returns_full_list(publisher, generations):
+    delta = publisher.delta_log.changes_since('a.m3u', 0)
+    assert delta['full']
+    assert summary(delta['channels']) == summary(publisher.delta_log.channels(generations[-1], 'a.m3u'))
+
+
+def test_unknown_file_is_not_found(publisher, generations):
+    status, _, _ = publisher.delta_log.handle_request('/delta/missing.m3u', f"since={generations[-1]}", {})
+    assert status == 404
+    status, _, _ = publisher.delta_log.handle_request('/delta/a.m3u', 'since=abc', {})
+    assert status == 400
+    status, headers, body = publisher.delta_log.handle_request('/delta/a.m3u', f"since={generations[0]}", {})
+    assert status == 200
+    assert json.loads(body)['generation'] == generations[-1]
+
+
+def test_channel_cache_is_bounded_by_size(publisher, generations, monkeypatch):
+    delta_log = publisher.delta_log
+    size = (publisher.generation_path(generations[0]) / 'a.m3u').stat().st_size
+    monkeypatch.setattr(iptv_manager.IPTVDeltaLog, 'CACHE_BYTES', size * 2)
+    delta_log._cache.clear()
+    delta_log._cache_bytes = 0
+
+    for generation in generations:
+        assert delta_log.channels(generation, 'a.m3u')
+        assert delta_log._cache_bytes <= size * 2
+    assert len(delta_log._cache) <= 2
+    assert (generations[-1], 'a.m3u') in delta_log._cache
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""二进制频道索引 / The binary channel index"""
+
+import pytest
+
+import iptv_manager
+from conftest import sample_playlist
+
+Playlist = iptv_manager.IPTVPlaylist
+
+
+def test_index_lookup(tmp_path):
+    text = sample_playlist()
+    channels = Playlist.parse(text)
+    path = tmp_path / 'sample.idx'
+    path.write_bytes(iptv_manager.IPTVChannelIndex.build(channels, Playlist.entry_spans(text)))
+    data = text.encode('utf-8')
+
+    with iptv_manager.IPTVChannelIndex(path) as index:
+        assert len(index) == len(channels)
+        for position, channel in enumerate(channels):
+            found = index.find(channel['id'])
+            assert found is not None
+            assert index.position(channel['id']) == position
+            assert {key: found[key] for key in ('id', 'name', 'group', 'tvg_id', 'url')} == \
+                {key: channel[key] for key in ('id', 'name', 'group', 'tvg_id', 'url')}
+            entry = data[found['offset']:found['offset'] + found['length']].decode('utf-8')
+            assert entry.startswith('#EXTINF:') and channel['url'] in entry
+
+        assert index.lookup('id1', 1)['id'] == Playlist.channel_id('id1', 1)
+        assert index.lookup('no such channel') is None
+        assert index.find('zz') is None
+        assert [channel['id'] for channel in index] == [channel['id'] for channel in channels]
+
+
+def test_invalid_index_is_rejected(tmp_path):
+    path = tmp_path / 'broken.idx'
+    path.write_bytes(b'not an index')
+    with pytest.raises(ValueError):
+        iptv_manager.IPTVChannelIndex(path)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""嵌套播放列表解析 / Nested playlist resolution"""
+
+from types import SimpleNamespace
+
+import iptv_manager
+from conftest import make_playlist
+
+
+class FakeDownloader:
+    """按地址返回固定内容并记录请求 / Serves fixed pages and records requests"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched = []
+
+    def fetch(self, url, timeout, phase=None):
+        self.fetched.append(url)
+        if url not in self.pages:
+            raise OSError(f"not found: {url}")
+        return SimpleNamespace(content=self.pages[url].encode('utf-8')), None
+
+    @staticmethod
+    def _detect_encoding(content):
+        return 'utf-8'
+
+
+def make_resolver(pages, max_depth=3):
+    settings = SimpleNamespace(download=SimpleNamespace(nested_max_depth=max_depth, nested_max_workers=4, timeout=5))
+    downloader = FakeDownloader(pages)
+    return iptv_manager.IPTVNestedResolver(downloader, settings), downloader
+
+
+def urls(text):
+    return [line for line in text.splitlines() if line and not line.startswith('#')]
+
+
+def test_cycles_are_skipped():
+    pages = {
+        'http://example.com/one.m3u': make_playlist([('Two', 'http://example.com/two.m3u'),
+                                                     ('Stream 1', 'http://example.com/1.ts')]),
+        'http://example.com/two.m3u': make_playlist([('Back', 'http://example.com/one.m3u'),
+                                                     ('Stream 2', 'http://example.com/2.ts')]),
+    }
+    resolver, downloader = make_resolver(pages)
+    text, stats = resolver.resolve(make_playlist([('One', 'http://example.com/one.m3u')]),
+                                   'http://example.com/root.m3u')
+
+    assert urls(text) == ['http://example.com/2.ts', 'http://example.com/1.ts']
+    assert stats['cycles'] == 1
+    assert stats['playlists'] == 2
+    assert sorted(downloader.fetched) == ['http://example.com/one.m3u', 'http://example.com/two.m3u']
+
+
+def test_self_reference_is_a_cycle():
+    root = make_playlist([('Self', 'http://example.com/root.m3u'), ('Stream', 'http://example.com/s.ts')])
+    resolver, downloader = make_resolver({})
+    text, stats = resolver.resolve(root, 'http://example.com/root.m3u')
+
+    assert urls(text) == ['http://example.com/s.ts']
+    assert stats['cycles'] == 1
+    assert downloader.fetched == []
+
+
+def test_cached_subtree_is_traversed():
+    pages = {
+        'http://example.com/x.m3u': make_playlist([('Index', 'http://example.com/index.m3u')]),
+        'http://example.com/index.m3u': make_playlist([('Leaf', 'leaf.m3u')]),
+        'http://example.com/leaf.m3u': make_playlist([('Channel', 'http://example.com/channel.ts')]),
+    }
+    resolver, downloader = make_resolver(pages, max_depth=2)
+    # 第一个源在深度上限处才遇到 index.m3u，其子列表未被获取
+    _, stats = resolver.resolve(make_playlist([('X', 'http://example.com/x.m3u')]), 'http://example.com/a.m3u')
+    assert stats['depth_limited'] == 1
+    assert 'http://example.com/leaf.m3u' not in downloader.fetched
+
+    # 第二个源直接引用已缓存的 index.m3u，仍需继续获取其后代
+    text, stats = resolver.resolve(make_playlist([('Index', 'index.m3u')]), 'http://example.com/b.m3u')
+    assert urls(text) == ['http://example.com/channel.ts']
+    assert stats['failed'] == 0
+    assert downloader.fetched.count('http://example.com/index.m3u') == 1
+    assert downloader.fetched.count('http://example.com/leaf.m3u') == 1
+
+
+def test_failed_children_are_kept():
+    root = make_playlist([('Missing', 'http://example.com/missing.m3u'), ('Stream', 'http://example.com/s.ts')])
+    resolver, _ = make_resolver({})
+    text, stats = resolver.resolve(root, 'http://example.com/root.m3u')
+
+    assert urls(text) == ['http://example.com/missing.m3u', 'http://example.com/s.ts']
+    assert stats['failed'] == 1
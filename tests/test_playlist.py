@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""播放列表扫描与解析 / Playlist scanning and parsing"""
+
+import hashlib
+
+import pytest
+
+import iptv_manager
+from conftest import sample_playlist
+
+Playlist = iptv_manager.IPTVPlaylist
+
+
+@pytest.fixture
+def playlist_file(tmp_path):
+    path = tmp_path / 'sample.m3u'
+    path.write_bytes(sample_playlist().encode('utf-8'))
+    return path
+
+
+@pytest.mark.parametrize('chunk', [7, 1024 * 1024])
+def test_scan_file_matches_text(playlist_file, monkeypatch, chunk):
+    # 小块验证跨块边界的计数
+    monkeypatch.setattr(Playlist, 'SCAN_CHUNK', chunk)
+    data = playlist_file.read_bytes()
+    info = Playlist.scan_file(playlist_file)
+
+    assert info == {'size': len(data), 'channels': data.count(b'#EXTINF:'), 'valid': True,
+                    'content_hash': hashlib.sha256(data).hexdigest()}
+    assert info['channels'] == 400
+
+
+def test_scan_file_flags_invalid_files(tmp_path):
+    empty = tmp_path / 'empty.m3u'
+    empty.write_bytes(b'')
+    assert Playlist.scan_file(empty, content_hash=False) == {'size': 0, 'channels': 0, 'valid': False}
+
+    no_urls = tmp_path / 'no_urls.m3u'
+    no_urls.write_bytes(b'#EXTM3U\n#EXTINF:-1,Name\n')
+    assert not Playlist.scan_file(no_urls)['valid']
+
+
+def test_parse_file_matches_parse(playlist_file):
+    expected = Playlist.parse(playlist_file.read_text(encoding='utf-8'))
+    assert len(expected) == 400
+    assert Playlist.parse_file(playlist_file) == expected
+
+
+def test_parallel_parse_file_matches_parse(playlist_file, caplog):
+    expected = Playlist.parse(playlist_file.read_text(encoding='utf-8'))
+    try:
+        assert Playlist.parse_file(playlist_file, workers=2, min_size=1) == expected
+    finally:
+        Playlist.shutdown_pool()
+    # 没有回退到串行解析
+    assert not [record for record in caplog.records if record.levelname == 'WARNING']
+
+
+def test_duplicate_ids_follow_occurrence_order(playlist_file):
+    channels = Playlist.parse_file(playlist_file)
+    ids = [channel['id'] for channel in channels]
+    assert len(set(ids)) == len(ids)
+    first = next(channel for channel in channels if channel['tvg_id'] == 'id1')
+    assert first['id'] == Playlist.channel_id('id1', 0)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""版本发布与回滚 / Generation publishing and rollback"""
+
+import os
+
+import pytest
+
+from conftest import make_playlist, publish
+
+V1 = make_playlist([('One', 'http://example.com/1.ts')])
+V2 = make_playlist([('One', 'http://example.com/1-new.ts')])
+
+
+def read(path):
+    return path.read_text(encoding='utf-8')
+
+
+def test_commit_switches_current_and_compat_links(publisher):
+    first = publish(publisher, {'a.m3u': V1})
+    second = publish(publisher, {'a.m3u': V2})
+
+    assert publisher.current_generation() == second
+    assert os.path.islink(publisher.current_link)
+    assert read(publisher.data_dir / 'a.m3u') == V2
+    # 已发布的版本目录不会被后续发布修改
+    assert read(publisher.generation_path(first) / 'a.m3u') == V1
+    assert publisher.read_manifest()['generation'] == second
+
+
+def test_staging_is_invisible_until_commit(publisher):
+    first = publish(publisher, {'a.m3u': V1})
+    generation, staging_dir = publisher.begin(['a.m3u'])
+    (staging_dir / 'a.m3u.tmp').write_text(V2, encoding='utf-8')
+    os.replace(staging_dir / 'a.m3u.tmp', staging_dir / 'a.m3u')
+
+    assert publisher.current_generation() == first
+    assert read(publisher.data_dir / 'a.m3u') == V1
+    assert generation not in publisher.list_generations()
+
+    publisher.discard(staging_dir)
+    assert not staging_dir.exists()
+    assert publisher.current_generation() == first
+    assert read(publisher.data_dir / 'a.m3u') == V1
+
+
+def test_carried_files_share_inodes(publisher):
+    first = publish(publisher, {'a.m3u': V1})
+    second = publish(publisher, {'b.m3u': V2}, carry=['a.m3u'])
+
+    assert os.path.samefile(publisher.generation_path(first) / 'a.m3u',
+                            publisher.generation_path(second) / 'a.m3u')
+    assert set(publisher.read_manifest()['sources']) == {'a.m3u', 'b.m3u'}
+
+
+def test_rollback_and_forward(publisher):
+    first = publish(publisher, {'a.m3u': V1})
+    second = publish(publisher, {'a.m3u': V2})
+
+    assert publisher.rollback() == first
+    assert publisher.current_generation() == first
+    assert read(publisher.data_dir / 'a.m3u') == V1
+
+    assert publisher.rollback(second) == second
+    assert read(publisher.data_dir / 'a.m3u') == V2
+
+    with pytest.raises(ValueError):
+        publisher.rollback(second + 10)
+    assert publisher.current_generation() == second
+
+
+def test_rollback_without_previous_generation(publisher):
+    publish(publisher, {'a.m3u': V1})
+    with pytest.raises(ValueError):
+        publisher.rollback()
+
+
+def test_unchanged_manifest_keeps_current_generation(publisher):
+    first = publish(publisher, {'a.m3u': V1})
+    previous = publisher.read_manifest()
+    generation, staging_dir = publisher.begin(['a.m3u'])
+    manifest = publisher.write_manifest(generation, staging_dir, {}, previous['sources'])
+
+    assert publisher.unchanged(manifest, previous)
+    publisher.keep_current(manifest, previous, staging_dir)
+    assert not staging_dir.exists()
+    assert publisher.list_generations() == [first]
+    assert publisher.read_manifest()['generation'] == first
+
+
+def test_changed_content_is_not_unchanged(publisher):
+    publish(publisher, {'a.m3u': V1})
+    previous = publisher.read_manifest()
+    generation, staging_dir = publisher.begin([])
+    (staging_dir / 'a.m3u').write_text(V2, encoding='utf-8')
+    entries = {'a.m3u': publisher.describe_file(staging_dir / 'a.m3u')}
+    manifest = publisher.write_manifest(generation, staging_dir, entries, previous['sources'])
+
+    assert not publisher.unchanged(manifest, previous)
+    publisher.discard(staging_dir)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""直播源注册表与配置验证 / Source registry and configuration validation"""
+
+import sqlite3
+import time
+
+import pytest
+
+import iptv_manager
+
+SOURCES = {'a': {'name': 'A', 'url': 'http://example.com/a.m3u', 'filename': 'a.m3u'}}
+OUTPUT = {'formats': ['json', 'txt'], 'merged': 'all.m3u'}
+
+
+@pytest.fixture
+def config(make_config):
+    return make_config(SOURCES, output=OUTPUT)
+
+
+def test_import_rejects_invalid_and_conflicting_rows(config):
+    registry = iptv_manager.IPTVSourceRegistry(config)
+    entries = [
+        {'url': 'http://example.com/escape.m3u', 'filename': '../../escaped.m3u'},
+        {'url': 'http://example.com/windows.m3u', 'filename': 'dir\\x.m3u'},
+        {'url': 'http://example.com/hidden.m3u', 'filename': '.hidden.m3u'},
+        {'url': 'ftp://example.com/ftp.m3u'},
+        {'url': 'http://example.com/clash.m3u', 'filename': 'a.json'},
+        {'url': 'http://example.com/merged.m3u', 'filename': 'all.txt'},
+        {'url': 'http://example.com/id.m3u', 'source_id': 'a'},
+        {'url': 'http://example.com/good.m3u', 'filename': 'good.m3u'},
+        {'url': 'http://example.com/derived.m3u', 'filename': 'good.txt'},
+        {'url': 'http://example.com/good.m3u', 'filename': 'again.m3u'},
+    ]
+
+    added, existing, invalid = registry.import_sources(entries)
+
+    assert (added, existing, invalid) == (1, 1, 8)
+    assert [source['filename'] for source in registry.list_sources()] == ['good.m3u']
+    assert not (config.snapshot.data_dir.parent / 'escaped.m3u').exists()
+
+
+def test_reimport_keeps_existing_rows(config):
+    registry = iptv_manager.IPTVSourceRegistry(config)
+    entries = [{'url': 'http://example.com/b.m3u', 'filename': 'b.m3u'}]
+    assert registry.import_sources(entries) == (1, 0, 0)
+    assert registry.import_sources(entries, tags=['news']) == (0, 1, 0)
+    assert registry.list_sources()[0]['tags'] == ['news']
+
+
+def test_get_sources_skips_bad_registry_rows(config):
+    registry = iptv_manager.IPTVSourceRegistry(config)
+    registry.import_sources([{'url': 'http://example.com/b.m3u', 'filename': 'b.m3u'}])
+    # 绕过导入检查直接写入的行 (如旧版本导入的数据)
+    connection = sqlite3.connect(str(registry.db_path))
+    now = time.time()
+    for source_id, url, filename in [('escape', 'http://example.com/1', '../../escaped.m3u'),
+                                     ('clash', 'http://example.com/2', 'a.json'),
+                                     ('scheme', 'file:///etc/passwd', 'passwd.m3u')]:
+        connection.execute("INSERT INTO sources (source_id, name, url, filename, enabled, priority, added_at, "
+                           "updated_at) VALUES (?, ?, ?, ?, 1, 0, ?, ?)", (source_id, source_id, url, filename, now, now))
+    connection.commit()
+    connection.close()
+
+    sources = config.get_sources()
+    assert list(sources) == ['a', registry.make_id('http://example.com/b.m3u')]
+
+
+@pytest.mark.parametrize('filename', ['../a.m3u', 'sub/a.m3u', '.a.m3u', ''])
+def test_config_rejects_unsafe_filenames(make_config, filename):
+    with pytest.raises(ValueError):
+        make_config({'a': dict(SOURCES['a'], filename=filename)})
+
+
+def test_config_rejects_derived_output_conflicts(make_config):
+    sources = dict(SOURCES, b={'name': 'B', 'url': 'http://example.com/b.m3u', 'filename': 'a.json'})
+    with pytest.raises(ValueError):
+        make_config(sources, output=OUTPUT)
+
+
+
+def test_read_entries_text(tmp_path):
+    path = tmp_path / 'sources.txt'
+    path.write_text('# comment\n'
+                    'News,http://example.com/news.m3u\n'
+                    'News 2,http://example.com/a,b.m3u\n'
+                    'http://example.com/c,d.m3u\n'
+                    '\n'
+                    'https://example.com/plain.m3u\n', encoding='utf-8')
+
+    assert list(iptv_manager.IPTVSourceRegistry.read_entries(str(path))) == [
+        {'name': 'News', 'url': 'http://example.com/news.m3u'},
+        {'name': 'News 2', 'url': 'http://example.com/a,b.m3u'},
+        {'url': 'http://example.com/c,d.m3u'},
+        {'url': 'https://example.com/plain.m3u'},
+    ]
+
+
+@pytest.mark.parametrize('data, invalid', [('"http://example.com/a.m3u"', 1), ('42', 1), ('null', 1),
+                                           ('["http://example.com/a.m3u", 1]', 2),
+                                           ('{"b": "http://example.com/b.m3u"}', 1)])
+def test_import_rejects_non_object_json_entries(config, tmp_path, data, invalid):
+    path = tmp_path / 'sources.json'
+    path.write_text(data, encoding='utf-8')
+    registry = iptv_manager.IPTVSourceRegistry(config)
+
+    assert registry.import_sources(registry.read_entries(str(path))) == (0, 0, invalid)
+    assert registry.list_sources() == []
+
+
+def test_import_json_sources(config, tmp_path):
+    path = tmp_path / 'sources.json'
+    path.write_text('{"b": {"name": "B", "url": "http://example.com/b.m3u"}}', encoding='utf-8')
+    registry = iptv_manager.IPTVSourceRegistry(config)
+
+    assert registry.import_sources(registry.read_entries(str(path))) == (1, 0, 0)
+    assert [(source['source_id'], source['filename']) for source in registry.list_sources()] == [('b', 'b.m3u')]